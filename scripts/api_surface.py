@@ -0,0 +1,467 @@
+import ast
+import fnmatch
+import json
+import posixpath
+import re
+import subprocess
+import tomllib
+
+from diff_tools import diff_file_paths, split_diff_files
+
+SUMMARY_HEADER = (
+    "API surface changes (parsed from the base and head versions of the "
+    "changed files; + added, - removed, ~ changed):\n"
+)
+# Longest rendering of one signature/value; longer ones are cut.
+MAX_DESCRIPTOR_CHARS = 240
+# Config files with more keys than this are summarized to their top levels.
+MAX_CONFIG_KEYS = 400
+# Changed files that are never user-facing: tests, CI setup, changelogs.
+NON_SURFACE_PATTERNS = (
+    "*/test/*",
+    "*/tests/*",
+    "*/__tests__/*",
+    "*/spec/*",
+    "*/e2e/*",
+    "*/test_*.py",
+    "*_test.py",
+    "*/conftest.py",
+    "*.test.*",
+    "*.spec.*",
+    "*/.github/*",
+    "*/.gitlab-ci.yml",
+    "*/.circleci/*",
+    "*/CHANGELOG*",
+    "*/CHANGES*",
+    "*/.gitignore",
+    "*/.gitattributes",
+    "*/.editorconfig",
+)
+
+_IDENT = r"[A-Za-z_$][\w$]*"
+_TS_DECL_RE = re.compile(
+    rf"^[ \t]*export[ \t]+(?:default[ \t]+)?(?:declare[ \t]+)?(?:abstract[ \t]+)?"
+    rf"(?:async[ \t]+)?(function\*?|const|let|var|class|interface|type|enum)"
+    rf"[ \t]+({_IDENT})",
+    re.MULTILINE,
+)
+_TS_LOCAL_TYPE_RE = re.compile(
+    rf"^[ \t]*(interface|type)[ \t]+({_IDENT})", re.MULTILINE
+)
+_TS_REEXPORT_RE = re.compile(r"^[ \t]*export[ \t]*\{([^}]*)\}", re.MULTILINE)
+_TS_MEMBER_RE = re.compile(
+    rf"^[ \t]*(?:readonly[ \t]+|public[ \t]+|static[ \t]+|async[ \t]+)*"
+    rf"({_IDENT}|'[^']+'|\"[^\"]+\")\??[ \t]*[:(=]"
+)
+_TS_ENV_RE = re.compile(
+    r"(?:process\.env|import\.meta\.env)(?:\.([A-Z_][A-Z0-9_]*)|\[['\"]([A-Z_][A-Z0-9_]*)['\"]\])"
+)
+_VUE_SCRIPT_RE = re.compile(r"<script\b[^>]*>(.*?)</script>", re.DOTALL)
+_VUE_MACRO_RE = re.compile(r"\b(defineProps|defineEmits|defineModel)\b")
+_QUOTED_RE = re.compile(r"['\"]([\w:-]+)['\"]")
+_YAML_KEY_RE = re.compile(r"^([ ]*)([\w.-]+)[ \t]*:(?:[ \t]+(.*))?$")
+_DOTENV_RE = re.compile(
+    r"^[ \t]*(?:export[ \t]+)?([A-Z_][A-Z0-9_]*)=(.*)$", re.MULTILINE
+)
+
+
+def _short(text):
+    text = " ".join(text.split())
+    if len(text) > MAX_DESCRIPTOR_CHARS:
+        return text[: MAX_DESCRIPTOR_CHARS - 3] + "..."
+    return text
+
+
+def _public(name):
+    return not name.startswith("_")
+
+
+# -- Python ---------------------------------------------------------------
+
+
+def _py_signature(node):
+    decorators = "".join(f"@{ast.unparse(d)} " for d in node.decorator_list)
+    keyword = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return _short(
+        f"{decorators}{keyword} {node.name}({ast.unparse(node.args)}){returns}"
+    )
+
+
+def _py_assigned_names(node):
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    return [t.id for t in targets if isinstance(t, ast.Name)]
+
+
+def _py_string(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def python_surface(source):
+    """{category: {name: descriptor}} of a Python module's public API.
+
+    Public functions, classes, methods and class fields (dataclass, pydantic
+    settings and enum members), upper-case module constants, __all__,
+    argparse/click options and environment variables read.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    surface = {}
+
+    def add(category, name, descriptor=""):
+        surface.setdefault(category, {})[name] = _short(descriptor)
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if _public(node.name):
+                add("function", node.name, _py_signature(node))
+        elif isinstance(node, ast.ClassDef) and _public(node.name):
+            bases = ", ".join(ast.unparse(b) for b in node.bases + node.keywords)
+            add("class", node.name, f"class {node.name}({bases})")
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    if _public(item.name) or item.name == "__init__":
+                        add("method", f"{node.name}.{item.name}", _py_signature(item))
+                elif isinstance(item, (ast.Assign, ast.AnnAssign)):
+                    for name in filter(_public, _py_assigned_names(item)):
+                        add("field", f"{node.name}.{name}", ast.unparse(item))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            for name in _py_assigned_names(node):
+                if name == "__all__" and isinstance(node.value, (ast.List, ast.Tuple)):
+                    for element in node.value.elts:
+                        if _py_string(element):
+                            add("export", _py_string(element))
+                elif name.isupper() and _public(name):
+                    add("constant", name, ast.unparse(node))
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            func = node.func
+            attr = (
+                func.attr
+                if isinstance(func, ast.Attribute)
+                else getattr(func, "id", "")
+            )
+            first = _py_string(node.args[0]) if node.args else None
+            if attr in ("add_argument", "option", "argument") and first:
+                names = [s for s in map(_py_string, node.args) if s]
+                add("cli option", "/".join(names), ast.unparse(node))
+            elif attr == "add_parser" and first:
+                add("cli command", first, ast.unparse(node))
+            elif attr in ("getenv", "get") and first and first.isupper():
+                if attr == "getenv" or "environ" in ast.unparse(func):
+                    add("env var", first, ast.unparse(node))
+        elif isinstance(node, ast.Subscript) and "environ" in ast.unparse(node.value):
+            key = _py_string(node.slice)
+            if key:
+                add("env var", key, ast.unparse(node))
+    return surface
+
+
+# -- TypeScript / Vue -------------------------------------------------------
+
+
+def _block_end(text, start):
+    """Index just past the bracket block opening at text[start]."""
+    pairs = {"{": "}", "(": ")", "[": "]", "<": ">"}
+    stack, index, quote = [], start, None
+    while index < len(text):
+        char = text[index]
+        if quote:
+            if char == "\\":
+                index += 1
+            elif char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char in "{([" or (char == "<" and stack and stack[-1] == ">"):
+            stack.append(pairs[char])
+        elif char == "<" and not stack:
+            stack.append(">")
+        elif (
+            stack and char == stack[-1] and not (char == ">" and text[index - 1] == "=")
+        ):
+            stack.pop()
+            if not stack:
+                return index + 1
+        index += 1
+    return len(text)
+
+
+def _ts_head(text, start):
+    """A declaration's head: up to its body, ';' or line end at depth 0."""
+    index = start
+    while index < len(text):
+        char = text[index]
+        if char in "([":
+            index = _block_end(text, index)
+            continue
+        if char in "{;\n":
+            break
+        index += 1
+    return text[start:index]
+
+
+def _ts_members(body):
+    """Top-level member names and declarations of a { ... } body."""
+    members, depth, line, in_body = {}, 0, "", False
+
+    def flush(line):
+        match = _TS_MEMBER_RE.match(line)
+        if match and not line.strip().startswith(("private", "protected", "#")):
+            members[match.group(1).strip("'\"")] = line.strip()
+
+    for char in body[1:-1]:
+        if depth == 0 and char in ";,\n":
+            flush(line)
+            line = ""
+            continue
+        if char in "{([":
+            # Method bodies are implementation, not surface: skip them.
+            in_body = in_body or (depth == 0 and char == "{" and ")" in line)
+            depth += 1
+        elif char in "})]":
+            depth -= 1
+            if depth == 0 and in_body:
+                in_body = False
+                continue
+        if not in_body:
+            line += char
+    flush(line)
+    return members
+
+
+def typescript_surface(source, local_types=False):
+    """{category: {name: descriptor}} of a TS module's exports.
+
+    Exported functions, constants, classes, interfaces, types and enums
+    (with their members, e.g. config option keys), re-exports and the
+    environment variables read; local_types also covers non-exported
+    interfaces and types (Vue component props).
+    """
+    surface = {}
+
+    def add(category, name, descriptor=""):
+        surface.setdefault(category, {})[name] = _short(descriptor)
+
+    matches = [(m, True) for m in _TS_DECL_RE.finditer(source)]
+    if local_types:
+        matches += [(m, False) for m in _TS_LOCAL_TYPE_RE.finditer(source)]
+    for match, exported in matches:
+        kind, name = match.group(1), match.group(2)
+        head = _ts_head(source, match.start())
+        add(kind.rstrip("*") if exported else f"local {kind}", name, head)
+        if kind.startswith("function"):
+            continue
+        # Members of classes, interfaces, object types/constants and enums,
+        # e.g. the keys of an options interface or a config object.
+        head_end = match.start() + len(head)
+        brace = source.find("{", head_end)
+        if brace >= 0 and source[head_end:brace].strip() in ("", "="):
+            body = source[brace : _block_end(source, brace)]
+            for member, text in _ts_members(body).items():
+                add("member", f"{name}.{member}", text)
+    for match in _TS_REEXPORT_RE.finditer(source):
+        for name in match.group(1).split(","):
+            if name.strip():
+                add("export", name.split(" as ")[-1].strip())
+    for match in _TS_ENV_RE.finditer(source):
+        add("env var", match.group(1) or match.group(2))
+    return surface
+
+
+def vue_surface(source):
+    """Script API of a Vue SFC: exports, props, emits and models."""
+    script = "\n".join(_VUE_SCRIPT_RE.findall(source))
+    surface = typescript_surface(script, local_types=True)
+    for match in _VUE_MACRO_RE.finditer(script):
+        macro = match.group(1)
+        start = match.end()
+        while start < len(script) and script[start] in " \t":
+            start += 1
+        if start >= len(script) or script[start] not in "<({":
+            continue
+        block = script[start : _block_end(script, start)]
+        if macro == "defineEmits":
+            names = _QUOTED_RE.findall(block)
+        elif macro == "defineModel":
+            names = _QUOTED_RE.findall(block[:80]) or ["modelValue"]
+        else:
+            inner = block.strip("<>()")
+            names = list(_ts_members(inner)) if inner.startswith("{") else []
+            if not names and inner:
+                names = [f"({inner.strip()})"]
+        category = {"defineProps": "prop", "defineEmits": "event"}.get(macro, "model")
+        for name in names:
+            surface.setdefault(category, {})[name] = ""
+    return surface
+
+
+# -- Config files -----------------------------------------------------------
+
+
+def _flatten(value, prefix, out):
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            _flatten(item, f"{prefix}.{key}" if prefix else str(key), out)
+    else:
+        out[prefix] = _short(json.dumps(value, default=str))
+
+
+def config_surface(path, source):
+    """{"config key": {dotted key: value}} of a JSON/YAML/TOML/.env file."""
+    name = posixpath.basename(path)
+    if not name.endswith((".json", ".toml", ".yaml", ".yml")) and not name.startswith(
+        ".env"
+    ):
+        return None
+    if not source.strip():  # added or deleted file
+        return {}
+    keys = {}
+    try:
+        if name.endswith(".json"):
+            _flatten(json.loads(source), "", keys)
+        elif name.endswith(".toml"):
+            _flatten(tomllib.loads(source), "", keys)
+        elif name.endswith((".yaml", ".yml")):
+            stack = []
+            for line in source.splitlines():
+                match = _YAML_KEY_RE.match(line)
+                if not match or line.lstrip().startswith("#"):
+                    continue
+                indent = len(match.group(1))
+                while stack and stack[-1][0] >= indent:
+                    stack.pop()
+                stack.append((indent, match.group(2)))
+                keys[".".join(k for _, k in stack)] = _short(match.group(3) or "")
+        else:
+            return {"env var": {k: _short(v) for k, v in _DOTENV_RE.findall(source)}}
+    except (ValueError, tomllib.TOMLDecodeError):
+        return None
+    if len(keys) > MAX_CONFIG_KEYS:
+        keys = {k: v for k, v in keys.items() if k.count(".") < 2}
+    return {"config key": keys}
+
+
+def file_surface(path, source):
+    """The API surface of one file by type, or None if it is not analyzed."""
+    if path.endswith(".py"):
+        return python_surface(source)
+    if path.endswith((".ts", ".tsx", ".mts", ".js", ".mjs")):
+        return typescript_surface(source)
+    if path.endswith(".vue"):
+        return vue_surface(source)
+    return config_surface(path, source)
+
+
+def compare_surfaces(old, new):
+    """[(sign, category, name, descriptor)] between two file surfaces."""
+    changes = []
+    for category in sorted(old.keys() | new.keys()):
+        before, after = old.get(category, {}), new.get(category, {})
+        for name in sorted(before.keys() - after.keys()):
+            changes.append(("-", category, name, before[name]))
+        for name in sorted(after.keys() - before.keys()):
+            changes.append(("+", category, name, after[name]))
+        for name in sorted(before.keys() & after.keys()):
+            if before[name] != after[name]:
+                changes.append(
+                    ("~", category, name, f"{before[name]} => {after[name]}")
+                )
+    return changes
+
+
+def is_non_surface_path(path):
+    """True for tests, CI setup and changelogs, which document nothing."""
+    return any(fnmatch.fnmatchcase("/" + path, p) for p in NON_SURFACE_PATTERNS)
+
+
+def read_blobs(repo_path, specs):
+    """{"rev:path": text} for all specs with one `git cat-file --batch`.
+
+    Missing objects (a file added or deleted in the range) read as "".
+    """
+    if not specs:
+        return {}
+    output = subprocess.run(
+        ["git", "cat-file", "--batch"],
+        input="".join(f"{spec}\n" for spec in specs).encode("utf-8"),
+        cwd=repo_path,
+        capture_output=True,
+    ).stdout
+    blobs, position = {}, 0
+    for spec in specs:
+        end = output.find(b"\n", position)
+        if end < 0:
+            break
+        header = output[position:end].decode("utf-8", "replace").split()
+        position = end + 1
+        if len(header) != 3 or header[1] != "blob":
+            blobs[spec] = ""
+            continue
+        size = int(header[2])
+        blobs[spec] = output[position : position + size].decode("utf-8", "replace")
+        position += size + 1
+    return blobs
+
+
+def api_changes(repo_path, base, head, diff_text):
+    """API-surface changes of the files in diff_text between base and head.
+
+    Parses the base and head versions of each changed file and compares the
+    public signatures, exports, CLI options, env vars and config keys.
+    Tests, CI setup and changelogs are skipped. Returns (changed, unanalyzed):
+    [(old path, new path, changes)] for files whose surface changed, and the
+    paths of files of a type that is not parsed.
+    """
+    files = []
+    for file_diff in split_diff_files(diff_text):
+        old_path, new_path = diff_file_paths(file_diff)
+        path = new_path or old_path
+        if path and not is_non_surface_path(path):
+            files.append((old_path, new_path))
+    blobs = read_blobs(
+        repo_path,
+        [f"{base}:{old}" for old, _ in files if old]
+        + [f"{head}:{new}" for _, new in files if new],
+    )
+    changed, unanalyzed = [], []
+    for old_path, new_path in files:
+        path = new_path or old_path
+        # An added or deleted file is compared with an empty one.
+        old = file_surface(path, blobs.get(f"{base}:{old_path}", ""))
+        new = file_surface(path, blobs.get(f"{head}:{new_path}", ""))
+        if old is None or new is None:
+            unanalyzed.append(path)
+            continue
+        changes = compare_surfaces(old, new)
+        if changes:
+            changed.append((old_path, new_path, changes))
+    return changed, unanalyzed
+
+
+def render_api_changes(changed):
+    """Compact prompt summary of api_changes() output: (text, change count).
+
+    The text is empty when nothing on the surface changed.
+    """
+    sections, count = [], 0
+    for old_path, new_path, changes in changed:
+        count += len(changes)
+        if not old_path or not new_path or old_path == new_path:
+            header = new_path or f"{old_path} (deleted)"
+        else:
+            header = f"{old_path} -> {new_path}"
+        lines = [header]
+        lines += [
+            f"  {sign} {category} {name}" + (f": {text}" if text else "")
+            for sign, category, name, text in changes
+        ]
+        sections.append("\n".join(lines))
+    if not sections:
+        return "", 0
+    return SUMMARY_HEADER + "\n".join(sections) + "\n", count
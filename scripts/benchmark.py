@@ -0,0 +1,851 @@
+"""Offline end-to-end benchmark for llm_doc_updater.py.
+
+Runs the updater as a subprocess against local stand-ins: an
+OpenAI-compatible chat server with configurable latency and token rates, and
+a fake GitHub REST server backed by an in-memory documentation repo. A
+synthetic source repo (with a PR diff) and doc corpora of the requested sizes
+are generated per scenario. Reports end-to-end latency, API call counts and
+peak memory, e.g.:
+
+    python scripts/benchmark.py --pages 10,100,1000 --output bench.json
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from constants import (
+    CONFIG_UPDATE_SYSTEM_PROMPT,
+    CREATE_DOC_SYSTEM_PROMPT,
+    DIFF_NOTES_SYSTEM_PROMPT,
+    NO_CHANGES_MARKER,
+    OPENAI_MODEL,
+    PATCH_SYSTEM_PROMPT,
+    PROPOSE_NEW_DOCS_SYSTEM_PROMPT,
+    SUMMARY_SYSTEM_PROMPT,
+    TRIAGE_BATCH_SYSTEM_PROMPT,
+    TRIAGE_BATCH_UPDATE_UNSURE,
+    TRIAGE_SYSTEM_PROMPT,
+    TRIAGE_UNSURE_SYSTEM_PROMPT,
+    UPDATE_SYSTEM_PROMPT,
+)
+from token_budget import count_tokens
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OWNER = "bench"
+SOURCE_REPO = f"{OWNER}/source"
+DOC_REPO = f"{OWNER}/docs"
+DOC_PATH = "docs"
+PR_NUMBER = 1
+
+_WORDS = (
+    "the service reads its settings at startup and applies them to every "
+    "request option value default client server handler cache retry timeout "
+    "limit endpoint token user project build deploy log level format"
+).split()
+_SHA_RE = re.compile(r"/[0-9a-f]{40}(?=/|$)")
+_NUMBER_RE = re.compile(r"/\d+(?=/|$)")
+_FILE_PATH_RE = re.compile(r"^--- FILE: (.+?) ---$", re.MULTILINE)
+
+
+def stage_of(system_prompt):
+    """Name of the updater stage a system prompt belongs to."""
+    return {
+        TRIAGE_SYSTEM_PROMPT: "triage",
+        TRIAGE_UNSURE_SYSTEM_PROMPT: "triage",
+        TRIAGE_BATCH_SYSTEM_PROMPT: "triage_batch",
+        PROPOSE_NEW_DOCS_SYSTEM_PROMPT: "propose",
+        CREATE_DOC_SYSTEM_PROMPT: "create",
+        UPDATE_SYSTEM_PROMPT: "update",
+        PATCH_SYSTEM_PROMPT: "patch",
+        CONFIG_UPDATE_SYSTEM_PROMPT: "config",
+        SUMMARY_SYSTEM_PROMPT: "summary",
+        DIFF_NOTES_SYSTEM_PROMPT: "condense_diff",
+    }.get(system_prompt, "other")
+
+
+def selected(text, fraction):
+    """Deterministically pick ~fraction of inputs by hashing them."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2**32 < fraction
+
+
+def synthetic_text(words, seed):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+# -- Fake OpenAI ------------------------------------------------------------
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """OpenAI-compatible /v1/chat/completions with simulated latency.
+
+    Each response takes latency + prompt/input_tps + completion/output_tps
+    seconds; streamed responses (stream=true) spread the completion time
+    over the chunks and stop when the client disconnects. Triage says yes to
+    ~relevant_fraction of pages (and, where the prompt allows it, unsure to
+    ~unsure_fraction of the others; with logprobs, those score near 0.5).
+    Page updates answer NO_CHANGES_MARKER for ~unchanged_fraction of pages
+    and synthetic pages of page_tokens tokens (or, in patch mode, one edit
+    appending a paragraph) otherwise. Calls are counted per stage, and per
+    model for models other than OPENAI_MODEL.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, options):
+        super().__init__(("127.0.0.1", 0), _OpenAIHandler)
+        self.options = options
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def count(self, key):
+        with self.lock:
+            self.calls[key] += 1
+
+    def answer(self, messages):
+        """Return (stage, content, usage) for a chat request."""
+        opts = self.options
+        stage = stage_of(messages[0]["content"])
+        user = messages[-1]["content"]
+        page = synthetic_text(int(opts.page_tokens * 0.75), user[-200:])
+        if stage == "triage":
+            content = "YES" if selected(user, opts.relevant_fraction) else "NO"
+            if (
+                content == "NO"
+                and messages[0]["content"] == TRIAGE_UNSURE_SYSTEM_PROMPT
+                and selected(user[::-1], opts.unsure_fraction)
+            ):
+                content = "UNSURE"
+        elif stage == "triage_batch":
+            unsure = TRIAGE_BATCH_UPDATE_UNSURE in user
+            content = json.dumps(
+                [
+                    {
+                        "path": path,
+                        "update": (
+                            "unsure"
+                            if unsure and selected(path[::-1], opts.unsure_fraction)
+                            else selected(path, opts.relevant_fraction)
+                        ),
+                    }
+                    for path in _FILE_PATH_RE.findall(user)
+                ]
+            )
+        elif stage == "propose":
+            content = json.dumps(
+                [
+                    {
+                        "path": f"{DOC_PATH}/new-{i}.md",
+                        "title": f"New {i}",
+                        "reason": "",
+                    }
+                    for i in range(opts.new_pages)
+                ]
+            )
+        elif stage in ("update", "patch") and selected(
+            user[::-1], opts.unchanged_fraction
+        ):
+            content = NO_CHANGES_MARKER
+        elif stage == "patch":
+            content = json.dumps(
+                [
+                    {
+                        "section": "Details",
+                        "find": "",
+                        "replace": synthetic_text(60, user[-200:]),
+                    }
+                ]
+            )
+        elif stage in ("update", "create"):
+            content = f"# Updated page\n\n{page}\n"
+        elif stage == "config":
+            content = "export default { themeConfig: { sidebar: [] } }\n"
+        elif stage in ("summary", "condense_diff"):
+            content = "- " + synthetic_text(60, user[-200:])
+        else:
+            content = "NO"
+        usage = {
+            "prompt_tokens": sum(count_tokens(m["content"]) for m in messages),
+            "completion_tokens": count_tokens(content),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return stage, content, usage
+
+    def first_token_delay(self, usage):
+        delay = self.options.latency_ms / 1000
+        if self.options.input_tps:
+            delay += usage["prompt_tokens"] / self.options.input_tps
+        return delay
+
+    def route(self, stage, model):
+        return stage if model in (None, OPENAI_MODEL) else f"{stage} ({model})"
+
+    def token_logprobs(self, messages, verdict):
+        """Logprobs of a one-token YES/NO answer, for scored triage.
+
+        Pages the fake model is unsure about score around 0.5, the others
+        close to 1 for YES and close to 0 for NO.
+        """
+        user = messages[-1]["content"]
+        digest = hashlib.sha256(user.encode("utf-8")).digest()
+        spread = int.from_bytes(digest[4:8], "big") / 2**32
+        if selected(user[::-1], self.options.unsure_fraction):
+            p_yes = 0.35 + 0.3 * spread
+        else:
+            p_yes = 0.9 + 0.09 * spread if verdict == "YES" else 0.01 + 0.09 * spread
+        top = sorted(
+            [
+                {"token": "YES", "logprob": math.log(p_yes), "bytes": None},
+                {"token": "NO", "logprob": math.log(1 - p_yes), "bytes": None},
+            ],
+            key=lambda t: -t["logprob"],
+        )
+        return {**top[0], "top_logprobs": top}
+
+    def respond(self, messages, model=None, logprobs=False):
+        stage, content, usage = self.answer(messages)
+        stage = self.route(stage, model)
+        choice = {
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }
+        if logprobs:
+            first = self.token_logprobs(messages, content)
+            choice["message"]["content"] = first["token"]
+            choice["logprobs"] = {"content": [first]}
+            choice["finish_reason"] = "length"
+            usage["completion_tokens"] = 1
+        time.sleep(
+            self.first_token_delay(usage)
+            + usage["completion_tokens"] / self.options.output_tps
+        )
+        self.count(stage)
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "bench",
+            "choices": [choice],
+            "usage": usage,
+        }
+
+    def stream(self, handler, messages, include_usage, model=None):
+        """Send the answer as server-sent events, ~4 characters per chunk."""
+        stage, content, usage = self.answer(messages)
+        stage = self.route(stage, model)
+        time.sleep(self.first_token_delay(usage))
+
+        def chunk(delta, finish=None, usage=None):
+            data = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "bench",
+                "choices": (
+                    []
+                    if delta is None
+                    else [{"index": 0, "delta": delta, "finish_reason": finish}]
+                ),
+            }
+            if usage is not None:
+                data["usage"] = usage
+            handler.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        pieces = [content[i : i + 4] for i in range(0, len(content), 4)]
+        try:
+            chunk({"role": "assistant", "content": ""})
+            for piece in pieces:
+                time.sleep(1 / self.options.output_tps)
+                chunk({"content": piece})
+            chunk({}, finish="stop")
+            if include_usage:
+                chunk(None, usage=usage)
+            handler.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.count(f"{stage} (aborted)")
+            return
+        self.count(stage)
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8") if status != 304 else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _OpenAIHandler(_JSONHandler):
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "not found"}})
+            return
+        body = self.read_json()
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            self.server.stream(self, body["messages"], include_usage, body.get("model"))
+        else:
+            self.send_json(
+                200,
+                self.server.respond(
+                    body["messages"], body.get("model"), body.get("logprobs")
+                ),
+            )
+
+
+# -- Fake GitHub ------------------------------------------------------------
+
+
+class MemoryRepo:
+    """Just enough of a git object store for the updater's Git Data API use."""
+
+    def __init__(self, files, branch="main"):
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        self.refs = {}
+        tree = self.make_tree(
+            {path: ("100644", self.add_blob(c)) for path, c in files.items()}
+        )
+        self.refs[branch] = self.make_commit(tree, [], "Initial docs")
+
+    @staticmethod
+    def _sha(kind, data):
+        return hashlib.sha1(f"{kind}:{data}".encode("utf-8")).hexdigest()
+
+    def add_blob(self, content):
+        sha = self._sha("blob", content)
+        self.blobs[sha] = content
+        return sha
+
+    def make_tree(self, entries):
+        sha = self._sha("tree", json.dumps(sorted(entries.items())))
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def make_commit(self, tree, parents, message):
+        sha = self._sha("commit", json.dumps([tree, parents, message]))
+        self.commits[sha] = {"tree": tree, "parents": parents, "message": message}
+        return sha
+
+    def resolve(self, ref):
+        return self.refs.get(ref) or (ref if ref in self.commits else None)
+
+    def tree_listing(self, sha):
+        entries = self.trees[sha]
+        dirs = {
+            p.rsplit("/", i)[0] for p in entries for i in range(1, p.count("/") + 1)
+        }
+        listing = [
+            {"path": d, "mode": "040000", "type": "tree", "sha": self._sha("dir", d)}
+            for d in sorted(dirs)
+        ]
+        listing += [
+            {"path": p, "mode": mode, "type": "blob", "sha": blob, "size": 0}
+            for p, (mode, blob) in sorted(entries.items())
+        ]
+        return listing
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    """REST stand-in for the source PR and the in-memory documentation repo."""
+
+    daemon_threads = True
+
+    def __init__(self, doc_files, base_ref, head_sha):
+        super().__init__(("127.0.0.1", 0), _GitHubHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.docs = MemoryRepo(doc_files)
+        self.base_ref = base_ref
+        self.head_sha = head_sha
+        self.pulls = {}
+        self.comments = []
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def repo_url(self, name):
+        return f"{self.url}/repos/{name}"
+
+    def repo_json(self, name):
+        return {
+            "name": name.split("/")[1],
+            "full_name": name,
+            "owner": {"login": OWNER},
+            "default_branch": "main",
+            "url": self.repo_url(name),
+            "html_url": f"https://github.invalid/{name}",
+        }
+
+    def pull_json(self, name, number):
+        if name == SOURCE_REPO:
+            pull = {
+                "body": "Synthetic benchmark change.",
+                "base": {"ref": self.base_ref},
+                "head": {"sha": self.head_sha, "ref": "feature"},
+            }
+        else:
+            pull = self.pulls[number]
+        return {
+            "number": number,
+            "state": "open",
+            "url": f"{self.repo_url(name)}/pulls/{number}",
+            "html_url": f"https://github.invalid/{name}/pull/{number}",
+            **pull,
+        }
+
+    def ref_json(self, name, branch):
+        sha = self.docs.refs[branch]
+        return {
+            "ref": f"refs/heads/{branch}",
+            "url": f"{self.repo_url(name)}/git/refs/heads/{branch}",
+            "object": {"sha": sha, "type": "commit"},
+        }
+
+    def commit_json(self, name, sha):
+        return {
+            "sha": sha,
+            "url": f"{self.repo_url(name)}/git/commits/{sha}",
+            "tree": {"sha": self.docs.commits[sha]["tree"]},
+            "parents": [{"sha": p} for p in self.docs.commits[sha]["parents"]],
+        }
+
+    def handle(self, method, path, query, body):
+        """Return (status, json) for one API request."""
+        match = re.match(r"^/repos/([^/]+/[^/]+)(/.*)?$", path)
+        if not match:
+            return 404, {"message": "Not Found"}
+        name, rest = match.group(1), match.group(2) or ""
+        docs = self.docs
+        if rest == "":
+            return 200, self.repo_json(name)
+        if rest == "/pulls" and method == "GET":
+            head = (query.get("head") or [""])[0].split(":")[-1]
+            return 200, [
+                self.pull_json(name, n)
+                for n, p in self.pulls.items()
+                if p["head"]["ref"] == head
+            ]
+        if rest == "/pulls" and method == "POST":
+            number = len(self.pulls) + 1
+            self.pulls[number] = {
+                "title": body["title"],
+                "body": body.get("body"),
+                "base": {"ref": body["base"]},
+                "head": {"ref": body["head"], "sha": docs.refs[body["head"]]},
+            }
+            return 201, self.pull_json(name, number)
+        match = re.match(r"^/pulls/(\d+)$", rest)
+        if match:
+            number = int(match.group(1))
+            if method == "PATCH":
+                self.pulls[number].update(
+                    {k: v for k, v in body.items() if k in ("title", "body")}
+                )
+            return 200, self.pull_json(name, number)
+        match = re.match(r"^/issues/(\d+)(/comments)?$", rest)
+        if match:
+            if match.group(2):
+                self.comments.append(body.get("body", ""))
+                return 201, {"id": len(self.comments), "body": body.get("body")}
+            number = int(match.group(1))
+            return 200, {
+                "number": number,
+                "url": f"{self.repo_url(name)}/issues/{number}",
+            }
+        match = re.match(r"^/commits/(.+)$", rest)
+        if match:
+            sha = docs.resolve(unquote(match.group(1)))
+            if sha is None:
+                return 404, {"message": "Not Found"}
+            return 200, {
+                "sha": sha,
+                "url": f"{self.repo_url(name)}/commits/{sha}",
+                "commit": {"tree": {"sha": docs.commits[sha]["tree"]}},
+            }
+        match = re.match(r"^/branches/(.+)$", rest)
+        if match:
+            branch = unquote(match.group(1))
+            if branch not in docs.refs:
+                return 404, {"message": "Branch not found"}
+            return 200, {"name": branch, "commit": {"sha": docs.refs[branch]}}
+        match = re.match(r"^/git/refs?/heads/(.+)$", rest)
+        if match:
+            branch = unquote(match.group(1))
+            if branch not in docs.refs:
+                return 404, {"message": "Not Found"}
+            if method == "PATCH":
+                docs.refs[branch] = body["sha"]
+            return 200, self.ref_json(name, branch)
+        if rest == "/git/refs" and method == "POST":
+            branch = body["ref"].removeprefix("refs/heads/")
+            docs.refs[branch] = body["sha"]
+            return 201, self.ref_json(name, branch)
+        match = re.match(r"^/git/commits(?:/([0-9a-f]{40}))?$", rest)
+        if match:
+            if method == "POST":
+                sha = docs.make_commit(body["tree"], body["parents"], body["message"])
+            else:
+                sha = match.group(1)
+            return (201 if method == "POST" else 200), self.commit_json(name, sha)
+        match = re.match(r"^/git/trees(?:/([0-9a-f]{40}))?$", rest)
+        if match:
+            if method == "POST":
+                entries = (
+                    dict(docs.trees[body["base_tree"]]) if body.get("base_tree") else {}
+                )
+                for element in body["tree"]:
+                    if "content" in element:
+                        blob = docs.add_blob(element["content"])
+                        entries[element["path"]] = (element["mode"], blob)
+                    elif element.get("sha") is None:
+                        entries.pop(element["path"], None)
+                    else:
+                        entries[element["path"]] = (element["mode"], element["sha"])
+                sha = docs.make_tree(entries)
+            else:
+                sha = match.group(1)
+            return (201 if method == "POST" else 200), {
+                "sha": sha,
+                "url": f"{self.repo_url(name)}/git/trees/{sha}",
+                "tree": docs.tree_listing(sha),
+                "truncated": False,
+            }
+        match = re.match(r"^/git/blobs/([0-9a-f]{40})$", rest)
+        if match:
+            content = docs.blobs[match.group(1)].encode("utf-8")
+            return 200, {
+                "sha": match.group(1),
+                "content": base64.b64encode(content).decode("ascii"),
+                "encoding": "base64",
+                "size": len(content),
+            }
+        return 404, {"message": "Not Found"}
+
+
+class _GitHubHandler(_JSONHandler):
+    def _dispatch(self):
+        url = urlparse(self.path)
+        body = self.read_json() if self.command in ("POST", "PATCH") else {}
+        route = _NUMBER_RE.sub("/{n}", _SHA_RE.sub("/{sha}", url.path))
+        with self.server.lock:
+            status, data = self.server.handle(
+                self.command, url.path, parse_qs(url.query), body
+            )
+            # Conditional GETs like GitHub's: a matching If-None-Match gets
+            # an empty 304 Not Modified.
+            headers = {}
+            if self.command == "GET" and status == 200:
+                digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode())
+                headers["ETag"] = f'"{digest.hexdigest()[:40]}"'
+                if self.headers.get("If-None-Match") == headers["ETag"]:
+                    status = 304
+            suffix = " (304)" if status == 304 else ""
+            self.server.calls[f"{self.command} {route}{suffix}"] += 1
+        self.send_json(status, data, headers)
+
+    do_GET = do_POST = do_PATCH = _dispatch
+
+
+# -- Synthetic inputs ---------------------------------------------------------
+
+
+def make_doc_corpus(pages, page_words, symbols):
+    """{path: content} of a VitePress site with pages spread over sections."""
+    files = {
+        ".vitepress/config.ts": "export default { themeConfig: { sidebar: [] } }\n"
+    }
+    sections = max(1, int(pages**0.5))
+    for i in range(pages):
+        section = f"section-{i % sections}"
+        symbol = f"bench_option_{i % symbols}"
+        body = "\n\n".join(
+            synthetic_text(page_words // 4, f"{i}-{part}") for part in range(4)
+        )
+        files[f"{DOC_PATH}/{section}/page-{i}.md"] = (
+            f"# Page {i}\n\nConfigure `{symbol}` to change this behaviour. "
+            f"See [the next page](./page-{i + sections}.md).\n\n"
+            f"## Details\n\n{body}\n\n## Options\n\n- `{symbol}`: "
+            f"{synthetic_text(12, i)}\n"
+        )
+    return files
+
+
+def make_source_repo(directory, diff_files, symbols, change="defaults"):
+    """Create a git repo with a PR head ref; return (clone path, head sha).
+
+    The PR changes the documented option defaults, or with change="private"
+    only the bodies of private helpers, which leaves the public API and every
+    documented function as it is.
+    """
+    upstream = os.path.join(directory, "upstream")
+    clone = os.path.join(directory, "clone")
+
+    def git(*cmd, cwd=upstream):
+        return subprocess.run(
+            ["git", *cmd], cwd=cwd, check=True, capture_output=True, text=True
+        ).stdout.strip()
+
+    os.makedirs(os.path.join(upstream, "src"))
+    git("init", "-q", "-b", "main")
+    git("config", "user.email", "bench@example.invalid")
+    git("config", "user.name", "bench")
+
+    def write_sources(version, default):
+        for f in range(diff_files):
+            lines = []
+            for s in range(f, symbols, diff_files):
+                lines += [
+                    f"def bench_option_{s}(value={default}):",
+                    f'    """Handle bench_option_{s}."""',
+                    f"    return _scale_{s}(value)",
+                    "",
+                    "",
+                    f"def _scale_{s}(value):",
+                    f"    return value * {version}",
+                    "",
+                ]
+            with open(os.path.join(upstream, "src", f"module_{f}.py"), "w") as out:
+                out.write("\n".join(lines))
+
+    write_sources(1, 1)
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+    git("checkout", "-q", "-b", "feature")
+    write_sources(2, 1 if change == "private" else 2)
+    git("commit", "-q", "-am", f"change {change}")
+    head = git("rev-parse", "HEAD")
+    git("update-ref", f"refs/pull/{PR_NUMBER}/head", head)
+    git("checkout", "-q", "main")
+    git("clone", "-q", upstream, clone, cwd=directory)
+    return clone, head
+
+
+# -- Runner -------------------------------------------------------------------
+
+
+def serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def run_scenario(pages, options):
+    """Run the updater once against fresh fakes; return its measurements."""
+    with tempfile.TemporaryDirectory(prefix="llm-doc-bench-") as directory:
+        clone, head_sha = make_source_repo(
+            directory, options.diff_files, options.symbols, options.source_change
+        )
+        doc_files = make_doc_corpus(pages, options.page_words, options.symbols)
+        openai_server = serve(FakeOpenAIServer(options))
+        github_server = serve(FakeGitHubServer(doc_files, "main", head_sha))
+        try:
+            report_path = os.path.join(directory, "report.json")
+            env = {
+                **os.environ,
+                "GH_TOKEN": "bench",
+                "OPENAI_API_KEY": "bench",
+                "OPENAI_BASE_URL": (
+                    f"http://127.0.0.1:{openai_server.server_address[1]}/v1"
+                ),
+                "GITHUB_API_URL": github_server.url,
+                "LLM_REPORT_PATH": report_path,
+                "LLM_CACHE_DIR": options.cache_dir,
+                "GITHUB_STEP_SUMMARY": "",
+            }
+            command = [
+                sys.executable,
+                os.path.join(SCRIPT_DIR, "llm_doc_updater.py"),
+                "--source-pr",
+                str(PR_NUMBER),
+                "--source-repo",
+                SOURCE_REPO,
+                "--doc-repo",
+                DOC_REPO,
+                "--doc-path",
+                DOC_PATH,
+                "--repo-path",
+                clone,
+                *options.updater_args,
+            ]
+            with open(os.path.join(directory, "updater.log"), "w+") as log:
+                start = time.monotonic()
+                process = subprocess.Popen(
+                    command, env=env, stdout=log, stderr=subprocess.STDOUT
+                )
+                try:
+                    _, status, usage = os.wait4(process.pid, 0)
+                except BaseException:
+                    # E.g. Ctrl-C: do not leave the updater running.
+                    process.kill()
+                    process.wait()
+                    raise
+                elapsed = time.monotonic() - start
+                log.seek(0)
+                output = log.read()
+        finally:
+            for server in (openai_server, github_server):
+                server.shutdown()
+                server.server_close()
+        exit_code = os.waitstatus_to_exitcode(status)
+        if exit_code != 0 or options.verbose:
+            print(output)
+        try:
+            with open(report_path, encoding="utf-8") as f:
+                run_report = json.load(f)
+        except (OSError, ValueError):
+            run_report = None
+        return {
+            "pages": pages,
+            "exit_code": exit_code,
+            "seconds": round(elapsed, 3),
+            # ru_maxrss is in KiB on Linux (bytes on macOS).
+            "peak_rss_mb": round(
+                usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1
+            ),
+            "openai_calls": dict(openai_server.calls),
+            "github_calls": dict(github_server.calls),
+            "run_report": run_report,
+        }
+
+
+def print_table(results):
+    print(
+        f"{'pages':>6} {'exit':>4} {'seconds':>8} {'peak MB':>8} "
+        f"{'LLM calls':>9} {'GitHub calls':>12}"
+    )
+    for r in results:
+        print(
+            f"{r['pages']:>6} {r['exit_code']:>4} {r['seconds']:>8.2f} "
+            f"{r['peak_rss_mb']:>8.1f} {sum(r['openai_calls'].values()):>9} "
+            f"{sum(r['github_calls'].values()):>12}"
+        )
+    for r in results:
+        print(f"\n{r['pages']} pages")
+        print(
+            "  LLM calls:    "
+            + ", ".join(f"{k}={v}" for k, v in sorted(r["openai_calls"].items()))
+        )
+        for route, count in sorted(r["github_calls"].items()):
+            print(f"  {count:>5}  {route}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the doc updater against local fake services."
+    )
+    parser.add_argument(
+        "--pages", default="10,100,1000", help="Comma-separated corpus sizes."
+    )
+    parser.add_argument("--page-words", type=int, default=400)
+    parser.add_argument(
+        "--symbols", type=int, default=50, help="Distinct option names in the docs."
+    )
+    parser.add_argument(
+        "--diff-files", type=int, default=5, help="Source files changed by the PR."
+    )
+    parser.add_argument(
+        "--source-change",
+        choices=("defaults", "private"),
+        default="defaults",
+        help="What the PR changes: documented option defaults, or only "
+        "private helpers (exercises the updater's no-model fast exit; pass "
+        "-- --fast-exit).",
+    )
+    parser.add_argument(
+        "--relevant-fraction",
+        type=float,
+        default=0.1,
+        help="Share of pages the fake model says need an update.",
+    )
+    parser.add_argument(
+        "--unsure-fraction",
+        type=float,
+        default=0.1,
+        help="Share of pages the fake model is unsure about: answered unsure "
+        "(with --escalation-model) or scored near 0.5 (scored triage).",
+    )
+    parser.add_argument(
+        "--unchanged-fraction",
+        type=float,
+        default=0.3,
+        help="Share of page updates the fake model answers with no changes.",
+    )
+    parser.add_argument("--new-pages", type=int, default=1)
+    parser.add_argument("--page-tokens", type=int, default=600)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument(
+        "--output-tps", type=float, default=200, help="Completion tokens per second."
+    )
+    parser.add_argument(
+        "--input-tps",
+        type=float,
+        default=0,
+        help="Prompt tokens per second; 0 makes prompt size free.",
+    )
+    parser.add_argument("--output", help="Write all measurements here as JSON.")
+    parser.add_argument(
+        "--cache-dir",
+        default="",
+        help="Updater disk cache (LLM_CACHE_DIR) kept across runs, to measure "
+        "repeat runs; empty starts every run cold.",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Print updater logs.")
+    parser.add_argument(
+        "updater_args",
+        nargs=argparse.REMAINDER,
+        help="Extra updater flags after --, e.g. -- --triage-mode batched",
+    )
+    options = parser.parse_args()
+    options.updater_args = [a for a in options.updater_args if a != "--"]
+
+    results = []
+    for pages in (int(p) for p in options.pages.split(",")):
+        print(f"Running scenario with {pages} page(s)...")
+        results.append(run_scenario(pages, options))
+    print()
+    print_table(results)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if any(r["exit_code"] != 0 for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
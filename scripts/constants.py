@@ -1,15 +1,117 @@
 import os
 
 # Configuration
-MAX_DIFF_CHARS = 40000
-MAX_DOC_CONTEXT_CHARS = 50000
+# Per-section prompt budgets, in tokens. Each section is trimmed on structural
+# boundaries (files/hunks, Markdown sections, lines) to the smaller of its cap
+# and its share of the model's context window (see token_budget.py).
+MAX_DIFF_TOKENS = int(os.environ.get("LLM_MAX_DIFF_TOKENS", "10000"))
+MAX_DOC_CONTEXT_TOKENS = int(os.environ.get("LLM_MAX_DOC_CONTEXT_TOKENS", "12500"))
+MAX_PR_DESCRIPTION_TOKENS = 2000
 OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o")
+# Model routing: each stage runs on LLM_<STAGE>_MODEL (e.g. LLM_TRIAGE_MODEL),
+# defaulting to OPENAI_MODEL, so cheap yes/no triage can use a small model and
+# writing a strong one. With LLM_ESCALATION_MODEL set, triage may answer
+# "unsure" and those pages are asked again on the escalation model.
+MODEL_STAGES = ("notes", "triage", "propose", "update", "create", "config", "summary")
+STAGE_MODELS = {
+    stage: os.environ.get(f"LLM_{stage.upper()}_MODEL") or OPENAI_MODEL
+    for stage in MODEL_STAGES
+}
+ESCALATION_MODEL = os.environ.get("LLM_ESCALATION_MODEL", "")
 OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL")
+# Set by Actions runners; differs from the default on GitHub Enterprise Server.
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL") or "https://api.github.com"
+# Shared HTTP transport: one pooled keep-alive client per service for the run.
+# HTTP_MAX_CONNECTIONS caps connections per host (model endpoint, GitHub API);
+# 0 sizes the pools to MAX_CONCURRENCY. HTTP/2 is used for the model endpoint
+# when the h2 package is installed and LLM_HTTP2 is not "false".
+HTTP_MAX_CONNECTIONS = int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", "0"))
+HTTP_KEEPALIVE_SECONDS = float(os.environ.get("LLM_HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP2 = os.environ.get("LLM_HTTP2", "true").lower() != "false"
+# PyGithub spaces GitHub API requests out (seconds between any two requests and
+# between writes); 0 disables. The defaults are PyGithub's own.
+GITHUB_REQUEST_INTERVAL = float(os.environ.get("LLM_GITHUB_REQUEST_INTERVAL", "0.25"))
+GITHUB_WRITE_INTERVAL = float(os.environ.get("LLM_GITHUB_WRITE_INTERVAL", "1.0"))
 PR_BRANCH_PREFIX = "doc-update-pr"
+# Hidden marker in the doc PR body recording the last processed source head, so
+# follow-up rounds only diff the commits pushed since then.
+SOURCE_HEAD_MARKER = "<!-- llm-doc-updater:source-head={sha} -->"
+INCREMENTAL_ROUNDS = os.environ.get("LLM_INCREMENTAL", "true").lower() != "false"
+# How the source repo is fetched for the diff: "full" expects a full-history
+# checkout; "shallow" fetches only the base and head commits without blobs
+# (partial clone), lets `git diff` download just the blobs it compares, and
+# deepens the head's history only as far as an incremental round needs, up to
+# SHALLOW_MAX_DEPTH commits. Both produce the same diff.
+GIT_FETCH_MODE = os.environ.get("LLM_GIT_FETCH_MODE", "full")
+SHALLOW_MAX_DEPTH = 1024
 # Upper bound on brand-new pages proposed per run, to cap runaway creation.
 MAX_NEW_DOCS = 5
+# Upper bound on model requests in flight at once. Calls are I/O-bound, so a
+# small thread pool turns N sequential round-trips into ~N/MAX_CONCURRENCY.
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+# Optional cap on model requests started per minute across the whole run, for
+# endpoints with tight rate limits. 0 disables rate limiting.
+MAX_REQUESTS_PER_MINUTE = int(os.environ.get("LLM_MAX_REQUESTS_PER_MINUTE", "0"))
+# Triage strategy: "per-page" asks once per page; "batched" packs as many pages
+# as fit into TRIAGE_BATCH_TOKENS per request so the diff is sent only once;
+# "scored" asks per page for a single YES/NO token with its log-probabilities.
+TRIAGE_MODE = os.environ.get("LLM_TRIAGE_MODE", "per-page")
+TRIAGE_BATCH_TOKENS = int(os.environ.get("LLM_TRIAGE_BATCH_TOKENS", "60000"))
+# Scored triage ranks pages by P(YES) and updates those scoring at least
+# TRIAGE_SCORE_THRESHOLD, at most TRIAGE_SCORE_TOP_K of them (0: no cap).
+# With an escalation model, scores within TRIAGE_SCORE_MARGIN of the
+# threshold are scored again on that model.
+TRIAGE_SCORE_THRESHOLD = float(os.environ.get("LLM_TRIAGE_SCORE_THRESHOLD", "0.5"))
+TRIAGE_SCORE_TOP_K = int(os.environ.get("LLM_TRIAGE_SCORE_TOP_K", "0"))
+TRIAGE_SCORE_MARGIN = 0.25
+TRIAGE_TOP_LOGPROBS = 5
+# Diffs longer than MAX_DIFF_TOKENS are split on file/hunk boundaries into chunks
+# of about DIFF_CHUNK_TOKENS, condensed into change notes concurrently, and the
+# notes replace the diff in later prompts. 0 falls back to plain truncation.
+DIFF_CHUNK_TOKENS = int(os.environ.get("LLM_DIFF_CHUNK_TOKENS", "8000"))
+# Diff preprocessing before any model call: drop lockfiles, generated, minified
+# and binary files and whitespace-, rename- or mode-only changes, and cut the
+# function context of files whose diff exceeds DIFF_HUGE_FILE_TOKENS (0 keeps
+# it) to 3 lines.
+DIFF_PREPROCESS = os.environ.get("LLM_DIFF_PREPROCESS", "true").lower() != "false"
+DIFF_HUGE_FILE_TOKENS = int(os.environ.get("LLM_DIFF_HUGE_FILE_TOKENS", "4000"))
+# Parsed summary of the public API changes (signatures, exports, CLI options,
+# env vars, config keys) of the changed files: "prepend" puts it before the diff
+# in every prompt, "triage" also sends it instead of the diff to triage, "off".
+API_SUMMARY = os.environ.get("LLM_API_SUMMARY", "prepend")
+# Skip all model calls when a local check finds no public API, config or CLI
+# change and no changed symbol, function or file that the docs mention. Off by
+# default: the check cannot see behaviour that the docs describe in prose only.
+FAST_EXIT = os.environ.get("LLM_FAST_EXIT", "false").lower() == "true"
+# Local BM25 pre-filter: only the PREFILTER_TOP_K pages most lexically related
+# to the diff (and scoring at least PREFILTER_MIN_SCORE) go to LLM triage.
+# 0 disables the pre-filter.
+PREFILTER_TOP_K = int(os.environ.get("LLM_PREFILTER_TOP_K", "0"))
+PREFILTER_MIN_SCORE = float(os.environ.get("LLM_PREFILTER_MIN_SCORE", "0"))
+# Pages that mention a symbol whose definition the diff adds, renames or removes
+# go straight to the update step without a triage call. Symbols mentioned on more pages than
+# this are left to triage; 0 disables symbol matching.
+SYMBOL_MATCH_MAX_PAGES = int(os.environ.get("LLM_SYMBOL_MATCH_MAX_PAGES", "10"))
+# Persistent model-response cache, so repeated /documentation rounds only pay
+# for pages whose prompt actually changed. An empty directory disables it.
+CACHE_DIR = os.environ.get("LLM_CACHE_DIR", "")
+CACHE_MAX_MB = int(os.environ.get("LLM_CACHE_MAX_MB", "200"))
+# Where to write the per-stage timing/token/cost report as JSON; empty skips
+# it. The Markdown version always goes to $GITHUB_STEP_SUMMARY when set.
+REPORT_PATH = os.environ.get("LLM_REPORT_PATH", "")
+# Stream page generation so an answer that is already decided (a marker) stops
+# the model early, and cap each page's output so runaway generations are cut.
+STREAM_GENERATION = os.environ.get("LLM_STREAM_GENERATION", "false").lower() == "true"
+MAX_PAGE_OUTPUT_TOKENS = int(os.environ.get("LLM_MAX_PAGE_OUTPUT_TOKENS", "8000"))
 # Sentinel the update model returns when a doc file should be deleted entirely.
 DELETE_FILE_MARKER = "__DELETE_FILE__"
+# Sentinel the update model returns when a doc file needs no changes, so it
+# does not have to repeat the whole page.
+NO_CHANGES_MARKER = "__NO_CHANGES__"
+# How pages are updated: "rewrite" asks the model for the whole page; "patch"
+# asks for section-addressed edits applied locally, falling back to a rewrite
+# for pages whose edits do not apply cleanly.
+UPDATE_MODE = os.environ.get("LLM_UPDATE_MODE", "rewrite")
 DIFF_FILTER_PATTERNS: list[str] = [
     "**/*.py",
     "**/*.ts",
@@ -21,6 +123,11 @@ DIFF_FILTER_PATTERNS: list[str] = [
     ".env.example",
 ]
 
+# Prompt layout: every user prompt below starts with static instructions, then
+# the inputs shared by all calls of a stage (custom instructions, PR
+# description, diff), and ends with the per-page data. Consecutive calls thus
+# share a byte-identical prefix that the provider's prompt cache can reuse.
+
 # Optional user-supplied instructions block. Rendered empty when no custom
 # instructions were passed via the /documentation command.
 CUSTOM_INSTRUCTIONS_TEMPLATE = """
@@ -34,13 +141,19 @@ TRIAGE_SYSTEM_PROMPT = (
     "change requires an update to a specific documentation file. Answer "
     'precisely with only "YES" or "NO".'
 )
-TRIAGE_USER_PROMPT_TEMPLATE = """
-You are a technical documentation assistant.
-I have a git diff from a code PR and a markdown documentation file.
-Determine if the changes in the code require an update to this specific documentation file.
-{custom_instructions_section}
-
-Conditions for documentation updates:
+# Variant used when low-confidence verdicts are escalated to a larger model.
+TRIAGE_UNSURE_SYSTEM_PROMPT = (
+    "You are a technical documentation assistant. You decide whether a code "
+    "change requires an update to a specific documentation file. Answer "
+    'precisely with only "YES", "NO" or "UNSURE".'
+)
+TRIAGE_ANSWER = 'Answer with just "YES" or "NO".'
+TRIAGE_ANSWER_UNSURE = (
+    'Answer with just "YES" or "NO", or "UNSURE" if the diff and the file do '
+    "not let you decide with confidence."
+)
+# Shared triage criteria, used by both the per-page and the batched prompts.
+TRIAGE_CRITERIA = """Conditions for documentation updates:
 1. New functionality in the diff that is not documented
 2. Removed functionality in the diff that is documented and should be removed
 3. Updated functionality in the diff that is now outdated in the documentation
@@ -60,7 +173,17 @@ If the file is a VitePress config file, check if the sidebar navigation needs to
 - New documentation pages being added that should appear in the sidebar
 - Existing pages being removed or renamed that are referenced in the sidebar
 - Reorganization of documentation structure requiring sidebar updates
+"""
+TRIAGE_USER_PROMPT_TEMPLATE = (
+    """
+You are a technical documentation assistant.
+I have a git diff from a code PR and a markdown documentation file.
+Determine if the changes in the code require an update to this specific documentation file.
+{custom_instructions_section}
 
+"""
+    + TRIAGE_CRITERIA
+    + """
 PR Description:
 {pr_description}
 
@@ -71,44 +194,97 @@ Documentation File ({path}):
 {content}
 
 Does this specific documentation file need to be updated?
-Answer with just "YES" or "NO".
+{answer_instruction}
 """
+)
 
-# Update Prompts
-UPDATE_SYSTEM_PROMPT = "You are an expert Technical Writer and Software Engineer specialized in VitePress documentation. Your task is to synchronize a specific Markdown file with recent code changes while leveraging VitePress-specific features for a premium developer experience."
-UPDATE_USER_PROMPT_TEMPLATE = """
-Role
-You are an expert Technical Writer and Software Engineer specialized in VitePress documentation. Your task is to update a specific Markdown file to reflect recent code changes.
+# Batched Triage Prompts
+# One request covers several pages; the diff and PR description are sent once.
+TRIAGE_BATCH_SYSTEM_PROMPT = (
+    "You are a technical documentation assistant. You decide, for each of "
+    "several documentation files, whether a code change requires an update "
+    "to that file. You respond only with JSON."
+)
+TRIAGE_BATCH_USER_PROMPT_TEMPLATE = (
+    """
+You are a technical documentation assistant.
+I have a git diff from a code PR and several markdown documentation files.
+For EACH file, determine independently whether the changes in the code require an update to that specific file.
+{custom_instructions_section}
 
-Input Data:
-1. Target File to Update: {target_path}
-2. Current Content of {target_path}:
----
-{target_content}
----
-3. PR Description:
+"""
+    + TRIAGE_CRITERIA
+    + """
+Where the conditions above say to answer "YES", set "update" to true for that file; otherwise set it to false.
+
+PR Description:
 {pr_description}
 
-4. Git Diff (Code Changes):
+Git Diff:
 {diff_text}
 
-5. Ambient Context (Other files being updated in this session):
-{ambient_context}
-{custom_instructions_section}
+Documentation Files:
+{files_section}
 
+Return ONLY a JSON array (no prose, no code fences) with exactly one element per file above:
+{{"path": "<file path exactly as shown>", "update": {update_values}}}
+"""
+)
+TRIAGE_BATCH_UPDATE = "true or false"
+TRIAGE_BATCH_UPDATE_UNSURE = (
+    'true, false, or "unsure" if you cannot decide with confidence'
+)
+TRIAGE_BATCH_FILE_TEMPLATE = """
+--- FILE: {path} ---
+{content}
+--- END FILE: {path} ---
+"""
+
+# Diff Map-Reduce Prompts
+# Condense one chunk of an oversized diff into compact change notes.
+DIFF_NOTES_SYSTEM_PROMPT = (
+    "You are a senior software engineer summarizing part of a code change for "
+    "documentation writers. You write terse, factual change notes."
+)
+DIFF_NOTES_USER_PROMPT_TEMPLATE = """
+Below is part {chunk_index} of {chunk_count} of a git diff from a code PR.
+
+Write compact change notes for THIS part only:
+- One bullet per developer-facing change: public API, function/class signatures, CLI commands and flags, configuration keys, environment variables, defaults, installation steps, or observable behavior.
+- Quote identifiers, flags, keys and signatures exactly as they appear in the code, with the file path.
+- State whether each item was added, removed, renamed or changed (include old and new values).
+- Mention internal refactors, tests and private helpers in at most one summary bullet.
+- If this part has no developer-facing changes, answer exactly: No developer-facing changes.
+- No preamble.
+
+PR Description:
+{pr_description}
+
+Git Diff (part {chunk_index} of {chunk_count}):
+{diff_chunk}
+"""
+DIFF_NOTES_HEADER = (
+    "The full diff was too large to include verbatim. Below are change notes "
+    "that summarize every part of it, in order.\n"
+)
+
+# Update Prompts
+UPDATE_SYSTEM_PROMPT = "You are an expert Technical Writer and Software Engineer specialized in VitePress documentation. Your task is to synchronize a specific Markdown file with recent code changes while leveraging VitePress-specific features for a premium developer experience."
+# Guidance shared by the whole-file (rewrite) and patch update prompts.
+UPDATE_GUIDELINES = """
 Objectives:
 1. Visibility Filtering:
 - Focus exclusively on changes affecting the public API, configuration, installation, or behavior.
 - Ignore internal refactors or private logic that doesn't alter the external interface.
 
-2. Update Logic for {target_path}:
+2. Update Logic for the target file:
 - Handle Removals: If functionality is removed in the diff, delete the corresponding documentation.
 - Handle Changes: Update behavior, signatures, or configuration to reflect the current state.
 - Handle Additions: Add new public-facing features or parameters if they belong in this specific file.
 - Handle Whole-File Deletion: If this entire file should no longer exist (the functionality it documents was fully removed, or the User Instructions explicitly request deleting it), respond with exactly `__DELETE_FILE__` and nothing else.
-- PREVENT DUPLICATION: Use the 'Ambient Context' to see what other files are being updated. If a change more naturally belongs in one of those files, do NOT document it here.
+- PREVENT DUPLICATION: Use the 'Ambient Context' to see which existing pages already cover a topic. If a change more naturally belongs on one of those pages, link to it instead of documenting it again here.
 - Preserve unrelated content and tone.
-- Iterative Updates: The current content may already include changes from earlier automated update rounds on an open documentation PR. Apply the User Instructions and code changes ON TOP of the current content; do not undo earlier changes unless instructed. If the file already fully reflects everything, return the current content unchanged.
+- Iterative Updates: The current content may already include changes from earlier automated update rounds on an open documentation PR. Apply the User Instructions and code changes ON TOP of the current content; do not undo earlier changes unless instructed. If the file already fully reflects everything, respond with exactly `__NO_CHANGES__` and nothing else.
 
 VitePress Guidelines:
 - Preserve Frontmatter.
@@ -131,8 +307,35 @@ Update the sidebar when:
 Preserve the existing TypeScript structure and only modify the sidebar/nav sections as needed.
 The config.ts file must remain a TypeScript file. Do not wrap the content inside markdown.
 
-Constraints:
-- Return ONLY the full, updated content for {target_path}.
+"""
+UPDATE_INPUT_DATA = """
+Input Data:
+1. PR Description:
+{pr_description}
+
+2. Git Diff (Code Changes):
+{diff_text}
+
+3. Ambient Context (existing documentation pages, for style and cross-references):
+{ambient_context}
+
+4. Target File to Update: {target_path}
+{symbol_hits_section}
+5. Current Content of {target_path}:
+---
+{target_content}
+---
+
+"""
+UPDATE_USER_PROMPT_TEMPLATE = (
+    """
+Role
+You are an expert Technical Writer and Software Engineer specialized in VitePress documentation. Your task is to update a specific Markdown file (the target file) to reflect recent code changes. The shared inputs (PR description and git diff) come first; the target file, its current content and the ambient context are at the end.
+{custom_instructions_section}
+"""
+    + UPDATE_GUIDELINES
+    + """Constraints:
+- Return ONLY the full, updated content for the target file.
 - No JSON, no preamble, no meta-commentary, no triple-backtick wrappers around the whole response.
 - Just the raw file content.
 - For Markdown files: Strictly follow VitePress-flavored Markdown. Ensure all code blocks are wrapped in triple backticks (```).
@@ -141,10 +344,46 @@ Constraints:
 - No Speculation: Only document what is explicitly supported by the code changes in the diff.
 - No Meta-Commentary: The response must not contain explanations, reasoning, or "I have updated the files..." messages.
 - Pure Output: The output must be the updated content of the files only.
-
----
+"""
+    + UPDATE_INPUT_DATA
+    + """---
 Provide the full updated content for {target_path}:
 """
+)
+
+# Patch Prompts
+# Patch mode asks for targeted edits addressed by heading path instead of the
+# whole page; they are applied locally (md_patch.py), and pages whose edits do
+# not apply cleanly fall back to the whole-file prompt above.
+PATCH_SYSTEM_PROMPT = "You are an expert Technical Writer and Software Engineer specialized in VitePress documentation. Your task is to synchronize a specific Markdown file with recent code changes by returning precise, minimal edits to it."
+PATCH_USER_PROMPT_TEMPLATE = (
+    """
+Role
+You are an expert Technical Writer and Software Engineer specialized in VitePress documentation. Your task is to update a specific Markdown file (the target file) to reflect recent code changes by returning a list of edits, not the whole file. The shared inputs (PR description and git diff) come first; the target file, its current content and the ambient context are at the end.
+{custom_instructions_section}
+"""
+    + UPDATE_GUIDELINES
+    + """Edit Format:
+- Return ONLY a JSON array of edits, no preamble and no triple-backtick wrappers. Each edit is an object:
+  {{"section": "Heading > Subheading", "find": "exact text", "replace": "new text"}}
+- "section" is the heading path of the section the edit applies to (heading texts without the leading #, outermost first, separated by " > "; the innermost heading alone is enough when it is unique). Use "" for text before the first heading or for the whole file.
+- "find" must be copied verbatim from the current content (same whitespace, backticks and Markdown syntax) and must occur exactly once within that section. Keep it short: a line or paragraph is usually enough.
+- "replace" is the new text for "find". Use "" to delete it. To insert, include a neighbouring line in "find" and repeat it in "replace" next to the new text.
+- To add content at the end of a section (e.g. a new subsection), use "find": "" and put the new Markdown in "replace".
+- Edits are applied in order; a later edit sees the result of earlier ones.
+- Instead of an array, respond with exactly `__DELETE_FILE__` or `__NO_CHANGES__` for the cases described above.
+
+Constraints:
+- Strictly follow VitePress-flavored Markdown in "replace". Ensure all code blocks are wrapped in triple backticks (```).
+- Preserve Symbols: Do NOT remove backticks (`) or any other syntax-specific characters. All code examples must remain inside their respective code blocks.
+- No Speculation: Only document what is explicitly supported by the code changes in the diff.
+- No Meta-Commentary: The response must contain only the JSON array (or a marker).
+"""
+    + UPDATE_INPUT_DATA
+    + """---
+Provide the JSON array of edits for {target_path}:
+"""
+)
 
 # Summary Prompts (posted back as a comment on the source PR)
 SUMMARY_SYSTEM_PROMPT = (
@@ -233,36 +472,38 @@ CREATE_DOC_SYSTEM_PROMPT = (
 CREATE_DOC_USER_PROMPT_TEMPLATE = """
 Role
 You are an expert Technical Writer specialized in VitePress documentation.
-Write a brand-new documentation page.
-
-New Page Path: {target_path}
-Intended Page Title: {title}
-Why this page exists: {reason}
-
-PR Description:
-{pr_description}
-
-Git Diff (Code Changes):
-{diff_text}
-
-Ambient Context (existing documentation pages, for style and cross-references):
-{ambient_context}
+Write a brand-new documentation page. The shared inputs (PR description, git
+diff and existing pages) come first; the new page's path, title and purpose are
+at the end.
 {custom_instructions_section}
 
 Objectives:
 - Document ONLY the public-facing functionality introduced by the diff that
   belongs on this page. Do not speculate beyond the code changes.
-- Match the tone, structure, and conventions of the existing pages shown above.
+- Match the tone, structure, and conventions of the existing pages shown below.
 - Start with a VitePress frontmatter block only if existing pages use one;
-  otherwise start with a top-level "# {title}" heading.
+  otherwise start with a top-level "# <Intended Page Title>" heading.
 - Use VitePress-flavored Markdown: custom containers (::: info, ::: tip), code
   groups, and fenced code blocks with language tags.
 - Do NOT add skill frontmatter (skillName/skillDescription/skillParent).
 
 Constraints:
-- Return ONLY the raw Markdown content for {target_path}.
+- Return ONLY the raw Markdown content for the new page.
 - No preamble, no meta-commentary, no triple-backtick wrapper around the whole response.
 
+PR Description:
+{pr_description}
+
+Git Diff (Code Changes):
+{diff_text}
+
+Ambient Context (existing documentation pages, for style and cross-references):
+{ambient_context}
+
+New Page Path: {target_path}
+Intended Page Title: {title}
+Why this page exists: {reason}
+
 Provide the full content for {target_path}:
 """
 
@@ -277,24 +518,12 @@ CONFIG_UPDATE_SYSTEM_PROMPT = (
 CONFIG_UPDATE_USER_PROMPT_TEMPLATE = """
 Role
 You maintain the navigation of a VitePress documentation site by editing its
-config file.
-
-Config File Path: {config_path}
-Current Config Content:
----
-{config_content}
----
-
-{new_docs_section}
-PR Description:
-{pr_description}
-
-Git Diff (Code Changes):
-{diff_text}
+config file. The shared inputs (PR description and git diff) come first; the
+newly created pages and the current config are at the end.
 {custom_instructions_section}
 
 Objectives:
-- Add sidebar/nav entries for the newly created pages listed above (if any),
+- Add sidebar/nav entries for the newly created pages listed below (if any),
   placing them in the most sensible existing section. Infer the correct link
   format (base path, no ".md" extension, leading slash) from the existing
   entries in this config.
@@ -307,5 +536,18 @@ Constraints:
 - The file must remain valid TypeScript. Do NOT wrap the content in markdown.
 - Return ONLY the raw TypeScript file content. No markdown fences, no preamble.
 
+PR Description:
+{pr_description}
+
+Git Diff (Code Changes):
+{diff_text}
+
+{new_docs_section}
+Config File Path: {config_path}
+Current Config Content:
+---
+{config_content}
+---
+
 Provide the full updated content for {config_path}:
 """
@@ -0,0 +1,343 @@
+import fnmatch
+import posixpath
+import re
+from collections import defaultdict
+
+# Dependency lockfiles: machine-written and never documentation-relevant.
+LOCKFILE_NAMES = frozenset(
+    """
+    package-lock.json npm-shrinkwrap.json yarn.lock pnpm-lock.yaml bun.lock
+    bun.lockb poetry.lock Pipfile.lock uv.lock pdm.lock composer.lock
+    Gemfile.lock Cargo.lock go.sum flake.lock
+    """.split()
+)
+# Paths of generated files (specs, snapshots, bundles, protobuf stubs),
+# matched against "/" + the repo-relative path.
+GENERATED_PATTERNS = (
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*.snap",
+    "*/__snapshots__/*",
+    "*/generated/*",
+    "*/__generated__/*",
+    "*.generated.*",
+    "*.gen.ts",
+    "*_pb2.py",
+    "*_pb2.pyi",
+    "*.pb.ts",
+    "*/openapi*.json",
+    "*/openapi*.yaml",
+    "*/swagger*.json",
+    "*/dist/*",
+)
+# Header comments code generators put at the top of the files they write.
+_GENERATED_MARKER_RE = re.compile(
+    r"@generated\b|\bauto-?generated\b|\bcode generated\b|\bdo not edit\b",
+    re.IGNORECASE,
+)
+_FILE_START_HUNK_RE = re.compile(r"^@@ -(?:0|1)(?:,\d+)? \+1(?:,\d+)? @@")
+# A script or stylesheet whose changed lines are mostly longer than this is a
+# minified bundle. Other files (soft-wrapped Markdown, long config values or
+# string constants) are kept whatever their line length.
+MINIFIED_LINE_CHARS = 1000
+MINIFIABLE_SUFFIXES = (".js", ".mjs", ".cjs", ".css")
+# Files whose leading indentation is syntax, so re-indenting is a change.
+INDENTATION_SIGNIFICANT_SUFFIXES = (".py", ".yml", ".yaml")
+# A quoted string on one line; an unterminated one runs to the end of the line.
+_STRING_LITERAL_RE = re.compile(
+    r"""("(?:\\.|[^"\\])*"?|'(?:\\.|[^'\\])*'?|`(?:\\.|[^`\\])*`?)"""
+)
+
+_FILE_HEADER_RE = re.compile(r"^diff --git ", re.MULTILINE)
+_HUNK_HEADER_RE = re.compile(r"^@@ ", re.MULTILINE)
+_DIFF_PATH_RE = re.compile(r"^diff --git a/(\S+) b/(\S+)")
+
+
+def split_diff_files(diff_text):
+    """Split `git diff` output into one section per file, in order."""
+    starts = [m.start() for m in _FILE_HEADER_RE.finditer(diff_text)]
+    if not starts:
+        return [diff_text] if diff_text.strip() else []
+    if starts[0] > 0 and diff_text[: starts[0]].strip():
+        starts.insert(0, 0)
+    ends = starts[1:] + [len(diff_text)]
+    return [diff_text[start:end] for start, end in zip(starts, ends)]
+
+
+def split_file_hunks(file_diff):
+    """Split one file's diff into (header, [hunks])."""
+    starts = [m.start() for m in _HUNK_HEADER_RE.finditer(file_diff)]
+    if not starts:
+        return file_diff, []
+    ends = starts[1:] + [len(file_diff)]
+    return file_diff[: starts[0]], [file_diff[s:e] for s, e in zip(starts, ends)]
+
+
+def diff_file_path(file_diff):
+    """Path of the file a diff section applies to (new path for renames)."""
+    match = _DIFF_PATH_RE.match(file_diff)
+    return match.group(2) if match else ""
+
+
+def diff_file_paths(file_diff):
+    """(old path, new path) of a diff section; "" for a missing side."""
+    match = _DIFF_PATH_RE.match(file_diff)
+    if not match:
+        return "", ""
+    old, new = match.groups()
+    if "\n--- /dev/null" in file_diff or "\nnew file mode" in file_diff:
+        old = ""
+    if "\n+++ /dev/null" in file_diff or "\ndeleted file mode" in file_diff:
+        new = ""
+    return old, new
+
+
+def _split_lines(text, max_tokens, count_tokens):
+    """Split text on line boundaries into pieces of at most max_tokens."""
+    pieces, current = [], ""
+    for line in text.splitlines(keepends=True):
+        if current and count_tokens(current + line) > max_tokens:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_diff(diff_text, max_tokens, count_tokens):
+    """Pack a diff into chunks of at most ~max_tokens, on structural boundaries.
+
+    Whole files are kept together when they fit; larger files are split on
+    hunk boundaries (each piece re-prefixed with the file header), and only a
+    single oversized hunk is split on line boundaries.
+    """
+    units = []
+    for file_diff in split_diff_files(diff_text):
+        if count_tokens(file_diff) <= max_tokens:
+            units.append(file_diff)
+            continue
+        header, hunks = split_file_hunks(file_diff)
+        body_budget = max(max_tokens - count_tokens(header), 1)
+        for hunk in hunks or [file_diff[len(header) :]]:
+            if count_tokens(hunk) <= body_budget:
+                units.append(header + hunk)
+            else:
+                units.extend(
+                    header + piece
+                    for piece in _split_lines(hunk, body_budget, count_tokens)
+                )
+
+    chunks, current = [], ""
+    for unit in units:
+        if current and count_tokens(current) + count_tokens(unit) > max_tokens:
+            chunks.append(current)
+            current = ""
+        current += unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+_HUNK_RANGE_RE = re.compile(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@(.*)$")
+# A function, method or class definition line in common languages; group 1 is
+# the name (Go receivers and JS generator stars are skipped).
+_DEFINITION_RE = re.compile(
+    r"^\s*(?:(?:export|default|public|pub|async|static|abstract)\s+)*"
+    r"(?:def|class|function|func|fn|interface|struct|trait)\b\s*\*?\s*"
+    r"(?:\([^)]*\)\s*)?([A-Za-z_$][\w$]*)"
+)
+
+
+def _definition_name(line):
+    match = _DEFINITION_RE.match(line)
+    return match.group(1) if match else None
+
+
+def changed_definitions(diff_text):
+    """Public functions and classes that a diff's changed lines belong to.
+
+    A change inside a body (a new retry count, a fixed loop) names nothing
+    itself, yet a page documenting the function may describe that
+    behaviour. Each changed line is credited to the nearest definition above
+    it in the hunk (`git diff -W` puts the whole function there), else to
+    the one git names in the @@ header. Names starting with "_" are skipped.
+    """
+    names = set()
+    for file_diff in split_diff_files(diff_text):
+        for hunk in split_file_hunks(file_diff)[1]:
+            lines = hunk.splitlines()
+            match = _HUNK_RANGE_RE.match(lines[0]) if lines else None
+            if not match:
+                continue
+            current = _definition_name(match.group(3).strip())
+            for line in lines[1:]:
+                current = _definition_name(line[1:]) or current
+                if line[:1] in ("+", "-") and current:
+                    names.add(current)
+    return {name for name in names if not name.startswith("_")}
+
+
+def _changed_lines(hunks, prefix):
+    return [
+        line[1:]
+        for hunk in hunks
+        for line in hunk.splitlines()[1:]
+        if line.startswith(prefix)
+    ]
+
+
+def drop_reason(file_diff):
+    """Why a file's diff carries no documentation signal, or None to keep it.
+
+    Lockfiles, generated, minified and binary files, and pure renames or
+    mode changes (no content hunks) are dropped.
+    """
+    path = diff_file_path(file_diff)
+    header, hunks = split_file_hunks(file_diff)
+    if posixpath.basename(path) in LOCKFILE_NAMES:
+        return "lockfile"
+    if any(fnmatch.fnmatch("/" + path, p) for p in GENERATED_PATTERNS):
+        return "generated"
+    if not hunks:
+        if "Binary files" in header or "GIT binary patch" in header:
+            return "binary"
+        if "rename from" in header or "copy from" in header:
+            return "rename-only"
+        if "old mode" in header:
+            return "mode-only"
+        return None
+    if _FILE_START_HUNK_RE.match(hunks[0]) and _GENERATED_MARKER_RE.search(
+        "\n".join(hunks[0].splitlines()[1:6])
+    ):
+        return "generated"
+    if path.endswith(MINIFIABLE_SUFFIXES):
+        changed = _changed_lines(hunks, "+") + _changed_lines(hunks, "-")
+        long_lines = sum(len(line) > MINIFIED_LINE_CHARS for line in changed)
+        if long_lines * 2 >= len(changed) > 0:
+            return "minified"
+    return None
+
+
+def _normalize_whitespace(line, keep_indent):
+    """A changed line with insignificant whitespace removed.
+
+    Whitespace inside string literals is kept, and so is the leading
+    indentation when keep_indent is set.
+    """
+    text = line.rstrip()
+    indent = text[: len(text) - len(text.lstrip())] if keep_indent else ""
+    parts = _STRING_LITERAL_RE.split(text[len(indent) :])
+    # re.split puts the captured string literals at the odd positions.
+    return indent + "".join(
+        part if i % 2 else "".join(part.split()) for i, part in enumerate(parts)
+    )
+
+
+def is_whitespace_only_hunk(hunk, path=""):
+    """True if a hunk's removed and added lines differ only in whitespace.
+
+    Lines are compared one by one, blank lines aside. Re-indenting a file
+    whose indentation is syntax (see INDENTATION_SIGNIFICANT_SUFFIXES) and
+    changing whitespace inside a string literal are real changes.
+    """
+    keep_indent = path.endswith(INDENTATION_SIGNIFICANT_SUFFIXES)
+
+    def changed(prefix):
+        lines = (
+            _normalize_whitespace(line[1:], keep_indent)
+            for line in hunk.splitlines()[1:]
+            if line[:1] == prefix
+        )
+        return [line for line in lines if line.strip()]
+
+    return changed("-") == changed("+")
+
+
+def tighten_hunk(hunk, context):
+    """Cut a hunk's context to `context` lines around each change.
+
+    Used for huge files, where the function context of `git diff -W` costs
+    more than it helps; may split the hunk in two or more, each with a
+    correct @@ header.
+    """
+    lines = hunk.splitlines(keepends=True)
+    match = _HUNK_RANGE_RE.match(lines[0].rstrip("\n")) if lines else None
+    if not match:
+        return hunk
+    old, new, suffix = int(match.group(1)), int(match.group(2)), match.group(3)
+    body = lines[1:]
+    keep = set()
+    for index, line in enumerate(body):
+        if line[:1] in ("+", "-"):
+            keep.update(range(index - context, index + context + 1))
+
+    groups, current = [], None
+    for index, line in enumerate(body):
+        tag = line[:1]
+        if index in keep or (tag == "\\" and index - 1 in keep):
+            if current is None:
+                current = [old, new, []]
+                groups.append(current)
+            current[2].append(line)
+        else:
+            current = None
+        if tag != "\\":
+            old += tag != "+"
+            new += tag != "-"
+
+    pieces = []
+    for old_start, new_start, group in groups:
+        old_count = sum(1 for line in group if line[:1] not in ("+", "\\"))
+        new_count = sum(1 for line in group if line[:1] not in ("-", "\\"))
+        # git numbers an empty side by the line before it.
+        old_start -= old_count == 0
+        new_start -= new_count == 0
+        pieces.append(
+            f"@@ -{old_start},{old_count} +{new_start},{new_count} @@{suffix}\n"
+            + "".join(group)
+        )
+    return "".join(pieces)
+
+
+def preprocess_diff(diff_text, count_tokens, huge_file_tokens=0, context=3):
+    """Strip changes that carry no documentation signal from a diff.
+
+    Drops whole files per drop_reason() and whitespace-only hunks (and files
+    left without hunks), and cuts the context of files whose diff exceeds
+    huge_file_tokens (0 disables) to `context` lines. Returns (diff, report)
+    where report records what was removed and the token counts.
+    """
+    kept, dropped = [], defaultdict(list)
+    hunks_dropped, tightened = 0, []
+    for file_diff in split_diff_files(diff_text):
+        path = diff_file_path(file_diff) or "(unknown)"
+        reason = drop_reason(file_diff)
+        if reason:
+            dropped[reason].append(path)
+            continue
+        header, hunks = split_file_hunks(file_diff)
+        if hunks:
+            meaningful = [h for h in hunks if not is_whitespace_only_hunk(h, path)]
+            hunks_dropped += len(hunks) - len(meaningful)
+            if not meaningful:
+                dropped["whitespace-only"].append(path)
+                continue
+            file_diff = header + "".join(meaningful)
+            if huge_file_tokens and count_tokens(file_diff) > huge_file_tokens:
+                file_diff = header + "".join(
+                    tighten_hunk(h, context) for h in meaningful
+                )
+                tightened.append(path)
+        kept.append(file_diff)
+
+    result = "".join(kept)
+    report = {
+        "tokens_before": count_tokens(diff_text),
+        "tokens_after": count_tokens(result),
+        "files_dropped": dict(dropped),
+        "whitespace_hunks_dropped": hunks_dropped,
+        "files_context_trimmed": tightened,
+    }
+    return result, report
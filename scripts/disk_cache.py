@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+class DiskCache:
+    """Content-addressed JSON store on disk with size-bounded LRU eviction.
+
+    Entries live in <directory>/<key[:2]>/<key>.json. Reads bump the entry's
+    mtime, so prune() can drop the least recently used entries first. The
+    directory can be persisted between workflow runs (e.g. actions/cache).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """Hash arbitrary JSON-serializable parts into a stable cache key."""
+        blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the stored value for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)["value"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store value under key; best-effort, never raises on I/O errors."""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so concurrent readers never see
+            # a partially written entry.
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"value": value}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Warning: could not write cache entry {key[:12]}: {e}")
+
+    def prune(self):
+        """Evict least recently used entries until the store fits max_bytes."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        return evicted
+
+    def close(self):
+        """Prune the store and report hit/miss counts for this run."""
+        evicted = self.prune()
+        print(
+            f"Disk cache: {self.hits} hit(s), {self.misses} miss(es), "
+            f"{evicted} entr{'y' if evicted == 1 else 'ies'} evicted."
+        )
@@ -0,0 +1,338 @@
+import math
+import posixpath
+import re
+from collections import Counter, defaultdict
+
+# Very common words and language keywords; they match almost every page and
+# only add noise to the ranking.
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by can do for from has have if in into is it its not
+    of on or so that the then this to was were will with you your
+    async await break case catch class const continue def default del elif else
+    except export false finally for function if import in let new none null
+    pass private public raise return self static super this throw true try
+    type undefined var void while yield
+    """.split()
+)
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+_FLAG_RE = re.compile(r"(?<![\w-])--?[A-Za-z][\w-]*")
+_DIFF_PATH_RE = re.compile(r"^diff --git a/(\S+) b/(\S+)", re.MULTILINE)
+_FRONTMATTER_RE = re.compile(r"\A---\n.*?\n---\n", re.DOTALL)
+_HEADING_LINE_RE = re.compile(r"^#{1,6} .*$", re.MULTILINE)
+_LINK_RE = re.compile(r"\]\(([^)\s#?]+)")
+_CODE_SPAN_RE = re.compile(r"`([^`\n]+)`")
+_FENCE_RE = re.compile(r"^(```|~~~)[^\n]*\n(.*?)^\1", re.MULTILINE | re.DOTALL)
+_SYMBOL_RE = re.compile(r"--?[A-Za-z][\w-]*|[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*")
+_NAME_RE = re.compile(r"[A-Za-z_$][\w$]*")
+# Lines that define a name: functions, classes and types (the whole signature
+# counts), or assignments and config keys (only the name being assigned, and
+# identifier-like strings such as the env var a setting is read from).
+_DEFINITION_LINE_RE = re.compile(
+    r"^\s*(?:(?:export|public|pub|async|static|abstract)\s+)*"
+    r"(?:def|class|function|func|fn|interface|struct|trait|type|enum)\b"
+)
+_ASSIGNMENT_RE = re.compile(
+    r"""^\s*(?:(?:export\s+)?(?:const|let|var)\s+)?["']?([A-Za-z_$][\w$.-]*)["']?"""
+    r"""\s*(?::(?!:)|=(?!=))"""
+)
+_QUOTED_NAME_RE = re.compile(r"""["']([A-Za-z_][\w.-]*)["']""")
+
+
+def split_identifier(word):
+    """Split snake_case / camelCase / kebab-case words into lowercase parts."""
+    parts = []
+    for chunk in re.split(r"[_\-]+", word):
+        parts.extend(p.lower() for p in _CAMEL_RE.findall(chunk))
+    return parts
+
+
+def tokenize(text):
+    """Lowercase terms for indexing: whole identifiers plus their parts."""
+    terms = []
+    for word in _WORD_RE.findall(text):
+        lowered = word.lower()
+        parts = split_identifier(word)
+        if len(lowered) > 1 and lowered not in STOPWORDS:
+            terms.append(lowered)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if len(p) > 1 and p not in STOPWORDS)
+    for flag in _FLAG_RE.findall(text):
+        terms.append(flag.lower())
+    return terms
+
+
+def extract_diff_terms(diff_text):
+    """Query terms for a git diff.
+
+    Uses only added/removed lines (not the -W function context) plus the
+    changed file paths, so the query reflects what the PR actually touched:
+    identifiers, config keys, env var names and CLI flags.
+    """
+    changed = []
+    for line in diff_text.splitlines():
+        if line.startswith(("+++", "---")):
+            continue
+        if line.startswith(("+", "-")):
+            changed.append(line[1:])
+    for old_path, new_path in _DIFF_PATH_RE.findall(diff_text):
+        for path in {old_path, new_path}:
+            stem = path.rsplit("/", 1)[-1].split(".", 1)[0]
+            changed.append(stem)
+    return tokenize("\n".join(changed))
+
+
+class BM25Index:
+    """Okapi BM25 ranking over an in-memory {path: text} corpus."""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = {
+            path: Counter(tokenize(text)) for path, text in documents.items()
+        }
+        self.lengths = {path: sum(tf.values()) for path, tf in self.term_freqs.items()}
+        self.avg_length = (
+            (sum(self.lengths.values()) / len(self.lengths)) if self.lengths else 0
+        )
+        doc_freq = Counter()
+        for tf in self.term_freqs.values():
+            doc_freq.update(tf.keys())
+        n = len(self.term_freqs)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def score(self, path, query_terms):
+        tf = self.term_freqs[path]
+        norm = self.k1 * (
+            1 - self.b + self.b * self.lengths[path] / (self.avg_length or 1)
+        )
+        total = 0.0
+        for term in set(query_terms):
+            freq = tf.get(term)
+            if freq:
+                total += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+        return total
+
+    def rank(self, query_terms):
+        """Return [(path, score)] sorted by descending score, then path."""
+        scores = [(path, self.score(path, query_terms)) for path in self.term_freqs]
+        return sorted(scores, key=lambda item: (-item[1], item[0]))
+
+
+def page_headings(text):
+    """The page's Markdown heading lines, in order."""
+    return _HEADING_LINE_RE.findall(_FRONTMATTER_RE.sub("", text, count=1))
+
+
+def page_summary(text):
+    """Compact stand-in for a page: its lead paragraph and heading outline."""
+    body = _FRONTMATTER_RE.sub("", text, count=1)
+    lead = ""
+    for block in re.split(r"\n\s*\n", body):
+        block = block.strip()
+        if block and not block.startswith(("#", "```", "<", "|", ":::")):
+            lead = block
+            break
+    return "\n".join([lead, "", *page_headings(body)]).strip()
+
+
+def page_links(path, text, paths):
+    """Which of paths the Markdown page at path links to.
+
+    Relative links are resolved against the page's directory; absolute
+    (VitePress-style, extensionless) links match by path suffix.
+    """
+    by_stem = {p.rsplit(".", 1)[0]: p for p in paths}
+    linked = set()
+    for target in _LINK_RE.findall(text):
+        if "://" in target or target.startswith("mailto:"):
+            continue
+        stem = target.rsplit(".", 1)[0] if target.endswith((".md", ".html")) else target
+        stem = stem.rstrip("/") or "index"
+        if stem.startswith("/"):
+            suffix = stem.lstrip("/")
+            linked.update(
+                p for s, p in by_stem.items() if s == suffix or s.endswith("/" + suffix)
+            )
+        else:
+            resolved = posixpath.normpath(posixpath.join(posixpath.dirname(path), stem))
+            if resolved in by_stem:
+                linked.add(by_stem[resolved])
+    linked.discard(path)
+    return linked
+
+
+class RelatedPages:
+    """Rank a corpus's pages by relatedness to one target page and a diff.
+
+    Pages linked to or from the target rank first; the rest are ordered by
+    BM25 score against the diff terms plus the target's headings, and pages
+    sharing none of those terms are left out.
+    """
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.index = BM25Index(documents)
+        self.links = {
+            path: page_links(path, text, documents) for path, text in documents.items()
+        }
+
+    def rank(self, target_path, query_terms, target_text=""):
+        """Return [(path, score)] of related pages, best first."""
+        outgoing = self.links.get(target_path) or page_links(
+            target_path, target_text, self.documents
+        )
+        query = list(query_terms) + tokenize("\n".join(page_headings(target_text)))
+        related = []
+        for path, score in self.index.rank(query):
+            if path == target_path:
+                continue
+            linked = path in outgoing or target_path in self.links[path]
+            if linked or score > 0:
+                related.append((linked, score, path))
+        related.sort(key=lambda item: (not item[0], -item[1], item[2]))
+        return [(path, score) for _, score, path in related]
+
+
+def is_distinctive_symbol(symbol):
+    """True for tokens that name code: flags, compound or dotted identifiers.
+
+    Plain words ("timeout", "value") are left out; they match prose and
+    unrelated code alike.
+    """
+    name = symbol.lstrip("-")
+    if len(name) < 4 or name.lower() in STOPWORDS:
+        return False
+    if symbol.startswith("--"):
+        return True
+    return (
+        "_" in name.strip("_")
+        or "." in name
+        or re.search(r"[a-z][A-Z]", name) is not None
+    )
+
+
+def symbol_key(symbol):
+    """Match key for a symbol: max_retries, maxRetries, --max-retries and
+    MAX_RETRIES all map to the same key."""
+    return re.sub(r"[-_]", "", symbol.lstrip("-")).lower()
+
+
+def extract_symbols(text):
+    """Distinctive symbols in text; dotted names also yield their parts."""
+    symbols = set()
+    for match in _SYMBOL_RE.findall(text):
+        for symbol in [match] + (match.split(".") if "." in match else []):
+            if is_distinctive_symbol(symbol):
+                symbols.add(symbol)
+    return symbols
+
+
+def doc_code(text):
+    """Text of a Markdown page's inline code spans and fenced code blocks."""
+    code = [body for _, body in _FENCE_RE.findall(text)]
+    code.extend(_CODE_SPAN_RE.findall(_FENCE_RE.sub("", text)))
+    return "\n".join(code)
+
+
+def extract_changed_symbols(diff_text):
+    """Symbols a diff adds or removes (renamed, new or deleted names).
+
+    Compares how often each symbol occurs on removed and on added lines, so
+    names that only appear in edited context lines are not reported.
+    """
+    added, removed = Counter(), Counter()
+    for line in diff_text.splitlines():
+        if line.startswith(("+++", "---")):
+            continue
+        if line.startswith("+"):
+            added.update(s for s in extract_symbols(line[1:]))
+        elif line.startswith("-"):
+            removed.update(s for s in extract_symbols(line[1:]))
+    return {s for s in added.keys() | removed.keys() if added[s] != removed[s]}
+
+
+def extract_defined_symbols(line):
+    """Symbols a line of code defines, rather than merely uses.
+
+    Long CLI flags count wherever they appear.
+    """
+    symbols = set()
+    if _DEFINITION_LINE_RE.match(line):
+        symbols |= extract_symbols(line)
+    else:
+        match = _ASSIGNMENT_RE.match(line)
+        if match:
+            symbols |= extract_symbols(match.group(1))
+            symbols |= extract_symbols(" ".join(_QUOTED_NAME_RE.findall(line)))
+    symbols.update(
+        flag
+        for flag in _FLAG_RE.findall(line)
+        if flag.startswith("--") and is_distinctive_symbol(flag)
+    )
+    return symbols
+
+
+def extract_definition_changes(diff_text):
+    """Symbols whose definition a diff adds, renames or removes.
+
+    Like extract_changed_symbols(), but only counts definitions (functions,
+    parameters, constants, config keys, env vars, CLI flags), so a new call
+    site or log line that uses an existing name is not reported.
+    """
+    added, removed = Counter(), Counter()
+    for line in diff_text.splitlines():
+        if line.startswith(("+++", "---")):
+            continue
+        if line.startswith("+"):
+            added.update(extract_defined_symbols(line[1:]))
+        elif line.startswith("-"):
+            removed.update(extract_defined_symbols(line[1:]))
+    return {s for s in added.keys() | removed.keys() if added[s] != removed[s]}
+
+
+class SymbolIndex:
+    """Inverted index from code symbols mentioned in pages to those pages."""
+
+    def __init__(self, documents):
+        self.pages = defaultdict(set)
+        self.names = defaultdict(set)
+        for path, text in documents.items():
+            code = doc_code(text)
+            for symbol in extract_symbols(code):
+                self.pages[symbol_key(symbol)].add(path)
+            for name in _NAME_RE.findall(code):
+                self.names[name].add(path)
+
+    def lookup(self, symbols, max_pages=0):
+        """Return {path: sorted symbols} for pages mentioning any of symbols.
+
+        Symbols found on more than max_pages pages (when > 0) are ignored as
+        too common to pin down the pages that need an update.
+        """
+        hits = defaultdict(set)
+        for symbol in symbols:
+            paths = self.pages.get(symbol_key(symbol), ())
+            if max_pages and len(paths) > max_pages:
+                continue
+            for path in paths:
+                hits[path].add(symbol)
+        return {path: sorted(found) for path, found in sorted(hits.items())}
+
+    def lookup_names(self, names):
+        """Return {path: sorted names} for pages whose code uses any of names.
+
+        Unlike lookup(), names match exactly and need not be distinctive: they
+        are meant to be identifiers already known to be code, such as the
+        functions a diff changes.
+        """
+        hits = defaultdict(set)
+        for name in names:
+            for path in self.names.get(name, ()):
+                hits[path].add(name)
+        return {path: sorted(found) for path, found in sorted(hits.items())}
@@ -0,0 +1,83 @@
+import base64
+import threading
+import urllib.parse
+
+from disk_cache import DiskCache
+
+
+class DocSnapshot:
+    """Cross-run snapshot of documentation trees and blobs in a DiskCache.
+
+    Git trees and blobs are immutable, so listings are stored under their
+    tree SHA (and doc path) and page contents under their blob SHA, and are
+    never revalidated. Only resolving a branch to its tree goes to GitHub on
+    every run, as a conditional request: while the branch has not moved the
+    stored ETag matches and GitHub answers 304 Not Modified, which does not
+    count against the rate limit. Without a cache everything is fetched.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.requests = 0
+        self.not_modified = 0
+        self.blobs_reused = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _get(self, *parts):
+        return self.cache.get(DiskCache.make_key(*parts)) if self.cache else None
+
+    def _put(self, value, *parts):
+        if self.cache is not None:
+            self.cache.put(DiskCache.make_key(*parts), value)
+
+    def tree_sha(self, repo, ref):
+        """SHA of the root tree of ref's commit, revalidated by ETag."""
+        stored = self._get("doc-ref", repo.full_name, ref)
+        headers = {"If-None-Match": stored["etag"]} if stored else {}
+        url = f"{repo.url}/commits/{urllib.parse.quote(ref, safe='')}"
+        response_headers, data = repo.requester.requestJsonAndCheck(
+            "GET", url, headers=headers
+        )
+        self._count("requests")
+        if data is None and stored:  # 304 Not Modified
+            self._count("not_modified")
+            return stored["tree_sha"]
+        tree_sha = data["commit"]["tree"]["sha"]
+        etag = response_headers.get("etag")
+        if etag:
+            self._put(
+                {"etag": etag, "tree_sha": tree_sha}, "doc-ref", repo.full_name, ref
+            )
+        return tree_sha
+
+    def listing(self, repo, tree_sha, doc_path, build):
+        """Cached build(tree) for the recursive tree at tree_sha and doc_path.
+
+        build turns the PyGithub tree into a JSON-serializable listing, or
+        None when it should not be stored (e.g. a truncated tree).
+        """
+        key = ("doc-tree", repo.full_name, tree_sha, doc_path)
+        listing = self._get(*key)
+        if listing is None:
+            tree = repo.get_git_tree(tree_sha, recursive=True)
+            self._count("requests")
+            listing = build(tree)
+            if listing is not None:
+                self._put(listing, *key)
+        return listing
+
+    def blob(self, repo, sha):
+        """Decoded UTF-8 content of the blob with this SHA."""
+        content = self._get("doc-blob", sha)
+        if content is not None:
+            self._count("blobs_reused")
+            return content
+        blob = repo.get_git_blob(sha)
+        self._count("requests")
+        content = base64.b64decode(blob.content).decode("utf-8")
+        self._put(content, "doc-blob", sha)
+        return content
@@ -0,0 +1,48 @@
+import github
+import httpx
+from openai import DefaultHttpxClient
+
+try:  # Optional: HTTP/2 for the model endpoint (pip install "httpx[http2]").
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - depends on the environment
+    h2 = None
+
+
+def http2_available():
+    return h2 is not None
+
+
+def openai_http_client(max_connections, keepalive_seconds, http2=True):
+    """Pooled keep-alive HTTP client shared by every model call of a run.
+
+    Holds up to max_connections connections to the model endpoint and keeps
+    idle ones open for keepalive_seconds, so concurrent and consecutive
+    requests reuse TLS sessions instead of handshaking again. HTTP/2 is used
+    when requested, h2 is installed and the endpoint negotiates it.
+    """
+    return DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_seconds,
+        ),
+        http2=http2 and http2_available(),
+    )
+
+
+def github_client(
+    token, base_url, pool_size, seconds_between_requests, seconds_between_writes
+):
+    """PyGithub client whose connection pool fits the run's concurrency.
+
+    PyGithub keeps one requests session (keep-alive, up to pool_size
+    connections to the API host) and spaces requests by the given intervals;
+    0 disables the spacing for reads or writes.
+    """
+    return github.Github(
+        base_url=base_url,
+        auth=github.Auth.Token(token),
+        pool_size=pool_size,
+        seconds_between_requests=seconds_between_requests,
+        seconds_between_writes=seconds_between_writes,
+    )
@@ -1,37 +1,126 @@
 import argparse
+import contextvars
 import difflib
+import hashlib
 import json
+import math
 import os
 import re
 import subprocess
 import sys
+import threading
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-import github
+from api_surface import api_changes, is_non_surface_path, render_api_changes
 from constants import (
+    API_SUMMARY,
+    CACHE_DIR,
+    CACHE_MAX_MB,
     CONFIG_UPDATE_SYSTEM_PROMPT,
     CONFIG_UPDATE_USER_PROMPT_TEMPLATE,
     CREATE_DOC_SYSTEM_PROMPT,
     CREATE_DOC_USER_PROMPT_TEMPLATE,
     CUSTOM_INSTRUCTIONS_TEMPLATE,
     DELETE_FILE_MARKER,
+    DIFF_CHUNK_TOKENS,
     DIFF_FILTER_PATTERNS,
-    MAX_DIFF_CHARS,
-    MAX_DOC_CONTEXT_CHARS,
+    DIFF_HUGE_FILE_TOKENS,
+    DIFF_NOTES_HEADER,
+    DIFF_NOTES_SYSTEM_PROMPT,
+    DIFF_NOTES_USER_PROMPT_TEMPLATE,
+    DIFF_PREPROCESS,
+    ESCALATION_MODEL,
+    FAST_EXIT,
+    GIT_FETCH_MODE,
+    GITHUB_API_URL,
+    GITHUB_REQUEST_INTERVAL,
+    GITHUB_WRITE_INTERVAL,
+    HTTP2,
+    HTTP_KEEPALIVE_SECONDS,
+    HTTP_MAX_CONNECTIONS,
+    INCREMENTAL_ROUNDS,
+    MAX_CONCURRENCY,
+    MAX_DIFF_TOKENS,
+    MAX_DOC_CONTEXT_TOKENS,
     MAX_NEW_DOCS,
+    MAX_PAGE_OUTPUT_TOKENS,
+    MAX_PR_DESCRIPTION_TOKENS,
+    MAX_REQUESTS_PER_MINUTE,
+    MODEL_STAGES,
+    NO_CHANGES_MARKER,
     OPENAI_BASE_URL,
     OPENAI_MODEL,
+    PATCH_SYSTEM_PROMPT,
+    PATCH_USER_PROMPT_TEMPLATE,
     PR_BRANCH_PREFIX,
+    PREFILTER_MIN_SCORE,
+    PREFILTER_TOP_K,
     PROPOSE_NEW_DOCS_SYSTEM_PROMPT,
     PROPOSE_NEW_DOCS_USER_PROMPT_TEMPLATE,
+    REPORT_PATH,
+    SHALLOW_MAX_DEPTH,
+    SOURCE_HEAD_MARKER,
+    STAGE_MODELS,
+    STREAM_GENERATION,
     SUMMARY_SYSTEM_PROMPT,
     SUMMARY_USER_PROMPT_TEMPLATE,
+    SYMBOL_MATCH_MAX_PAGES,
+    TRIAGE_ANSWER,
+    TRIAGE_ANSWER_UNSURE,
+    TRIAGE_BATCH_FILE_TEMPLATE,
+    TRIAGE_BATCH_SYSTEM_PROMPT,
+    TRIAGE_BATCH_TOKENS,
+    TRIAGE_BATCH_UPDATE,
+    TRIAGE_BATCH_UPDATE_UNSURE,
+    TRIAGE_BATCH_USER_PROMPT_TEMPLATE,
+    TRIAGE_MODE,
+    TRIAGE_SCORE_MARGIN,
+    TRIAGE_SCORE_THRESHOLD,
+    TRIAGE_SCORE_TOP_K,
     TRIAGE_SYSTEM_PROMPT,
+    TRIAGE_TOP_LOGPROBS,
+    TRIAGE_UNSURE_SYSTEM_PROMPT,
     TRIAGE_USER_PROMPT_TEMPLATE,
+    UPDATE_MODE,
     UPDATE_SYSTEM_PROMPT,
     UPDATE_USER_PROMPT_TEMPLATE,
 )
-from github import Github, GithubException
-from openai import OpenAI
+from diff_tools import (
+    changed_definitions,
+    diff_file_path,
+    preprocess_diff,
+    split_diff,
+    split_diff_files,
+)
+from disk_cache import DiskCache
+from doc_index import (
+    BM25Index,
+    RelatedPages,
+    SymbolIndex,
+    extract_changed_symbols,
+    extract_definition_changes,
+    extract_diff_terms,
+    page_summary,
+    tokenize,
+)
+from doc_snapshot import DocSnapshot
+from github import GithubException, InputGitTreeElement
+from http_transport import github_client, http2_available, openai_http_client
+from md_patch import PatchError, apply_edits
+from openai import BadRequestError, OpenAI
+from run_report import RunReport
+from token_budget import (
+    count_tokens,
+    fit_prompt,
+    fit_sections,
+    prompt_token_limit,
+    trim_diff,
+    trim_file_blocks,
+    trim_lines,
+    trim_markdown,
+)
 
 
 def render_custom_instructions(custom_instructions):
@@ -69,6 +158,35 @@ def strip_code_fences(text):
     return "\n".join(lines)
 
 
+_LEADING_FENCE_RE = re.compile(r"^\s*```[\w-]*\n")
+
+
+def early_update_verdict(text):
+    """The marker a streamed page update starts with, once it is complete.
+
+    Lets the update stop as soon as the model has decided to delete the
+    page or leave it unchanged; None while the answer is still open.
+    """
+    head = _LEADING_FENCE_RE.sub("", text[:200]).lstrip()
+    for marker in (DELETE_FILE_MARKER, NO_CHANGES_MARKER):
+        if head.startswith(marker):
+            return marker
+    return None
+
+
+def page_output_ceiling(content=""):
+    """Output token cap for (re)writing a page.
+
+    Room to about double the page, at most MAX_PAGE_OUTPUT_TOKENS, but never
+    less than the page itself plus a margin, so a large page that only needs
+    a small edit can still be rewritten. A new page gets the full cap.
+    """
+    size = count_tokens(content)
+    if not size:
+        return MAX_PAGE_OUTPUT_TOKENS
+    return max(min(MAX_PAGE_OUTPUT_TOKENS, 2 * size + 1000), size + 1000)
+
+
 def is_vitepress_config(path):
     """True for the VitePress config file (lives above the doc subdir)."""
     return path.endswith(".vitepress/config.ts") or path.endswith(
@@ -95,7 +213,484 @@ def parse_json_array(text):
     return data if isinstance(data, list) else []
 
 
-def get_local_git_diff(gh, repo_name, pr_number, repo_path="."):
+def shared_sections(diff_text, pr_description):
+    """Budgeted prompt sections for the diff and PR description."""
+    return {
+        "diff_text": (diff_text, trim_diff, MAX_DIFF_TOKENS),
+        "pr_description": (
+            pr_description or "No description provided.",
+            trim_lines,
+            MAX_PR_DESCRIPTION_TOKENS,
+        ),
+    }
+
+
+def run_concurrently(func, items, max_workers=MAX_CONCURRENCY):
+    """Apply func to each item on a bounded thread pool.
+
+    Returns a list of (result, error) pairs in input order; an exception in
+    one item is captured as its error instead of aborting the others. Each
+    worker runs in a copy of the caller's context, so model calls stay
+    attributed to the caller's report stage.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def guarded(item):
+        try:
+            return func(item), None
+        except Exception as e:  # noqa: BLE001 - isolate per-item failures
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, guarded, item) for item in items
+        ]
+        return [future.result() for future in futures]
+
+
+def run_job_graph(jobs):
+    """Run a small dependency graph of jobs, each as soon as its deps finish.
+
+    jobs maps name -> (deps, func); func receives a dict of the results of
+    the jobs completed so far. Independent jobs run concurrently. If a job
+    raises, no further jobs are started and the first error is re-raised
+    once the running ones have finished. Returns name -> result.
+    """
+    results = {}
+    pending = dict(jobs)
+    running = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as pool:
+        while pending or running:
+            if error is None:
+                for name, (deps, func) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        del pending[name]
+                        running[
+                            pool.submit(
+                                contextvars.copy_context().run, func, dict(results)
+                            )
+                        ] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:  # noqa: BLE001 - re-raised below
+                    error = error or e
+    if error is not None:
+        raise error
+    if pending:
+        raise ValueError(f"Unsatisfiable job dependencies: {sorted(pending)}")
+    return results
+
+
+class RequestBudget:
+    """Concurrency and rate limit shared by every model request in a run.
+
+    Used as a context manager around each request: it holds one of
+    max_concurrency slots for the duration of the call and, when
+    requests_per_minute is set, spaces request starts evenly.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, requests_per_minute=0):
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self._slots.acquire()
+        if self._interval:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._next_start - now
+                self._next_start = max(now, self._next_start) + self._interval
+            if delay > 0:
+                time.sleep(delay)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._slots.release()
+        return False
+
+
+class ModelRouter:
+    """Chooses the model for each stage of the pipeline.
+
+    models maps stage names (MODEL_STAGES) to models; unlisted stages use
+    OPENAI_MODEL. escalation_model, when set, is the larger model that
+    low-confidence answers of a stage are re-asked to.
+    """
+
+    def __init__(self, models=None, escalation_model=""):
+        self.models = dict(models or {})
+        self.escalation_model = escalation_model
+
+    def model(self, stage):
+        return self.models.get(stage) or OPENAI_MODEL
+
+    def escalate(self, stage):
+        """The model to re-ask unsure answers of stage on, or None."""
+        if self.escalation_model and self.escalation_model != self.model(stage):
+            return self.escalation_model
+        return None
+
+    def describe(self):
+        routes = ", ".join(f"{stage}={self.model(stage)}" for stage in MODEL_STAGES)
+        if self.escalation_model:
+            routes += f"; unsure triage verdicts escalate to {self.escalation_model}"
+        return routes
+
+
+class TruncatedOutputError(Exception):
+    """A streamed completion hit its output cap or the model's length limit."""
+
+
+class ModelClient:
+    """Thin wrapper around the OpenAI client; every chat call shares one budget.
+
+    With a DiskCache attached, complete() serves repeated requests (same
+    model, messages and options) from disk instead of calling the model.
+    Latency and token usage of every response, including the prompt tokens
+    the provider served from its prefix cache, go to the RunReport under the
+    current stage. Instead of a client, connect() may be given to build one
+    on the first model request, so a run that needs none never creates it.
+    The router picks the model each stage's calls use.
+    """
+
+    def __init__(
+        self,
+        openai_client=None,
+        budget=None,
+        cache=None,
+        report=None,
+        connect=None,
+        router=None,
+    ):
+        self._openai = openai_client
+        self._connect = connect
+        self._connect_lock = threading.Lock()
+        self.budget = budget or RequestBudget()
+        self.cache = cache
+        self.report = report or RunReport()
+        self.router = router or ModelRouter()
+        # Cleared once an endpoint rejects stream_options, so later streams
+        # do not repeat the failed request.
+        self._stream_usage = True
+
+    @property
+    def openai(self):
+        if self._openai is None:
+            with self._connect_lock:
+                if self._openai is None:
+                    self._openai = self._connect()
+        return self._openai
+
+    def chat(self, messages, model=OPENAI_MODEL, **kwargs):
+        with self.budget:
+            start = time.monotonic()
+            response = self.openai.chat.completions.create(
+                model=model, messages=messages, **kwargs
+            )
+            seconds = time.monotonic() - start
+        self.report.record_call(model, getattr(response, "usage", None), seconds)
+        return response
+
+    def report_usage(self):
+        usage = self.report.totals()
+        prompt_tokens = usage["prompt_tokens"]
+        cached_share = usage["cached_tokens"] / prompt_tokens if prompt_tokens else 0
+        print(
+            f"Model usage: {usage['requests']} request(s), {prompt_tokens} prompt "
+            f"tokens ({usage['cached_tokens']} served from the provider's prompt "
+            f"cache, {cached_share:.0%}), {usage['completion_tokens']} completion "
+            "tokens."
+        )
+
+    def complete(self, messages, model=OPENAI_MODEL, **kwargs):
+        """Return the stripped message text of a chat completion."""
+        key = None
+        if self.cache is not None:
+            # The rendered messages embed the prompt template, diff, page
+            # content and custom instructions, so any change is a new key.
+            key = DiskCache.make_key("chat", model, messages, kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.report.record_cache_hit()
+                return cached
+        content = get_message_content(self.chat(messages, model=model, **kwargs))
+        if key is not None and content:
+            self.cache.put(key, content)
+        return content
+
+    def first_token_logprobs(
+        self, messages, model=OPENAI_MODEL, top_logprobs=TRIAGE_TOP_LOGPROBS
+    ):
+        """{token: logprob} of the likeliest first tokens of the answer.
+
+        Asks for a single output token with its top_logprobs alternatives, so
+        the answer costs one token however the model would have phrased it.
+        Shares complete()'s cache.
+        """
+        kwargs = {"max_tokens": 1, "logprobs": True, "top_logprobs": top_logprobs}
+        key = None
+        if self.cache is not None:
+            key = DiskCache.make_key("chat", model, messages, kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.report.record_cache_hit()
+                return cached
+        response = self.chat(messages, model=model, **kwargs)
+        logprobs = response.choices[0].logprobs if response.choices else None
+        if not logprobs or not logprobs.content:
+            raise ValueError("the response has no token log-probabilities")
+        first = logprobs.content[0]
+        candidates = {t.token: t.logprob for t in first.top_logprobs or []}
+        candidates.setdefault(first.token, first.logprob)
+        if key is not None:
+            self.cache.put(key, candidates)
+        return candidates
+
+    def _open_stream(self, messages, model, **kwargs):
+        """Start a streamed completion, asking for a final usage chunk.
+
+        Some OpenAI-compatible endpoints reject stream_options; the request
+        is then retried without it and usage is estimated locally. A retry
+        that fails as well raises the endpoint's error.
+        """
+        if self._stream_usage:
+            try:
+                return self.openai.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs,
+                )
+            except BadRequestError as e:
+                print(f"Streaming request rejected, retrying without usage: {e}")
+        stream = self.openai.chat.completions.create(
+            model=model, messages=messages, stream=True, **kwargs
+        )
+        self._stream_usage = False
+        return stream
+
+    def complete_streaming(
+        self,
+        messages,
+        model=OPENAI_MODEL,
+        stop_when=None,
+        max_output_tokens=0,
+        **kwargs,
+    ):
+        """Like complete(), but consume the answer as it is generated.
+
+        stop_when(text_so_far) may return the final answer as soon as it is
+        decided; the stream is then closed, which stops generation. Raises
+        TruncatedOutputError when the output exceeds max_output_tokens (0 for
+        no cap) or the model hits its own length limit, so a cut-off page is
+        never used. Shares complete()'s cache entries.
+        """
+        key = None
+        if self.cache is not None:
+            key = DiskCache.make_key("chat", model, messages, kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.report.record_cache_hit()
+                return cached
+
+        text, tokens, usage, finish = "", 0, None, None
+        with self.budget:
+            start = time.monotonic()
+            stream = self._open_stream(messages, model, **kwargs)
+            try:
+                for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    if not chunk.choices:
+                        continue
+                    finish = chunk.choices[0].finish_reason or finish
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    text += delta
+                    tokens += count_tokens(delta)
+                    decided = stop_when(text) if stop_when else None
+                    if decided is not None:
+                        text, finish = decided, "decided"
+                        break
+                    if max_output_tokens and tokens > max_output_tokens:
+                        finish = "ceiling"
+                        break
+            finally:
+                stream.close()
+            seconds = time.monotonic() - start
+        if usage is None:
+            # Closed before the final usage chunk: estimate locally.
+            usage = types.SimpleNamespace(
+                prompt_tokens=sum(count_tokens(m["content"]) for m in messages),
+                completion_tokens=tokens,
+            )
+        self.report.record_call(model, usage, seconds)
+        if finish in ("ceiling", "length"):
+            raise TruncatedOutputError(
+                f"output cut off after ~{tokens} tokens ({finish})"
+            )
+        if finish == "decided":
+            print(f"  Stopped generation early after ~{tokens} tokens: {text}")
+        content = text.strip()
+        if key is not None and content:
+            self.cache.put(key, content)
+        return content
+
+
+SOURCE_HEAD_MARKER_RE = re.compile(
+    re.escape(SOURCE_HEAD_MARKER).replace(re.escape("{sha}"), "([0-9a-f]{7,40})")
+)
+
+
+def processed_source_head(report, head_sha):
+    """The source head to record as processed, or None to keep the old one.
+
+    A page skipped after a failed model call (timeout, rate limit) has not
+    seen the commits of this round; advancing the marker would leave them
+    out of every later incremental diff, so it only moves when nothing failed.
+    """
+    if report.failures:
+        print(
+            f"{len(report.failures)} model call(s) failed; keeping the recorded "
+            "source head so the next round covers these commits again."
+        )
+        return None
+    return head_sha
+
+
+def read_source_head_marker(pr):
+    """Source head SHA recorded in a doc PR body by an earlier round, or None."""
+    match = SOURCE_HEAD_MARKER_RE.search(pr.body or "")
+    return match.group(1) if match else None
+
+
+def record_source_head(pr, head_sha):
+    """Store head_sha in the doc PR body for the next round. Best-effort.
+
+    Without a head_sha (the round did not complete) the body is left as is.
+    """
+    if not head_sha:
+        return
+    body = SOURCE_HEAD_MARKER_RE.sub("", pr.body or "").rstrip()
+    try:
+        pr.edit(body=f"{body}\n\n{SOURCE_HEAD_MARKER.format(sha=head_sha)}")
+    except GithubException as e:
+        print(f"Warning: could not record source head on doc PR: {e}")
+
+
+def fetch_options(fetch_mode, depth=1):
+    """Extra `git fetch` options for the source repo fetch mode."""
+    if fetch_mode == "shallow":
+        return [f"--depth={depth}", "--filter=blob:none"]
+    return []
+
+
+def deepen_until_ancestor(since_sha, head_commit, head_ref, repo_path):
+    """Deepen a shallow head fetch until since_sha is in its history.
+
+    Doubles the depth each round, up to SHALLOW_MAX_DEPTH commits or until
+    the history is complete. True if since_sha is an ancestor of head_commit.
+    """
+
+    def is_ancestor():
+        return (
+            subprocess.run(
+                ["git", "merge-base", "--is-ancestor", since_sha, head_commit],
+                cwd=repo_path,
+                capture_output=True,
+            ).returncode
+            == 0
+        )
+
+    depth = 8
+    while not is_ancestor():
+        shallow = subprocess.run(
+            ["git", "rev-parse", "--is-shallow-repository"],
+            cwd=repo_path,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        if shallow != "true" or depth > SHALLOW_MAX_DEPTH:
+            return False
+        print(f"Deepening {head_ref} to {depth} commits...")
+        fetched = subprocess.run(
+            ["git", "fetch", *fetch_options("shallow", depth), "origin", head_ref],
+            cwd=repo_path,
+            capture_output=True,
+        )
+        if fetched.returncode != 0:
+            return False
+        depth *= 2
+    return True
+
+
+def can_diff_incrementally(
+    since_sha, head_commit, repo_path, fetch_mode=GIT_FETCH_MODE, head_ref=""
+):
+    """True if since_sha..head_commit holds only the PR's new commits.
+
+    Not the case after a force-push (since_sha is gone or no longer an
+    ancestor) or when the base branch was merged in since then (the range
+    would also contain unrelated upstream changes). In "shallow" fetch mode
+    the head's history is deepened only until since_sha is reached.
+    """
+
+    def git(*cmd):
+        return subprocess.run(
+            ["git", *cmd], cwd=repo_path, capture_output=True, text=True
+        )
+
+    if (
+        git("cat-file", "-e", f"{since_sha}^{{commit}}").returncode != 0
+        and git("fetch", *fetch_options(fetch_mode), "origin", since_sha).returncode
+        != 0
+    ):
+        print(f"Last processed head {since_sha[:7]} is unavailable (force-push?).")
+        return False
+    if fetch_mode == "shallow":
+        is_ancestor = deepen_until_ancestor(since_sha, head_commit, head_ref, repo_path)
+    else:
+        is_ancestor = (
+            git("merge-base", "--is-ancestor", since_sha, head_commit).returncode == 0
+        )
+    if not is_ancestor:
+        print(f"Last processed head {since_sha[:7]} is no longer an ancestor.")
+        return False
+    if git("rev-list", "--merges", f"{since_sha}..{head_commit}").stdout.strip():
+        print("Merge commits since the last round may pull in base changes.")
+        return False
+    return True
+
+
+def get_local_git_diff(
+    gh,
+    repo_name,
+    pr_number,
+    repo_path=".",
+    since_sha=None,
+    fetch_mode=GIT_FETCH_MODE,
+):
+    """Diff the PR head against its base branch.
+
+    With since_sha (the head processed by the previous round) only the
+    commits pushed since then are diffed, unless can_diff_incrementally()
+    rules that out, in which case the full diff is used. fetch_mode
+    "shallow" fetches just the two tips without blobs (see GIT_FETCH_MODE);
+    the diff compares the same two trees either way.
+    Returns (diff_text, pr_description, head_sha, diff_range), where
+    diff_range is the (base, head) commit pair that was diffed.
+    """
     # Assumes repo_path is the source repo checked out by actions/checkout.
     if not os.path.isdir(os.path.join(repo_path, ".git")):
         print(f"Error: {repo_path} is not a valid git repository.")
@@ -112,7 +707,10 @@ def get_local_git_diff(gh, repo_name, pr_number, repo_path="."):
 
     try:
         print(f"Fetching origin/{base_ref}...")
-        subprocess.check_call(["git", "fetch", "origin", base_ref], cwd=repo_path)
+        subprocess.check_call(
+            ["git", "fetch", *fetch_options(fetch_mode), "origin", base_ref],
+            cwd=repo_path,
+        )
     except subprocess.CalledProcessError as e:
         print(f"Warning: Error fetching base branch {base_ref}: {e}")
         # Fetch can fail when the ref is already present locally; fall back to it.
@@ -132,20 +730,55 @@ def get_local_git_diff(gh, repo_name, pr_number, repo_path="."):
     try:
         print(f"Fetching PR head (pull/{pr_number}/head)...")
         subprocess.check_call(
-            ["git", "fetch", "origin", f"pull/{pr_number}/head"], cwd=repo_path
+            [
+                "git",
+                "fetch",
+                *fetch_options(fetch_mode),
+                "origin",
+                f"pull/{pr_number}/head",
+            ],
+            cwd=repo_path,
         )
     except subprocess.CalledProcessError as e:
         print(f"Error fetching PR head: {e}")
         sys.exit(1)
 
-    print(f"Generating diff between origin/{base_ref} and FETCH_HEAD...")
+    # Pin the fetched head; fetching since_sha below would move FETCH_HEAD.
+    head_commit = (
+        subprocess.run(
+            ["git", "rev-parse", "FETCH_HEAD"],
+            cwd=repo_path,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        or "FETCH_HEAD"
+    )
+
+    diff_base = f"origin/{base_ref}"
+    if since_sha and head_commit.startswith(since_sha):
+        print(f"No new commits since the last processed head {since_sha[:7]}.")
+        return "", pr.body, head_sha, None
+    if since_sha:
+        if can_diff_incrementally(
+            since_sha,
+            head_commit,
+            repo_path,
+            fetch_mode,
+            f"pull/{pr_number}/head",
+        ):
+            diff_base = since_sha
+            print(f"Incremental round: only commits since {since_sha[:7]}.")
+        else:
+            print("Falling back to the full diff against the base branch.")
+
+    print(f"Generating diff between {diff_base} and {head_commit}...")
     try:
         result = subprocess.run(
             [
                 "git",
                 "diff",
-                f"origin/{base_ref}",
-                "FETCH_HEAD",
+                diff_base,
+                head_commit,
                 "-W",
                 "-U20",
                 "--inter-hunk-context=15",
@@ -157,12 +790,95 @@ def get_local_git_diff(gh, repo_name, pr_number, repo_path="."):
             text=True,
             check=True,
         )
-        return result.stdout, pr.body
+        return result.stdout, pr.body, head_sha, (diff_base, head_commit)
     except subprocess.CalledProcessError as e:
         print(f"Error generating git diff: {e.stderr}")
         sys.exit(1)
 
 
+def log_diff_preprocessing(removed):
+    """Print what preprocess_diff() removed from the diff."""
+    dropped = removed["files_dropped"]
+    print(
+        f"Diff preprocessing: ~{removed['tokens_before']} -> "
+        f"~{removed['tokens_after']} tokens; dropped "
+        f"{sum(len(paths) for paths in dropped.values())} file(s), "
+        f"{removed['whitespace_hunks_dropped']} whitespace-only hunk(s); trimmed "
+        f"the context of {len(removed['files_context_trimmed'])} huge file(s)."
+    )
+    for reason, paths in sorted(dropped.items()):
+        print(f"  {reason}: {', '.join(paths)}")
+    for path in removed["files_context_trimmed"]:
+        print(f"  context trimmed: {path}")
+
+
+def condense_diff(
+    client,
+    diff_text,
+    pr_description,
+    chunk_tokens=DIFF_CHUNK_TOKENS,
+    max_workers=MAX_CONCURRENCY,
+):
+    """Map-reduce an oversized diff into change notes for the prompts.
+
+    Diffs that fit MAX_DIFF_TOKENS are returned unchanged. Larger ones are
+    split on file/hunk boundaries into ~chunk_tokens chunks (map: one
+    concurrent notes call per chunk) and the notes are joined in order
+    (reduce), so every part of a big PR reaches triage and update instead of
+    only the files that fit. chunk_tokens <= 0 disables this.
+    """
+    model = client.router.model("notes")
+    diff_tokens = count_tokens(diff_text)
+    if diff_tokens <= MAX_DIFF_TOKENS or chunk_tokens <= 0:
+        return diff_text
+    chunks = split_diff(diff_text, chunk_tokens, count_tokens)
+    print(
+        f"Diff has ~{diff_tokens} tokens (limit {MAX_DIFF_TOKENS}); condensing "
+        f"{len(chunks)} chunk(s) into change notes..."
+    )
+
+    def notes_for(indexed_chunk):
+        index, chunk = indexed_chunk
+        return client.complete(
+            [
+                {"role": "system", "content": DIFF_NOTES_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": fit_prompt(
+                        DIFF_NOTES_USER_PROMPT_TEMPLATE,
+                        model,
+                        DIFF_NOTES_SYSTEM_PROMPT,
+                        sections={"diff_chunk": (chunk, trim_diff, chunk_tokens)},
+                        shared={"pr_description": shared["pr_description"]},
+                        chunk_index=index,
+                        chunk_count=len(chunks),
+                    ),
+                },
+            ],
+            model=model,
+        )
+
+    shared = shared_sections(diff_text, pr_description)
+    sections = []
+    indexed = list(enumerate(chunks, 1))
+    for (index, chunk), (notes, error) in zip(
+        indexed, run_concurrently(notes_for, indexed, max_workers)
+    ):
+        files = ", ".join(
+            dict.fromkeys(diff_file_path(f) for f in split_diff_files(chunk))
+        )
+        if error is not None:
+            print(f"  Warning: change notes failed for part {index}: {error}")
+            client.report.record_failure(f"diff part {index}", error)
+            notes = "(Change notes unavailable for this part.)"
+        sections.append(f"### Part {index} ({files})\n{notes.strip()}\n")
+    condensed = DIFF_NOTES_HEADER + "\n" + "\n".join(sections)
+    print(
+        f"Condensed {len(diff_text)} diff chars into {len(condensed)} chars of notes."
+    )
+    return condensed
+
+
 def get_vitepress_config(repo, ref):
     """Check for and fetch .vitepress/config.ts if it exists."""
     for vitepress_config_path in (".vitepress/config.ts", ".vitepress/config.mts"):
@@ -177,8 +893,11 @@ def get_vitepress_config(repo, ref):
     return {}
 
 
-def get_doc_files(repo, doc_path, ref):
-    print(f"Fetching documentation files from {repo.full_name}/{doc_path} @ {ref}...")
+def walk_doc_files(repo, doc_path, ref):
+    """Fetch docs by walking directories with get_contents (one call per dir).
+
+    Fallback for trees too large for a single recursive listing.
+    """
     files_content = {}
 
     vitepress_config = get_vitepress_config(repo, ref)
@@ -206,94 +925,749 @@ def get_doc_files(repo, doc_path, ref):
     return files_content
 
 
+def get_doc_files(repo, doc_path, ref, max_workers=MAX_CONCURRENCY, snapshot=None):
+    """Fetch the VitePress config and all .md files under doc_path at ref.
+
+    Resolves the ref once, lists the whole tree in one recursive call and
+    downloads the matching blobs concurrently, so the number of round-trips
+    no longer grows with the number of directories. With a DocSnapshot
+    backed by the disk cache, listings and blobs from earlier runs are
+    reused and only blobs whose SHA changed are downloaded.
+    Returns {path: content}.
+    """
+    print(f"Fetching documentation files from {repo.full_name}/{doc_path} @ {ref}...")
+    snapshot = snapshot or DocSnapshot()
+    prefix = doc_path.strip("/")
+
+    def build_listing(tree):
+        if tree.raw_data.get("truncated"):
+            return None
+        blobs = {el.path: el.sha for el in tree.tree if el.type == "blob"}
+        files = {}
+        for config_path in (".vitepress/config.ts", ".vitepress/config.mts"):
+            if config_path in blobs:
+                files[config_path] = blobs[config_path]
+                break
+        files.update(
+            (path, sha)
+            for path, sha in blobs.items()
+            if path.endswith(".md") and (not prefix or path.startswith(prefix + "/"))
+        )
+        is_dir = not prefix or any(
+            el.path == prefix and el.type == "tree" for el in tree.tree
+        )
+        return {"is_dir": is_dir, "files": files}
+
+    try:
+        tree_sha = snapshot.tree_sha(repo, ref)
+        listing = snapshot.listing(repo, tree_sha, doc_path, build_listing)
+    except GithubException as e:
+        print(f"Error reading tree of {repo.full_name} @ {ref}: {e}")
+        sys.exit(1)
+    if listing is None:
+        print("Recursive tree listing was truncated; walking directories instead.")
+        return walk_doc_files(repo, doc_path, ref)
+    if not listing["is_dir"]:
+        print(f"Error accessing path {doc_path} in {repo.full_name}: not a directory")
+        sys.exit(1)
+
+    blobs = listing["files"]
+    wanted = list(blobs)
+    config_path = next((p for p in wanted if is_vitepress_config(p)), None)
+    if config_path:
+        print(f"Found VitePress config at {config_path}")
+    else:
+        print("No VitePress config file found (.vitepress/config.ts or .mts)")
+
+    files_content = {}
+    for path, (content, error) in zip(
+        wanted,
+        run_concurrently(lambda p: snapshot.blob(repo, blobs[p]), wanted, max_workers),
+    ):
+        if error is not None:
+            print(f"Skipping {path} due to decoding error: {error}")
+        else:
+            files_content[path] = content
+    print(
+        f"Fetched {len(files_content)} file(s) with {snapshot.requests} API call(s) "
+        f"({snapshot.not_modified} not modified, {snapshot.blobs_reused} "
+        "file(s) reused from the snapshot)."
+    )
+    return files_content
+
+
+def prefilter_pages(doc_files, diff_text, top_k, min_score=PREFILTER_MIN_SCORE):
+    """Keep only the pages most lexically related to the diff (BM25).
+
+    Pages with no term overlap or scoring below min_score are skipped, and at
+    most top_k are kept; top_k <= 0 disables the filter. Every decision is
+    logged with its rank and score so K can be tuned against missed updates.
+    """
+    if top_k <= 0 or not doc_files:
+        return doc_files
+    query = extract_diff_terms(diff_text)
+    ranking = BM25Index(doc_files).rank(query)
+    print(
+        f"Ranking {len(doc_files)} page(s) against {len(set(query))} diff term(s) "
+        f"(top {top_k}, min score {min_score:g})..."
+    )
+    kept = set()
+    for rank, (path, score) in enumerate(ranking, 1):
+        if score <= 0 or score < min_score:
+            decision = "skip (below threshold)"
+        elif len(kept) >= top_k:
+            decision = "skip (beyond top-K)"
+        else:
+            decision = "triage"
+            kept.add(path)
+        print(f"  #{rank:<3} {score:7.2f}  {decision:<22} {path}")
+    print(f"Pre-filter kept {len(kept)} of {len(doc_files)} page(s) for triage.")
+    return {path: content for path, content in doc_files.items() if path in kept}
+
+
+def match_changed_symbols(
+    doc_files, diff_text, max_pages=SYMBOL_MATCH_MAX_PAGES, index=None
+):
+    """Pages that mention symbols whose definition the diff adds, renames or
+    removes.
+
+    Such pages certainly need a look, so they skip triage; pages that only
+    mention names the diff newly uses are left to triage. index may be a
+    SymbolIndex already built over (a superset of) doc_files. Returns
+    {path: [symbols]}; empty when max_pages <= 0 disables matching.
+    """
+    if max_pages <= 0 or not doc_files:
+        return {}
+    symbols = extract_definition_changes(diff_text)
+    index = index or SymbolIndex(doc_files)
+    hits = {
+        path: found
+        for path, found in index.lookup(symbols, max_pages).items()
+        if path in doc_files
+    }
+    print(
+        f"Symbol match: {len(symbols)} changed symbol(s) found verbatim in "
+        f"{len(hits)} page(s)."
+    )
+    for path, found in hits.items():
+        print(f"  {path}: {', '.join(found)}")
+    return hits
+
+
+def doc_relevance_reasons(changed_api, unanalyzed, diff_text, doc_files, index=None):
+    """Why the diff may affect the docs, found without any model call.
+
+    The diff is relevant when it changes the API surface (signatures,
+    exports, CLI options, env vars, config keys), touches files whose surface
+    is not parsed, changes a code symbol or file that a page mentions, or
+    changes the body of a public function or class that a page's code
+    mentions. Tests, CI setup and changelogs are ignored. index may be a SymbolIndex
+    already built over doc_files. Returns a list of reasons; empty means the
+    docs cannot be affected.
+    """
+    reasons = []
+    count = sum(len(changes) for _, _, changes in changed_api)
+    if count:
+        reasons.append(f"{count} API-surface change(s) in {len(changed_api)} file(s)")
+    if unanalyzed:
+        reasons.append(f"{len(unanalyzed)} unparsed file(s): {', '.join(unanalyzed)}")
+    source_diff = "".join(
+        file_diff
+        for file_diff in split_diff_files(diff_text)
+        if not is_non_surface_path(diff_file_path(file_diff))
+    )
+    index = index or SymbolIndex(doc_files)
+    hits = index.lookup(extract_changed_symbols(source_diff))
+    if hits:
+        found = sorted({s for found in hits.values() for s in found})
+        reasons.append(
+            f"changed symbol(s) {', '.join(found)} mentioned in {len(hits)} page(s)"
+        )
+    hits = index.lookup_names(changed_definitions(source_diff))
+    if hits:
+        found = sorted({s for found in hits.values() for s in found})
+        reasons.append(
+            f"changed code in {', '.join(found)} documented in {len(hits)} page(s)"
+        )
+    paths = {diff_file_path(f) for f in split_diff_files(source_diff)} - {""}
+    mentioned = sorted(
+        path for path in paths if any(path in text for text in doc_files.values())
+    )
+    if mentioned:
+        reasons.append(f"changed file(s) {', '.join(mentioned)} mentioned in the docs")
+    return reasons
+
+
+def finish_without_updates(gh, source_repo, source_pr, existing_pr, head_sha):
+    """Record the processed head (None keeps the old one) and tell the source
+    PR no update is needed."""
+    if existing_pr is not None:
+        record_source_head(existing_pr, head_sha)
+    post_source_pr_comment(
+        gh,
+        source_repo,
+        source_pr,
+        "📝 **Documentation check complete** — no documentation updates "
+        "appear to be needed for these changes.",
+    )
+
+
+def render_symbol_hits(symbols):
+    """Prompt note listing changed symbols that the target page mentions."""
+    if not symbols:
+        return ""
+    listed = ", ".join(f"`{symbol}`" for symbol in symbols)
+    return (
+        f"Changed code symbols mentioned verbatim in this file: {listed}. "
+        "Check every mention against the diff.\n"
+    )
+
+
+def triage_verdict(answer):
+    """True/False for a YES/NO triage answer, None for UNSURE."""
+    answer = answer.upper()
+    if "UNSURE" in answer:
+        return None
+    return "YES" in answer
+
+
 def call_openai_triage(
-    client, diff_text, pr_description, doc_files, custom_instructions=""
+    client,
+    diff_text,
+    pr_description,
+    doc_files,
+    custom_instructions="",
+    max_workers=MAX_CONCURRENCY,
+    model=None,
 ):
-    print("Checking each documentation file for needed updates...")
-    files_to_update = []
+    """Ask, one page per request, whether each page needs an update.
+
+    Uses the router's triage model; when the router has an escalation model,
+    that model may answer UNSURE and those pages are asked again on the
+    escalation model. An explicit model is asked for a plain YES/NO.
+    """
+    escalation_model = None if model else client.router.escalate("triage")
+    model = model or client.router.model("triage")
+    print(
+        f"Checking {len(doc_files)} documentation file(s) for needed updates "
+        f"on {model} ({max_workers} concurrent)..."
+    )
     custom_section = render_custom_instructions(custom_instructions)
+    system_prompt, answer_instruction = (
+        (TRIAGE_UNSURE_SYSTEM_PROMPT, TRIAGE_ANSWER_UNSURE)
+        if escalation_model
+        else (TRIAGE_SYSTEM_PROMPT, TRIAGE_ANSWER)
+    )
 
-    for path, content in doc_files.items():
-        print(f"  Checking {path}...")
-        prompt = TRIAGE_USER_PROMPT_TEMPLATE.format(
-            diff_text=diff_text[:MAX_DIFF_CHARS],
-            pr_description=pr_description or "No description provided.",
+    def triage_one(item):
+        path, content = item
+        prompt = fit_prompt(
+            TRIAGE_USER_PROMPT_TEMPLATE,
+            model,
+            system_prompt,
+            shared=shared_sections(diff_text, pr_description),
+            sections={
+                "content": (content, trim_markdown, MAX_DOC_CONTEXT_TOKENS),
+            },
             path=path,
-            content=content[:MAX_DOC_CONTEXT_CHARS],
             custom_instructions_section=custom_section,
+            answer_instruction=answer_instruction,
         )
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": TRIAGE_SYSTEM_PROMPT},
+        content = client.complete(
+            [
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt},
             ],
+            model=model,
         )
-        answer = get_message_content(response).upper()
-        if "YES" in answer:
-            print(f"    -> Update NEEDED for {path}")
+        return triage_verdict(content) if escalation_model else "YES" in content.upper()
+
+    # Report in input order once all calls finished, so the log (and the
+    # returned list) is deterministic regardless of completion order.
+    files_to_update, unsure = [], []
+    items = list(doc_files.items())
+    results = run_concurrently(triage_one, items, max_workers)
+    for (path, _), (needs_update, error) in zip(items, results):
+        if error is not None:
+            print(f"  Warning: triage failed for {path}, skipping: {error}")
+            client.report.record_failure(path, error)
+        elif needs_update is None:
+            print(f"  -> Unsure about {path}")
+            unsure.append(path)
+        elif needs_update:
+            print(f"  -> Update NEEDED for {path}")
             files_to_update.append(path)
         else:
-            print(f"    -> No update needed for {path}")
-
+            print(f"  -> No update needed for {path}")
+
+    if unsure:
+        print(f"Escalating {len(unsure)} unsure verdict(s) to {escalation_model}...")
+        files_to_update += call_openai_triage(
+            client,
+            diff_text,
+            pr_description,
+            {path: doc_files[path] for path in unsure},
+            custom_instructions,
+            max_workers,
+            escalation_model,
+        )
+        files_to_update = [path for path in doc_files if path in files_to_update]
     return files_to_update
 
 
-def call_openai_update(
-    client, diff_text, pr_description, doc_files, custom_instructions=""
+def yes_probability(candidates):
+    """P(YES) from first-token log-probabilities, normalized over YES and NO.
+
+    None when neither answer is among the candidates.
+    """
+    yes = no = 0.0
+    for token, logprob in candidates.items():
+        word = token.strip().upper()
+        if word in ("YES", "Y"):
+            yes += math.exp(logprob)
+        elif word in ("NO", "N"):
+            no += math.exp(logprob)
+    return yes / (yes + no) if yes + no else None
+
+
+def call_openai_triage_scored(
+    client,
+    diff_text,
+    pr_description,
+    doc_files,
+    custom_instructions="",
+    max_workers=MAX_CONCURRENCY,
+    threshold=TRIAGE_SCORE_THRESHOLD,
+    top_k=TRIAGE_SCORE_TOP_K,
 ):
+    """Score every page by the model's P(YES) and keep the best ones.
+
+    Each request asks for a one-token YES/NO answer with log-probabilities,
+    so output latency is minimal and every page gets a relevance score.
+    Pages scoring at least threshold are kept, at most top_k of them (0 for
+    no cap); each score and decision is logged to tune both. With an
+    escalation model, scores close to the threshold are replaced by that
+    model's. Pages without a usable score fall back to per-page triage.
+    """
+    model = client.router.model("triage")
+    escalation_model = client.router.escalate("triage")
+    custom_section = render_custom_instructions(custom_instructions)
     print(
-        f"Asking OpenAI to generate updated documentation for {len(doc_files)} files ..."
+        f"Scoring {len(doc_files)} documentation file(s) on {model} "
+        f"(threshold {threshold:g}, top {top_k or 'all'}, {max_workers} concurrent)..."
     )
 
-    updates = {}
-    custom_section = render_custom_instructions(custom_instructions)
+    def score_pages(paths, model):
+        def score_one(path):
+            prompt = fit_prompt(
+                TRIAGE_USER_PROMPT_TEMPLATE,
+                model,
+                TRIAGE_SYSTEM_PROMPT,
+                shared=shared_sections(diff_text, pr_description),
+                sections={
+                    "content": (doc_files[path], trim_markdown, MAX_DOC_CONTEXT_TOKENS),
+                },
+                path=path,
+                custom_instructions_section=custom_section,
+                answer_instruction=TRIAGE_ANSWER,
+            )
+            return yes_probability(
+                client.first_token_logprobs(
+                    [
+                        {"role": "system", "content": TRIAGE_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt},
+                    ],
+                    model=model,
+                )
+            )
+
+        scores = {}
+        for path, (score, error) in zip(
+            paths, run_concurrently(score_one, paths, max_workers)
+        ):
+            if error is not None:
+                print(f"  Warning: scoring failed for {path}: {error}")
+            elif score is not None:
+                scores[path] = score
+        return scores
+
+    scores = score_pages(list(doc_files), model)
+    unsure = [p for p, s in scores.items() if abs(s - threshold) < TRIAGE_SCORE_MARGIN]
+    if escalation_model and unsure:
+        print(
+            f"Re-scoring {len(unsure)} page(s) near the threshold on {escalation_model}..."
+        )
+        scores.update(score_pages(unsure, escalation_model))
+
+    kept = set()
+    ranking = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    for rank, (path, score) in enumerate(ranking, 1):
+        if score < threshold:
+            decision = "skip (below threshold)"
+        elif top_k > 0 and len(kept) >= top_k:
+            decision = "skip (beyond top-K)"
+        else:
+            decision = "update"
+            kept.add(path)
+        print(f"  #{rank:<3} {score:6.3f}  {decision:<22} {path}")
+    client.report.note(
+        "triage_scores", {path: round(score, 4) for path, score in ranking}
+    )
+
+    fallback = [path for path in doc_files if path not in scores]
+    if fallback:
+        print(f"Falling back to per-page triage for {len(fallback)} page(s)...")
+        kept.update(
+            call_openai_triage(
+                client,
+                diff_text,
+                pr_description,
+                {path: doc_files[path] for path in fallback},
+                custom_instructions,
+                max_workers,
+            )
+        )
+    return [path for path in doc_files if path in kept]
+
 
-    for target_path, target_content in doc_files.items():
-        print(f"  Updating {target_path}...")
+def pack_triage_batches(doc_files, budget_tokens):
+    """Greedily pack pages, in order, into batches of at most budget_tokens.
 
-        # Build ambient context from the *other* files being updated, so the
-        # target's own (untruncated) content is never clipped by the budget.
-        ambient_context = ""
-        for path, content in doc_files.items():
-            if path == target_path:
+    Returns (batches, oversized): a list of {path: section} dicts and the
+    paths whose section alone exceeds the budget.
+    """
+    batches = []
+    oversized = []
+    current, used = {}, 0
+    for path, content in doc_files.items():
+        section = TRIAGE_BATCH_FILE_TEMPLATE.format(
+            path=path, content=trim_markdown(content, MAX_DOC_CONTEXT_TOKENS)
+        )
+        cost = count_tokens(section)
+        if cost > budget_tokens:
+            oversized.append(path)
+            continue
+        if current and used + cost > budget_tokens:
+            batches.append(current)
+            current, used = {}, 0
+        current[path] = section
+        used += cost
+    if current:
+        batches.append(current)
+    return batches, oversized
+
+
+# Verdict strings accepted in batched triage answers; None means unsure.
+BATCH_VERDICTS = {
+    "yes": True,
+    "true": True,
+    "no": False,
+    "false": False,
+    "unsure": None,
+}
+
+
+def parse_batch_verdicts(text, paths):
+    """Map each expected path to True/False, or None for "unsure", from a
+    batched triage answer.
+
+    Paths missing from the answer, or with an unrecognised verdict, are left
+    out so the caller can fall back to per-page triage for them.
+    """
+    verdicts = {}
+    expected = set(paths)
+    for item in parse_json_array(text):
+        if not isinstance(item, dict):
+            continue
+        path = str(item.get("path") or "").strip()
+        value = item.get("update")
+        if isinstance(value, str):
+            value = value.strip().lower()
+            if value not in BATCH_VERDICTS:
                 continue
-            ambient_context += f"\n--- FILE: {path} ---\n{content}\n\n"
-
-        prompt = UPDATE_USER_PROMPT_TEMPLATE.format(
-            target_path=target_path,
-            target_content=target_content,
-            diff_text=diff_text[:MAX_DIFF_CHARS],
-            pr_description=pr_description or "No description provided.",
-            ambient_context=ambient_context[:MAX_DOC_CONTEXT_CHARS],
+            value = BATCH_VERDICTS[value]
+        if path in expected and (value is None or isinstance(value, bool)):
+            verdicts[path] = value
+    return verdicts
+
+
+def call_openai_triage_batched(
+    client,
+    diff_text,
+    pr_description,
+    doc_files,
+    custom_instructions="",
+    max_workers=MAX_CONCURRENCY,
+    budget_tokens=TRIAGE_BATCH_TOKENS,
+):
+    """Triage many pages per request, sending the diff only once per batch.
+
+    Pages that do not fit the token budget, sit in a failed batch, or get no
+    parseable verdict fall back to per-page triage. With an escalation model
+    routed, pages the batch marks "unsure" are asked again on that model.
+    """
+    model = client.router.model("triage")
+    escalation_model = client.router.escalate("triage")
+    update_values = (
+        TRIAGE_BATCH_UPDATE_UNSURE if escalation_model else TRIAGE_BATCH_UPDATE
+    )
+    custom_section = render_custom_instructions(custom_instructions)
+    # The diff and description are shared by every batch: fit them once into
+    # at most half the budget, then give the rest to the pages.
+    budget_tokens = min(budget_tokens, prompt_token_limit(model))
+    shared = fit_sections(
+        shared_sections(diff_text, pr_description), budget_tokens // 2
+    )
+    overhead = count_tokens(
+        TRIAGE_BATCH_SYSTEM_PROMPT
+        + TRIAGE_BATCH_USER_PROMPT_TEMPLATE.format(
+            **shared,
+            files_section="",
             custom_instructions_section=custom_section,
+            update_values=update_values,
         )
+    )
+    batches, fallback = pack_triage_batches(doc_files, max(budget_tokens - overhead, 0))
+    print(
+        f"Checking {len(doc_files)} documentation file(s) in {len(batches)} "
+        f"batch(es) on {model} ({max_workers} concurrent)..."
+    )
 
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": UPDATE_SYSTEM_PROMPT,
-                },
+    def triage_batch(batch):
+        prompt = TRIAGE_BATCH_USER_PROMPT_TEMPLATE.format(
+            **shared,
+            files_section="".join(batch.values()),
+            custom_instructions_section=custom_section,
+            update_values=update_values,
+        )
+        content = client.complete(
+            [
+                {"role": "system", "content": TRIAGE_BATCH_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
+            model=model,
+        )
+        return parse_batch_verdicts(content, batch)
+
+    verdicts = {}
+    for batch, (batch_verdicts, error) in zip(
+        batches, run_concurrently(triage_batch, batches, max_workers)
+    ):
+        if error is not None:
+            print(f"  Warning: batched triage failed for {len(batch)} page(s): {error}")
+            batch_verdicts = {}
+        if not escalation_model:
+            # Without an escalation model, "unsure" goes to per-page triage.
+            batch_verdicts = {p: v for p, v in batch_verdicts.items() if v is not None}
+        verdicts.update(batch_verdicts)
+        fallback.extend(path for path in batch if path not in batch_verdicts)
+
+    unsure = [path for path, needs_update in verdicts.items() if needs_update is None]
+    for path, needs_update in verdicts.items():
+        if needs_update is None:
+            print(f"  -> Unsure about {path}")
+            continue
+        print(
+            f"  -> {'Update NEEDED' if needs_update else 'No update needed'} for {path}"
+        )
+
+    if unsure:
+        print(f"Escalating {len(unsure)} unsure verdict(s) to {escalation_model}...")
+        escalated = call_openai_triage(
+            client,
+            diff_text,
+            pr_description,
+            {path: doc_files[path] for path in unsure},
+            custom_instructions,
+            max_workers,
+            escalation_model,
+        )
+        verdicts.update({path: path in escalated for path in unsure})
+
+    if fallback:
+        print(f"Falling back to per-page triage for {len(fallback)} page(s)...")
+        retried = call_openai_triage(
+            client,
+            diff_text,
+            pr_description,
+            {path: doc_files[path] for path in fallback},
+            custom_instructions,
+            max_workers,
+        )
+        verdicts.update({path: path in retried for path in fallback})
+
+    return [path for path in doc_files if verdicts.get(path)]
+
+
+class AmbientContext:
+    """Selects the sibling pages worth showing next to one target page.
+
+    Pages are ranked against the target and the diff (RelatedPages) and added
+    best first: in full while they fit the budget, else as a precomputed
+    summary (lead paragraph and heading outline). Unrelated pages are left
+    out. Blocks and their token counts are computed once per run.
+    """
+
+    def __init__(self, context_files, diff_text, max_tokens=MAX_DOC_CONTEXT_TOKENS):
+        self.related = RelatedPages(context_files)
+        self.query = extract_diff_terms(diff_text)
+        self.max_tokens = max_tokens
+        self.blocks = {}
+        for path, content in context_files.items():
+            variants = [content, page_summary(content)]
+            self.blocks[path] = [
+                (block, count_tokens(block))
+                for block in (
+                    f"\n--- FILE: {path} ---\n{text}\n\n" for text in variants
+                )
+            ]
+
+    def build(self, target_path, target_content="", hint=""):
+        """Ambient context for target_path, excluding the target itself.
+
+        hint is extra ranking text, e.g. a new page's title and purpose.
+        """
+        chosen, used, summarized = [], 0, 0
+        ranking = self.related.rank(
+            target_path, self.query + tokenize(hint), target_content
         )
+        for path, _ in ranking:
+            for variant, (block, cost) in enumerate(self.blocks[path]):
+                if used + cost <= self.max_tokens:
+                    chosen.append(block)
+                    used += cost
+                    summarized += variant
+                    break
+        print(
+            f"  Context for {target_path}: {len(chosen)} of "
+            f"{len(self.blocks) - (target_path in self.blocks)} page(s) "
+            f"({summarized} summarized, {used} tokens)"
+        )
+        return "".join(chosen)
 
-        new_content = strip_code_fences(get_message_content(response))
 
-        if new_content.strip() == DELETE_FILE_MARKER:
+def call_openai_update(
+    client,
+    diff_text,
+    pr_description,
+    doc_files,
+    custom_instructions="",
+    max_workers=MAX_CONCURRENCY,
+    context_files=None,
+    stream=STREAM_GENERATION,
+    symbol_hits=None,
+    update_mode=UPDATE_MODE,
+):
+    """Generate the new content of each page in doc_files.
+
+    Each prompt carries the sibling pages from context_files (default:
+    doc_files) most related to its target, selected by AmbientContext, and
+    the changed symbols the target mentions (symbol_hits, {path: symbols}).
+    With stream, each answer is consumed as it is generated: a delete or
+    no-changes marker ends it at once, and output beyond the page's ceiling
+    is abandoned (the page is skipped rather than truncated).
+    With update_mode "patch", Markdown pages are updated from section-level
+    edits applied locally; a page whose edits do not apply cleanly is
+    rewritten whole instead.
+    """
+    model = client.router.model("update")
+    print(
+        f"Asking OpenAI to generate updated documentation for {len(doc_files)} files ..."
+    )
+
+    custom_section = render_custom_instructions(custom_instructions)
+    ambient = AmbientContext(
+        doc_files if context_files is None else context_files, diff_text
+    )
+
+    def update_one(item):
+        target_path, target_content = item
+        # The target itself is never part of the ambient context, so its own
+        # (untruncated) content is never clipped by the budget.
+        ambient_context = ambient.build(target_path, target_content)
+
+        def ask(system_prompt, template):
+            prompt = fit_prompt(
+                template,
+                model,
+                system_prompt,
+                shared=shared_sections(diff_text, pr_description),
+                sections={
+                    "ambient_context": (
+                        ambient_context,
+                        trim_file_blocks,
+                        MAX_DOC_CONTEXT_TOKENS,
+                    ),
+                },
+                target_path=target_path,
+                target_content=target_content,
+                symbol_hits_section=render_symbol_hits(
+                    (symbol_hits or {}).get(target_path)
+                ),
+                custom_instructions_section=custom_section,
+            )
+            messages = [
+                {
+                    "role": "system",
+                    "content": system_prompt,
+                },
+                {"role": "user", "content": prompt},
+            ]
+            if stream:
+                content = client.complete_streaming(
+                    messages,
+                    model=model,
+                    stop_when=early_update_verdict,
+                    max_output_tokens=page_output_ceiling(target_content),
+                )
+            else:
+                content = client.complete(messages, model=model)
+            return strip_code_fences(content)
+
+        if update_mode == "patch" and target_path.endswith(".md"):
+            answer = ask(PATCH_SYSTEM_PROMPT, PATCH_USER_PROMPT_TEMPLATE)
+            verdict = early_update_verdict(answer)
+            if verdict:
+                return verdict
+            try:
+                return apply_patch_answer(target_content, answer)
+            except PatchError as e:
+                print(f"  Patch for {target_path} does not apply ({e}); rewriting it")
+        return ask(UPDATE_SYSTEM_PROMPT, UPDATE_USER_PROMPT_TEMPLATE)
+
+    updates = {}
+    items = list(doc_files.items())
+    results = run_concurrently(update_one, items, max_workers)
+    for (target_path, target_content), (new_content, error) in zip(items, results):
+        if error is not None:
+            print(f"  Warning: update failed for {target_path}, skipping: {error}")
+            client.report.record_failure(target_path, error)
+        elif new_content.strip() == DELETE_FILE_MARKER:
             updates[target_path] = None
-            print(f"    -> Marked {target_path} for DELETION")
+            print(f"  -> Marked {target_path} for DELETION")
+        elif new_content.strip() == NO_CHANGES_MARKER:
+            print(f"  -> No changes needed for {target_path}")
         elif new_content and new_content != target_content:
             updates[target_path] = new_content
-            print(f"    -> Generated updates for {target_path}")
+            print(f"  -> Generated updates for {target_path}")
         else:
-            print(f"    -> No changes generated for {target_path}")
+            print(f"  -> No changes generated for {target_path}")
 
     return updates
 
 
+def apply_patch_answer(content, answer):
+    """Apply a patch-mode answer (a JSON array of edits) to content.
+
+    Raises PatchError when the answer is not an edit list or any edit does
+    not apply cleanly; an explicit empty list leaves the page unchanged.
+    """
+    edits = parse_json_array(answer)
+    if not edits and strip_code_fences(answer).strip() != "[]":
+        raise PatchError("answer is not a JSON array of edits")
+    return apply_edits(content, edits)
+
+
 def normalize_new_doc_proposals(proposals, doc_path, existing_paths):
     """Validate/clean model-proposed new pages.
 
@@ -339,77 +1713,122 @@ def call_openai_propose_new_docs(
     custom_instructions="",
 ):
     """Ask the model whether the diff warrants entirely new documentation pages."""
+    model = client.router.model("propose")
     print("Checking whether the changes warrant entirely new documentation pages...")
     custom_section = render_custom_instructions(custom_instructions)
     config_blob = (
         "\n\n".join(f"--- {p} ---\n{c}" for p, c in vitepress_config.items())
         or "No VitePress config found."
     )
-    prompt = PROPOSE_NEW_DOCS_USER_PROMPT_TEMPLATE.format(
-        diff_text=diff_text[:MAX_DIFF_CHARS],
-        pr_description=pr_description or "No description provided.",
-        existing_paths="\n".join(sorted(existing_paths)) or "(none)",
-        vitepress_config=config_blob[:MAX_DOC_CONTEXT_CHARS],
+    prompt = fit_prompt(
+        PROPOSE_NEW_DOCS_USER_PROMPT_TEMPLATE,
+        model,
+        PROPOSE_NEW_DOCS_SYSTEM_PROMPT,
+        shared=shared_sections(diff_text, pr_description),
+        sections={
+            "existing_paths": (
+                "\n".join(sorted(existing_paths)) or "(none)",
+                trim_lines,
+                MAX_DOC_CONTEXT_TOKENS,
+            ),
+            "vitepress_config": (config_blob, trim_lines, MAX_DOC_CONTEXT_TOKENS),
+        },
         doc_path=doc_path,
         max_new_docs=MAX_NEW_DOCS,
         custom_instructions_section=custom_section,
     )
-    response = client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=[
+    content = client.complete(
+        [
             {"role": "system", "content": PROPOSE_NEW_DOCS_SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
+        model=model,
     )
-    proposals = parse_json_array(get_message_content(response))
+    proposals = parse_json_array(content)
     return normalize_new_doc_proposals(proposals, doc_path, existing_paths)
 
 
 def call_openai_create_new_docs(
-    client, diff_text, pr_description, new_docs, ambient_files, custom_instructions=""
+    client,
+    diff_text,
+    pr_description,
+    new_docs,
+    ambient_files,
+    custom_instructions="",
+    max_workers=MAX_CONCURRENCY,
+    stream=STREAM_GENERATION,
 ):
-    """Generate the full content for each proposed brand-new page."""
+    """Generate the full content for each proposed brand-new page.
+
+    With stream, generation is capped at page_output_ceiling() tokens and
+    an over-long page is skipped rather than truncated.
+    """
+    model = client.router.model("create")
     if not new_docs:
         return {}
     print(f"Generating {len(new_docs)} new documentation page(s)...")
     custom_section = render_custom_instructions(custom_instructions)
 
-    ambient_context = ""
-    for path, content in ambient_files.items():
-        ambient_context += f"\n--- FILE: {path} ---\n{content}\n\n"
+    ambient = AmbientContext(ambient_files, diff_text)
 
-    created = {}
-    for nd in new_docs:
-        print(f"  Creating {nd['path']}...")
-        prompt = CREATE_DOC_USER_PROMPT_TEMPLATE.format(
+    def create_one(nd):
+        ambient_context = ambient.build(
+            nd["path"], hint=f"{nd['title']}\n{nd['reason']}"
+        )
+        prompt = fit_prompt(
+            CREATE_DOC_USER_PROMPT_TEMPLATE,
+            model,
+            CREATE_DOC_SYSTEM_PROMPT,
+            shared=shared_sections(diff_text, pr_description),
+            sections={
+                "ambient_context": (
+                    ambient_context,
+                    trim_file_blocks,
+                    MAX_DOC_CONTEXT_TOKENS,
+                ),
+            },
             target_path=nd["path"],
             title=nd["title"],
             reason=nd["reason"] or "n/a",
-            diff_text=diff_text[:MAX_DIFF_CHARS],
-            pr_description=pr_description or "No description provided.",
-            ambient_context=ambient_context[:MAX_DOC_CONTEXT_CHARS],
             custom_instructions_section=custom_section,
         )
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": CREATE_DOC_SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
-        )
-        content = strip_code_fences(get_message_content(response))
-        if content.strip():
+        messages = [
+            {"role": "system", "content": CREATE_DOC_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        if stream:
+            content = client.complete_streaming(
+                messages, model=model, max_output_tokens=page_output_ceiling()
+            )
+        else:
+            content = client.complete(messages, model=model)
+        return strip_code_fences(content)
+
+    created = {}
+    results = run_concurrently(create_one, new_docs, max_workers)
+    for nd, (content, error) in zip(new_docs, results):
+        if error is not None:
+            print(f"  Warning: failed to create {nd['path']}, skipping: {error}")
+            client.report.record_failure(nd["path"], error)
+        elif content.strip():
             created[nd["path"]] = content
-            print(f"    -> Generated new page {nd['path']}")
+            print(f"  -> Generated new page {nd['path']}")
         else:
-            print(f"    -> Model returned empty content for {nd['path']}; skipping")
+            print(f"  -> Model returned empty content for {nd['path']}; skipping")
     return created
 
 
 def call_openai_update_vitepress_config(
-    client, config_files, new_docs, diff_text, pr_description, custom_instructions=""
+    client,
+    config_files,
+    new_docs,
+    diff_text,
+    pr_description,
+    custom_instructions="",
+    max_workers=MAX_CONCURRENCY,
 ):
     """Update the VitePress config's nav/sidebar for new/renamed/removed pages."""
+    model = client.router.model("config")
     updates = {}
     if not config_files:
         return updates
@@ -424,29 +1843,39 @@ def call_openai_update_vitepress_config(
     else:
         new_docs_section = "No new pages were created in this round.\n"
 
-    for config_path, config_content in config_files.items():
-        print(f"  Updating VitePress navigation in {config_path}...")
-        prompt = CONFIG_UPDATE_USER_PROMPT_TEMPLATE.format(
+    def update_config(item):
+        config_path, config_content = item
+        prompt = fit_prompt(
+            CONFIG_UPDATE_USER_PROMPT_TEMPLATE,
+            model,
+            CONFIG_UPDATE_SYSTEM_PROMPT,
+            shared=shared_sections(diff_text, pr_description),
             config_path=config_path,
             config_content=config_content,
             new_docs_section=new_docs_section,
-            diff_text=diff_text[:MAX_DIFF_CHARS],
-            pr_description=pr_description or "No description provided.",
             custom_instructions_section=custom_section,
         )
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
+        content = client.complete(
+            [
                 {"role": "system", "content": CONFIG_UPDATE_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
+            model=model,
         )
-        new_content = strip_code_fences(get_message_content(response))
-        if new_content.strip() and new_content != config_content:
+        return strip_code_fences(content)
+
+    print(f"Updating VitePress navigation in {len(config_files)} config file(s)...")
+    items = list(config_files.items())
+    results = run_concurrently(update_config, items, max_workers)
+    for (config_path, config_content), (new_content, error) in zip(items, results):
+        if error is not None:
+            print(f"  Warning: navigation update failed for {config_path}: {error}")
+            client.report.record_failure(config_path, error)
+        elif new_content.strip() and new_content != config_content:
             updates[config_path] = new_content
-            print(f"    -> Updated navigation in {config_path}")
+            print(f"  -> Updated navigation in {config_path}")
         else:
-            print(f"    -> No navigation changes for {config_path}")
+            print(f"  -> No navigation changes for {config_path}")
     return updates
 
 
@@ -454,6 +1883,7 @@ def call_openai_summary(
     client, diff_text, pr_description, doc_files, updates, custom_instructions=""
 ):
     """Generate a short Markdown summary of the doc changes for a PR comment."""
+    model = client.router.model("summary")
     custom_section = render_custom_instructions(custom_instructions)
 
     doc_diffs = ""
@@ -475,28 +1905,201 @@ def call_openai_summary(
         f"{path} (deleted)" if content is None else path
         for path, content in updates.items()
     )
-    prompt = SUMMARY_USER_PROMPT_TEMPLATE.format(
-        diff_text=diff_text[:MAX_DIFF_CHARS],
-        pr_description=pr_description or "No description provided.",
+    prompt = fit_prompt(
+        SUMMARY_USER_PROMPT_TEMPLATE,
+        model,
+        SUMMARY_SYSTEM_PROMPT,
+        shared=shared_sections(diff_text, pr_description),
+        sections={
+            "doc_diffs": (doc_diffs, trim_diff, MAX_DOC_CONTEXT_TOKENS),
+        },
         updated_paths=updated_paths,
-        doc_diffs=doc_diffs[:MAX_DOC_CONTEXT_CHARS],
         custom_instructions_section=custom_section,
     )
 
     try:
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
+        return client.complete(
+            [
                 {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
+            model=model,
         )
-        return get_message_content(response)
     except Exception as e:  # noqa: BLE001 - summary is best-effort
         print(f"Warning: failed to generate summary: {e}")
         return ""
 
 
+def generate_doc_updates(
+    client,
+    diff_text,
+    pr_description,
+    md_files,
+    config_files,
+    doc_path,
+    *,
+    custom_instructions="",
+    max_workers=MAX_CONCURRENCY,
+    triage_mode=TRIAGE_MODE,
+    triage_threshold=TRIAGE_SCORE_THRESHOLD,
+    triage_top_k=TRIAGE_SCORE_TOP_K,
+    prefilter_top_k=PREFILTER_TOP_K,
+    source_diff=None,
+    triage_diff=None,
+    stream_generation=STREAM_GENERATION,
+    symbol_match_max_pages=SYMBOL_MATCH_MAX_PAGES,
+    update_mode=UPDATE_MODE,
+    symbol_index=None,
+):
+    """Propose, triage and generate every doc change as one job graph.
+
+    Existing-page triage/updates and new-page proposal/creation are
+    independent and run concurrently; the navigation update waits until the
+    new pages are known. All model calls share the client's request budget.
+    diff_text is what the prompts see (possibly condensed change notes). The
+    tuning options are keyword-only: source_diff, when given, is the raw diff
+    used for local page ranking; triage_diff, when given, replaces diff_text
+    in the triage prompts; symbol_index, when given, is a SymbolIndex already
+    built over the pages.
+    Returns {path: content or None for deletion}.
+    """
+
+    def propose(_):
+        new_docs = call_openai_propose_new_docs(
+            client,
+            diff_text,
+            pr_description,
+            list(md_files),
+            config_files,
+            doc_path,
+            custom_instructions,
+        )
+        if new_docs:
+            print(
+                f"Proposed {len(new_docs)} new page(s): "
+                + ", ".join(nd["path"] for nd in new_docs)
+            )
+        return new_docs
+
+    def triage(_):
+        if triage_mode == "scored":
+
+            def triage_fn(*triage_args):
+                return call_openai_triage_scored(
+                    *triage_args, triage_threshold, triage_top_k
+                )
+
+        elif triage_mode == "batched":
+            triage_fn = call_openai_triage_batched
+        else:
+            triage_fn = call_openai_triage
+        # Exact symbol hits are certain matches: update them without asking.
+        hits = match_changed_symbols(
+            md_files, source_diff or diff_text, symbol_match_max_pages, symbol_index
+        )
+        candidates = prefilter_pages(
+            {p: c for p, c in md_files.items() if p not in hits},
+            source_diff or diff_text,
+            prefilter_top_k,
+        )
+        triaged = []
+        if candidates:
+            triaged = triage_fn(
+                client,
+                triage_diff or diff_text,
+                pr_description,
+                candidates,
+                custom_instructions,
+                max_workers,
+            )
+        return list(hits) + triaged, hits
+
+    def update(results):
+        files_to_update, hits = results["triage"]
+        if not files_to_update:
+            return {}
+        print(f"Updating {len(files_to_update)} existing page(s)...")
+        return call_openai_update(
+            client,
+            diff_text,
+            pr_description,
+            {path: md_files[path] for path in files_to_update},
+            custom_instructions,
+            max_workers,
+            md_files,
+            stream_generation,
+            hits,
+            update_mode,
+        )
+
+    def create(results):
+        return call_openai_create_new_docs(
+            client,
+            diff_text,
+            pr_description,
+            results["propose"],
+            md_files,
+            custom_instructions,
+            max_workers,
+            stream_generation,
+        )
+
+    def config_triage(results):
+        # Only needed when no new pages force a navigation update anyway.
+        if results["propose"] or not config_files:
+            return bool(results["propose"])
+        return bool(
+            call_openai_triage(
+                client,
+                diff_text,
+                pr_description,
+                config_files,
+                custom_instructions,
+                max_workers,
+            )
+        )
+
+    def config(results):
+        # Update the VitePress navigation when pages were created, or when the
+        # config itself needs structural fixes (renamed/removed pages). Only
+        # link pages that were actually generated.
+        if not results["config_triage"]:
+            return {}
+        created = [nd for nd in results["propose"] if nd["path"] in results["create"]]
+        return call_openai_update_vitepress_config(
+            client,
+            config_files,
+            created,
+            diff_text,
+            pr_description,
+            custom_instructions,
+            max_workers,
+        )
+
+    def staged(name, func):
+        def run(results):
+            with client.report.stage(name):
+                return func(results)
+
+        return run
+
+    jobs = {
+        "propose": ((), propose),
+        "triage": ((), triage),
+        "update": (("triage",), update),
+        "create": (("propose",), create),
+        "config_triage": (("propose",), config_triage),
+        "config": (("propose", "create", "config_triage"), config),
+    }
+    results = run_job_graph(
+        {name: (deps, staged(name, func)) for name, (deps, func) in jobs.items()}
+    )
+    updates = {}
+    for stage in ("update", "create", "config"):
+        updates.update(results[stage])
+    return updates
+
+
 def post_source_pr_comment(gh, source_repo, source_pr, body):
     """Post a comment back on the source PR. Best-effort."""
     try:
@@ -507,62 +2110,99 @@ def post_source_pr_comment(gh, source_repo, source_pr, body):
         print(f"Warning: could not post comment on source PR: {e}")
 
 
+def git_blob_sha(content):
+    """SHA git assigns to a blob with this (UTF-8) content."""
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def get_tree_entries(doc_repo, tree_sha, paths, ref):
+    """Map each of paths present at tree_sha to its (blob sha, mode)."""
+    tree = doc_repo.get_git_tree(tree_sha, recursive=True)
+    if not tree.raw_data.get("truncated"):
+        return tree, {
+            el.path: (el.sha, el.mode)
+            for el in tree.tree
+            if el.type == "blob" and el.path in paths
+        }
+    # Listing too large to be complete; look the touched paths up directly.
+    entries = {}
+    for path in paths:
+        try:
+            entries[path] = (doc_repo.get_contents(path, ref=ref).sha, "100644")
+        except GithubException:
+            continue
+    return tree, entries
+
+
 def apply_updates_to_repo(doc_repo, updates, new_branch_name):
     """Apply updates (content or None for deletion) to the branch.
 
-    Skips no-op writes so re-runs don't push empty duplicate commits.
-    Returns the number of commits actually made.
+    Builds one tree from all changes against the branch head, creates a
+    single commit and fast-forwards the branch, so the number of API calls
+    does not grow with the number of files. Skips no-op writes (content
+    already identical, deletion of an absent file) so re-runs don't push
+    empty duplicate commits. Returns the number of files actually changed.
     """
-    changed = 0
-    for file_path, new_content in updates.items():
-        try:
-            contents = doc_repo.get_contents(file_path, ref=new_branch_name)
-        except GithubException:
-            contents = None
+    ref = doc_repo.get_git_ref(f"heads/{new_branch_name}")
+    head = doc_repo.get_git_commit(ref.object.sha)
+    base_tree, existing = get_tree_entries(
+        doc_repo, head.tree.sha, set(updates), new_branch_name
+    )
 
+    elements = []
+    actions = []
+    for file_path, new_content in updates.items():
+        current = existing.get(file_path)
         if new_content is None:
-            if contents is None:
+            if current is None:
                 print(f"Skipping deletion of {file_path}: already absent.")
                 continue
             print(f"Deleting {file_path}...")
-            doc_repo.delete_file(
-                contents.path,
-                f"Delete {file_path}",
-                contents.sha,
-                branch=new_branch_name,
+            elements.append(
+                InputGitTreeElement(file_path, current[1], "blob", sha=None)
             )
-            changed += 1
-        elif contents is None:
+            actions.append(f"Delete {file_path}")
+        elif current is None:
             print(f"Creating new file {file_path}...")
-            doc_repo.create_file(
-                file_path, f"Create {file_path}", new_content, branch=new_branch_name
+            elements.append(
+                InputGitTreeElement(file_path, "100644", "blob", content=new_content)
             )
-            changed += 1
+            actions.append(f"Create {file_path}")
+        elif current[0] == git_blob_sha(new_content):
+            print(f"Skipping {file_path}: branch content already up to date.")
         else:
-            try:
-                current = contents.decoded_content.decode("utf-8")
-            except Exception:
-                current = None
-            if current == new_content:
-                print(f"Skipping {file_path}: branch content already up to date.")
-                continue
             print(f"Updating {file_path}...")
-            doc_repo.update_file(
-                contents.path,
-                f"Update {file_path}",
-                new_content,
-                contents.sha,
-                branch=new_branch_name,
+            elements.append(
+                InputGitTreeElement(file_path, current[1], "blob", content=new_content)
             )
-            changed += 1
-    return changed
+            actions.append(f"Update {file_path}")
+
+    if not elements:
+        return 0
+
+    tree = doc_repo.create_git_tree(elements, base_tree)
+    title = (
+        actions[0]
+        if len(actions) == 1
+        else f"Update documentation ({len(actions)} files)"
+    )
+    message = title if len(actions) == 1 else title + "\n\n" + "\n".join(actions)
+    commit = doc_repo.create_git_commit(message, tree, [head])
+    ref.edit(sha=commit.sha)
+    print(f"Committed {len(actions)} file change(s) as {commit.sha[:7]}.")
+    return len(actions)
 
 
-def create_doc_pr(source_repo, source_pr, doc_repo, branch_name, existing_pr, updates):
+def create_doc_pr(
+    source_repo, source_pr, doc_repo, branch_name, existing_pr, updates, source_head
+):
     """Create or update a single doc PR per source PR (idempotent).
 
     Reuses a deterministic branch so repeated /documentation comments refine
     the same documentation PR instead of opening a new one each time.
+    source_head is recorded in the PR body for incremental follow-up rounds;
+    None keeps the previously recorded head (or records none on a new PR).
     Returns the PR's html_url, or None if nothing changed and no PR exists.
     """
     base_branch = doc_repo.default_branch
@@ -585,6 +2225,7 @@ def create_doc_pr(source_repo, source_pr, doc_repo, branch_name, existing_pr, up
 
     if existing_pr is not None:
         print(f"Reusing existing PR: {existing_pr.html_url}")
+        record_source_head(existing_pr, source_head)
         return existing_pr.html_url
 
     if changed == 0:
@@ -596,6 +2237,8 @@ def create_doc_pr(source_repo, source_pr, doc_repo, branch_name, existing_pr, up
         f"Automated documentation update triggered by changes in "
         f"{source_repo} PR #{source_pr}."
     )
+    if source_head:
+        pr_body += f"\n\n{SOURCE_HEAD_MARKER.format(sha=source_head)}"
     pr = doc_repo.create_pull(
         title=f"Docs Update for {source_repo} #{source_pr}",
         body=pr_body,
@@ -607,74 +2250,146 @@ def create_doc_pr(source_repo, source_pr, doc_repo, branch_name, existing_pr, up
     return pr.html_url
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Update documentation based on PR diff."
-    )
-    parser.add_argument("--source-pr", required=True, help="PR number of source")
-    parser.add_argument(
-        "--source-repo", required=True, help="Source repository (owner/name)"
-    )
-    parser.add_argument(
-        "--doc-repo", required=True, help="Documentation repository (owner/name)"
-    )
-    parser.add_argument(
-        "--doc-path", required=True, help="Path within doc repo to scan"
-    )
-    parser.add_argument(
-        "--repo-path", default=".", help="Local path to source repo git"
-    )
-    parser.add_argument(
-        "--custom-instructions",
-        default="",
-        help="Optional free-text instructions from the /documentation command.",
-    )
-
-    args = parser.parse_args()
+def run_doc_update(args, gh, client):
+    """Run one /documentation round: diff, docs, generation, PR, comment."""
     custom_instructions = args.custom_instructions
     source_repo = args.source_repo
     source_pr = int(args.source_pr)
-
-    gh_token = os.environ.get("GH_TOKEN")
-    openai_key = os.environ.get("OPENAI_API_KEY")
-
-    if not gh_token or not openai_key:
-        print("Missing GH_TOKEN or OPENAI_API_KEY environment variables.")
-        sys.exit(1)
-
-    gh = Github(auth=github.Auth.Token(gh_token))
-    client = OpenAI(api_key=openai_key, base_url=OPENAI_BASE_URL)
+    stage = client.report.stage
 
     if custom_instructions.strip():
         print(f"Custom instructions: {custom_instructions.strip()}")
 
-    # 1. Get Diff
-    diff_text, pr_description = get_local_git_diff(
-        gh, source_repo, source_pr, args.repo_path
-    )
+    # 1. Get Diff. The open doc PR for this source PR, if any, records the
+    # source head the previous round processed, so follow-up rounds only diff
+    # the commits pushed since then.
+    with stage("fetch_diff"):
+        doc_repo = gh.get_repo(args.doc_repo)
+        branch_name = sanitize_branch_component(
+            f"{PR_BRANCH_PREFIX}-{source_repo}-{source_pr}"
+        )
+        existing_prs = list(
+            doc_repo.get_pulls(
+                state="open", head=f"{doc_repo.owner.login}:{branch_name}"
+            )
+        )
+        existing_pr = existing_prs[0] if existing_prs else None
+        since_sha = None
+        if existing_pr is not None and args.incremental:
+            since_sha = read_source_head_marker(existing_pr)
+
+        diff_text, pr_description, head_sha, diff_range = get_local_git_diff(
+            gh,
+            source_repo,
+            source_pr,
+            args.repo_path,
+            since_sha,
+            args.git_fetch_mode,
+        )
+        if since_sha and not diff_text.strip():
+            if not custom_instructions.strip():
+                print("No new source changes since the last round, nothing to do.")
+                sys.exit(0)
+            # Nothing new, but the instructions may ask for more work on the
+            # whole PR: give them the full diff.
+            print("No new source changes; using the full diff for the instructions.")
+            diff_text, pr_description, head_sha, diff_range = get_local_git_diff(
+                gh,
+                source_repo,
+                source_pr,
+                args.repo_path,
+                fetch_mode=args.git_fetch_mode,
+            )
     if not diff_text.strip():
         print("Empty diff, nothing to do.")
         sys.exit(0)
 
+    # Strip noise (lockfiles, generated files, formatting-only hunks) first,
+    # so neither the budget nor the local ranking is spent on it.
+    if args.diff_preprocess:
+        with stage("preprocess_diff"):
+            diff_text, removed = preprocess_diff(
+                diff_text, count_tokens, args.diff_huge_file_tokens
+            )
+        log_diff_preprocessing(removed)
+        client.report.note("diff_preprocessing", removed)
+        if not diff_text.strip():
+            print("Only lockfile, generated or formatting changes; nothing to do.")
+            sys.exit(0)
+
     print(f"Diff length: {len(diff_text)} chars")
+    # The raw diff is kept for local analysis.
+    source_diff = diff_text
+    # The API-surface analysis feeds the prompt summary and the fast exit.
+    changed_api, unanalyzed = [], []
+    fast_exit = args.fast_exit and not custom_instructions.strip()
+    if args.api_summary != "off" or fast_exit:
+        with stage("api_surface"):
+            changed_api, unanalyzed = api_changes(
+                args.repo_path, *diff_range, source_diff
+            )
 
     # 2. Get Docs — read from the open doc PR branch when one exists, so
     # follow-up /documentation rounds build on earlier automated changes
     # instead of regenerating them from the default branch.
-    doc_repo = gh.get_repo(args.doc_repo)
-    branch_name = sanitize_branch_component(
-        f"{PR_BRANCH_PREFIX}-{source_repo}-{source_pr}"
-    )
-    existing_prs = list(
-        doc_repo.get_pulls(state="open", head=f"{doc_repo.owner.login}:{branch_name}")
-    )
-    existing_pr = existing_prs[0] if existing_prs else None
     doc_ref = branch_name if existing_pr else doc_repo.default_branch
-
-    doc_files = get_doc_files(doc_repo, args.doc_path, doc_ref)
+    with stage("fetch_docs"):
+        doc_files = get_doc_files(
+            doc_repo,
+            args.doc_path,
+            doc_ref,
+            args.max_concurrency,
+            DocSnapshot(client.cache),
+        )
     if not doc_files:
         print(f"No markdown files found in {args.doc_path}.")
         sys.exit(0)
+    # One symbol index serves both the relevance check and symbol matching.
+    symbol_index = SymbolIndex(doc_files)
+
+    # Changes that touch nothing user-facing or documented (private helpers,
+    # tests) are settled here, before any model call.
+    if fast_exit:
+        with stage("relevance_check"):
+            reasons = doc_relevance_reasons(
+                changed_api, unanalyzed, source_diff, doc_files, symbol_index
+            )
+        client.report.note("relevance_check", reasons)
+        if not reasons:
+            print("No public API, config or CLI change and no documented symbol.")
+            with stage("publish"):
+                finish_without_updates(
+                    gh, source_repo, source_pr, existing_pr, head_sha
+                )
+            sys.exit(0)
+        print("Docs may be affected: " + "; ".join(reasons))
+
+    # Large diffs are condensed into change notes instead of being truncated.
+    with stage("condense_diff"):
+        diff_text = condense_diff(
+            client,
+            diff_text,
+            pr_description,
+            args.diff_chunk_tokens,
+            args.max_concurrency,
+        )
+
+    # A parsed summary of the API-surface changes goes before the diff in all
+    # prompts; in "triage" mode the per-page triage calls see only the summary.
+    triage_diff = None
+    summary, changes = render_api_changes(changed_api)
+    if summary and args.api_summary != "off":
+        summary_tokens = count_tokens(summary)
+        print(
+            f"API surface summary: {changes} change(s) in ~{summary_tokens} "
+            f"tokens (diff: ~{count_tokens(diff_text)} tokens)."
+        )
+        client.report.note(
+            "api_surface", {"changes": changes, "tokens": summary_tokens}
+        )
+        if args.api_summary == "triage":
+            triage_diff = summary
+        diff_text = f"{summary}\n{diff_text}"
 
     # Separate the VitePress config (which lives above the doc subdirectory)
     # from the markdown pages; the config is handled by a dedicated navigation
@@ -682,111 +2397,341 @@ def main():
     config_files = {p: c for p, c in doc_files.items() if is_vitepress_config(p)}
     md_files = {p: c for p, c in doc_files.items() if p not in config_files}
 
-    # 3. Propose entirely new pages for functionality no existing page covers.
-    new_docs = call_openai_propose_new_docs(
+    # 3-5. Propose, triage and generate all changes as one dependency graph;
+    # each job is reported as its own stage.
+    updates = generate_doc_updates(
         client,
         diff_text,
         pr_description,
-        list(md_files),
+        md_files,
         config_files,
         args.doc_path,
-        custom_instructions,
-    )
-    if new_docs:
-        print(
-            f"Proposed {len(new_docs)} new page(s): "
-            + ", ".join(nd["path"] for nd in new_docs)
-        )
-
-    # 4. Triage existing pages.
-    files_to_update = call_openai_triage(
-        client, diff_text, pr_description, md_files, custom_instructions
-    )
-
-    updates = {}
-
-    # 5a. Update existing pages that need it.
-    if files_to_update:
-        print(f"Updating {len(files_to_update)} existing page(s)...")
-        filtered_doc_files = {path: md_files[path] for path in files_to_update}
-        updates.update(
-            call_openai_update(
-                client,
-                diff_text,
-                pr_description,
-                filtered_doc_files,
-                custom_instructions,
-            )
-        )
-
-    # 5b. Generate the proposed new pages.
-    updates.update(
-        call_openai_create_new_docs(
-            client, diff_text, pr_description, new_docs, md_files, custom_instructions
-        )
-    )
-
-    # 5c. Update the VitePress navigation when pages were created, or when the
-    # config itself needs structural fixes (renamed/removed pages).
-    config_needs_update = bool(new_docs) or bool(
-        config_files
-        and call_openai_triage(
-            client, diff_text, pr_description, config_files, custom_instructions
-        )
+        custom_instructions=custom_instructions,
+        max_workers=args.max_concurrency,
+        triage_mode=args.triage_mode,
+        triage_threshold=args.triage_score_threshold,
+        triage_top_k=args.triage_score_top_k,
+        prefilter_top_k=args.prefilter_top_k,
+        source_diff=source_diff,
+        triage_diff=triage_diff,
+        stream_generation=args.stream_generation,
+        symbol_match_max_pages=args.symbol_match_max_pages,
+        update_mode=args.update_mode,
+        symbol_index=symbol_index,
     )
-    if config_needs_update:
-        updates.update(
-            call_openai_update_vitepress_config(
-                client,
-                config_files,
-                new_docs,
-                diff_text,
-                pr_description,
-                custom_instructions,
-            )
-        )
+    processed_head = processed_source_head(client.report, head_sha)
 
     if not updates:
         print("No documentation changes were generated.")
-        post_source_pr_comment(
-            gh,
-            source_repo,
-            source_pr,
-            "📝 **Documentation check complete** — no documentation updates "
-            "appear to be needed for these changes.",
-        )
+        with stage("publish"):
+            finish_without_updates(
+                gh, source_repo, source_pr, existing_pr, processed_head
+            )
         sys.exit(0)
 
     # 6. Create or update PR in Doc Repo
-    pr_url = create_doc_pr(
-        source_repo, source_pr, doc_repo, branch_name, existing_pr, updates
-    )
-    if pr_url is None:
-        post_source_pr_comment(
-            gh,
+    with stage("publish"):
+        pr_url = create_doc_pr(
             source_repo,
             source_pr,
-            "📝 **Documentation check complete** — the docs already look "
-            "up to date; no changes were pushed.",
+            doc_repo,
+            branch_name,
+            existing_pr,
+            updates,
+            processed_head,
         )
-        sys.exit(0)
+        if pr_url is None:
+            post_source_pr_comment(
+                gh,
+                source_repo,
+                source_pr,
+                "📝 **Documentation check complete** — the docs already look "
+                "up to date; no changes were pushed.",
+            )
+            sys.exit(0)
 
     # 7. Summarize and report back on the source PR. Pass the full original
     # doc set as the diff base; newly created pages are absent from it, so the
     # summary renders them as all-new additions.
-    summary = call_openai_summary(
-        client,
-        diff_text,
-        pr_description,
-        doc_files,
-        updates,
-        custom_instructions,
-    )
+    with stage("summary"):
+        summary = call_openai_summary(
+            client,
+            diff_text,
+            pr_description,
+            doc_files,
+            updates,
+            custom_instructions,
+        )
     comment = "📝 **Documentation updated**\n\n"
     if summary:
         comment += summary + "\n\n"
     comment += f"➡️ Documentation PR: {pr_url}"
-    post_source_pr_comment(gh, source_repo, source_pr, comment)
+    with stage("publish"):
+        post_source_pr_comment(gh, source_repo, source_pr, comment)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Update documentation based on PR diff."
+    )
+    parser.add_argument("--source-pr", required=True, help="PR number of source")
+    parser.add_argument(
+        "--source-repo", required=True, help="Source repository (owner/name)"
+    )
+    parser.add_argument(
+        "--doc-repo", required=True, help="Documentation repository (owner/name)"
+    )
+    parser.add_argument(
+        "--doc-path", required=True, help="Path within doc repo to scan"
+    )
+    parser.add_argument(
+        "--repo-path", default=".", help="Local path to source repo git"
+    )
+    parser.add_argument(
+        "--git-fetch-mode",
+        choices=("full", "shallow"),
+        default=GIT_FETCH_MODE,
+        help="Use a full-history checkout, or fetch only the base/head tips "
+        "without blobs and deepen on demand (env: LLM_GIT_FETCH_MODE).",
+    )
+    parser.add_argument(
+        "--custom-instructions",
+        default="",
+        help="Optional free-text instructions from the /documentation command.",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=MAX_CONCURRENCY,
+        help="Maximum number of model requests in flight at once "
+        "(env: LLM_MAX_CONCURRENCY).",
+    )
+    parser.add_argument(
+        "--max-requests-per-minute",
+        type=int,
+        default=MAX_REQUESTS_PER_MINUTE,
+        help="Cap on model requests started per minute; 0 disables "
+        "(env: LLM_MAX_REQUESTS_PER_MINUTE).",
+    )
+    parser.add_argument(
+        "--http-max-connections",
+        type=int,
+        default=HTTP_MAX_CONNECTIONS,
+        help="Pooled keep-alive connections per host (model endpoint, GitHub "
+        "API); 0 uses --max-concurrency (env: LLM_HTTP_MAX_CONNECTIONS).",
+    )
+    parser.add_argument(
+        "--http-keepalive-seconds",
+        type=float,
+        default=HTTP_KEEPALIVE_SECONDS,
+        help="How long idle connections stay open for reuse "
+        "(env: LLM_HTTP_KEEPALIVE_SECONDS).",
+    )
+    parser.add_argument(
+        "--no-http2",
+        dest="http2",
+        action="store_false",
+        default=HTTP2,
+        help="Use HTTP/1.1 for the model endpoint even when h2 is installed "
+        "(env: LLM_HTTP2=false).",
+    )
+    parser.add_argument(
+        "--github-request-interval",
+        type=float,
+        default=GITHUB_REQUEST_INTERVAL,
+        help="Minimum seconds between GitHub API requests; 0 disables "
+        "(env: LLM_GITHUB_REQUEST_INTERVAL).",
+    )
+    parser.add_argument(
+        "--github-write-interval",
+        type=float,
+        default=GITHUB_WRITE_INTERVAL,
+        help="Minimum seconds between GitHub API writes; 0 disables "
+        "(env: LLM_GITHUB_WRITE_INTERVAL).",
+    )
+    parser.add_argument(
+        "--triage-mode",
+        choices=("per-page", "batched", "scored"),
+        default=TRIAGE_MODE,
+        help="Ask once per page, pack several pages per triage request, or "
+        "score each page by its one-token YES log-probability "
+        "(env: LLM_TRIAGE_MODE).",
+    )
+    parser.add_argument(
+        "--triage-score-threshold",
+        type=float,
+        default=TRIAGE_SCORE_THRESHOLD,
+        help="Scored triage: minimum P(YES) for a page to be updated "
+        "(env: LLM_TRIAGE_SCORE_THRESHOLD).",
+    )
+    parser.add_argument(
+        "--triage-score-top-k",
+        type=int,
+        default=TRIAGE_SCORE_TOP_K,
+        help="Scored triage: update at most the K highest-scoring pages; 0 "
+        "disables the cap (env: LLM_TRIAGE_SCORE_TOP_K).",
+    )
+    for stage in MODEL_STAGES:
+        parser.add_argument(
+            f"--{stage}-model",
+            default=STAGE_MODELS[stage],
+            help=f"Model for the {stage} stage (env: LLM_{stage.upper()}_MODEL, "
+            "default OPENAI_MODEL).",
+        )
+    parser.add_argument(
+        "--escalation-model",
+        default=ESCALATION_MODEL,
+        help="Let the triage model answer unsure and re-ask those pages on "
+        "this model; empty disables (env: LLM_ESCALATION_MODEL).",
+    )
+    parser.add_argument(
+        "--prefilter-top-k",
+        type=int,
+        default=PREFILTER_TOP_K,
+        help="Only triage the K pages ranked most relevant to the diff by a "
+        "local BM25 index; 0 disables (env: LLM_PREFILTER_TOP_K).",
+    )
+    parser.add_argument(
+        "--symbol-match-max-pages",
+        type=int,
+        default=SYMBOL_MATCH_MAX_PAGES,
+        help="Send pages that mention a renamed/added/removed symbol straight "
+        "to update, unless the symbol is on more than this many pages; 0 "
+        "disables (env: LLM_SYMBOL_MATCH_MAX_PAGES).",
+    )
+    parser.add_argument(
+        "--diff-chunk-tokens",
+        type=int,
+        default=DIFF_CHUNK_TOKENS,
+        help="Chunk size for condensing diffs larger than MAX_DIFF_TOKENS into "
+        "change notes; 0 truncates instead (env: LLM_DIFF_CHUNK_TOKENS).",
+    )
+    parser.add_argument(
+        "--no-diff-preprocessing",
+        dest="diff_preprocess",
+        action="store_false",
+        default=DIFF_PREPROCESS,
+        help="Keep lockfiles, generated files and whitespace/rename-only "
+        "changes in the diff (env: LLM_DIFF_PREPROCESS=false).",
+    )
+    parser.add_argument(
+        "--api-summary",
+        choices=("off", "prepend", "triage"),
+        default=API_SUMMARY,
+        help="Put a parsed API-surface change summary before the diff, or "
+        "also use it instead of the diff for triage (env: LLM_API_SUMMARY).",
+    )
+    parser.add_argument(
+        "--fast-exit",
+        action=argparse.BooleanOptionalAction,
+        default=FAST_EXIT,
+        help="Skip all model calls when a local check finds no public API, "
+        "config or CLI change and no documented symbol or function in the "
+        "diff (env: LLM_FAST_EXIT=true).",
+    )
+    parser.add_argument(
+        "--diff-huge-file-tokens",
+        type=int,
+        default=DIFF_HUGE_FILE_TOKENS,
+        help="Cut the function context of files whose diff is larger than "
+        "this to 3 lines; 0 keeps it (env: LLM_DIFF_HUGE_FILE_TOKENS).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=CACHE_DIR,
+        help="Directory for the persistent model-response cache; empty "
+        "disables it (env: LLM_CACHE_DIR).",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=CACHE_MAX_MB,
+        help="Size bound of the response cache in MB (env: LLM_CACHE_MAX_MB).",
+    )
+
+    parser.add_argument(
+        "--stream-generation",
+        action=argparse.BooleanOptionalAction,
+        default=STREAM_GENERATION,
+        help="Stream page generation, stopping early on a delete/no-changes "
+        "answer and at LLM_MAX_PAGE_OUTPUT_TOKENS "
+        "(env: LLM_STREAM_GENERATION=true).",
+    )
+    parser.add_argument(
+        "--update-mode",
+        choices=("rewrite", "patch"),
+        default=UPDATE_MODE,
+        help="Rewrite whole pages, or apply section-level edits and rewrite "
+        "only pages whose edits do not apply (env: LLM_UPDATE_MODE).",
+    )
+    parser.add_argument(
+        "--report-path",
+        default=REPORT_PATH,
+        help="Write the per-stage timing, token and cost report here as JSON "
+        "(env: LLM_REPORT_PATH).",
+    )
+    parser.add_argument(
+        "--full-diff",
+        dest="incremental",
+        action="store_false",
+        default=INCREMENTAL_ROUNDS,
+        help="Always diff the whole source PR, even when an earlier round "
+        "recorded the head it processed (env: LLM_INCREMENTAL=false).",
+    )
+
+    args = parser.parse_args()
+
+    gh_token = os.environ.get("GH_TOKEN")
+    openai_key = os.environ.get("OPENAI_API_KEY")
+
+    if not gh_token or not openai_key:
+        print("Missing GH_TOKEN or OPENAI_API_KEY environment variables.")
+        sys.exit(1)
+
+    # One pooled transport per service, shared by every call of the run.
+    pool_size = args.http_max_connections or args.max_concurrency
+    gh = github_client(
+        gh_token,
+        GITHUB_API_URL,
+        pool_size,
+        args.github_request_interval,
+        args.github_write_interval,
+    )
+    http_client = openai_http_client(pool_size, args.http_keepalive_seconds, args.http2)
+    print(
+        f"HTTP transport: {pool_size} pooled connection(s) per host, "
+        f"HTTP/2 {'on' if args.http2 and http2_available() else 'off'}."
+    )
+    cache = (
+        DiskCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+        if args.cache_dir
+        else None
+    )
+    report = RunReport()
+    router = ModelRouter(
+        {stage: getattr(args, f"{stage}_model") for stage in MODEL_STAGES},
+        args.escalation_model,
+    )
+    print(f"Models: {router.describe()}.")
+    # The OpenAI client is only built when the first model request is made.
+    client = ModelClient(
+        budget=RequestBudget(args.max_concurrency, args.max_requests_per_minute),
+        cache=cache,
+        report=report,
+        connect=lambda: OpenAI(
+            api_key=openai_key, base_url=OPENAI_BASE_URL, http_client=http_client
+        ),
+        router=router,
+    )
+
+    try:
+        run_doc_update(args, gh, client)
+    finally:
+        client.report_usage()
+        if cache is not None:
+            cache.close()
+        http_client.close()
+        report.write(args.report_path, os.environ.get("GITHUB_STEP_SUMMARY", ""))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+import re
+
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+_FENCE_RE = re.compile(r"^[ \t]*(```|~~~)")
+_SECTION_SEPARATOR_RE = re.compile(r"\s+>\s+")
+
+
+class PatchError(ValueError):
+    """Raised when an edit does not apply cleanly to the page."""
+
+
+def _normalize_heading(title):
+    title = re.sub(r"\s*\{#[^}]*\}\s*$", "", title)  # VitePress custom anchors
+    return re.sub(r"[`*_]", "", title.lstrip("#")).strip().lower()
+
+
+def heading_sections(text):
+    """[(heading path, start, end)] for every heading in a Markdown page.
+
+    The path lists the heading texts from the outermost to the innermost;
+    start/end are character offsets of the section, from its heading line
+    up to the next heading of the same or a higher level. Headings inside
+    code fences are ignored.
+    """
+    headings, offset, fence = [], 0, None
+    for line in text.splitlines(keepends=True):
+        fence_match = _FENCE_RE.match(line)
+        if fence_match:
+            if fence is None:
+                fence = fence_match.group(1)
+            elif fence_match.group(1) == fence:
+                fence = None
+        elif fence is None:
+            match = _HEADING_RE.match(line.rstrip("\r\n"))
+            if match:
+                headings.append((len(match.group(1)), match.group(2), offset))
+        offset += len(line)
+
+    sections, stack = [], []
+    for index, (level, title, start) in enumerate(headings):
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, title))
+        end = next(
+            (s for lvl, _, s in headings[index + 1 :] if lvl <= level), len(text)
+        )
+        sections.append((tuple(t for _, t in stack), start, end))
+    return sections
+
+
+def resolve_section(text, section):
+    """(start, end) of the section addressed by a 'A > B' heading path.
+
+    The path may omit outer headings and is matched case-insensitively; it
+    must identify exactly one section. An empty path addresses the whole page.
+    """
+    parts = [_normalize_heading(p) for p in _SECTION_SEPARATOR_RE.split(section or "")]
+    parts = [p for p in parts if p]
+    if not parts:
+        return 0, len(text)
+    matches = [
+        (start, end)
+        for path, start, end in heading_sections(text)
+        if [_normalize_heading(t) for t in path[-len(parts) :]] == parts
+    ]
+    if len(matches) != 1:
+        raise PatchError(f"section {section!r} matches {len(matches)} headings")
+    return matches[0]
+
+
+def apply_edit(text, edit):
+    """Apply one {"section", "find", "replace"} edit and return the new text."""
+    if not isinstance(edit, dict):
+        raise PatchError(f"edit is not an object: {edit!r}")
+    section = edit.get("section") or ""
+    find = edit.get("find") or ""
+    replace = edit.get("replace")
+    if not isinstance(section, str) or not isinstance(find, str):
+        raise PatchError(f"malformed edit: {edit!r}")
+    if not isinstance(replace, str):
+        raise PatchError(f"edit has no 'replace' text: {edit!r}")
+    start, end = resolve_section(text, section)
+
+    if not find:
+        # Append a block at the end of the section, separated by a blank line.
+        head, tail = text[:end], text[end:]
+        if head and not head.endswith("\n"):
+            head += "\n"
+        if head and not head.endswith("\n\n"):
+            head += "\n"
+        block = replace.strip("\n") + "\n"
+        return head + block + ("\n" + tail if tail else "")
+
+    count = text.count(find, start, end)
+    if count != 1:
+        raise PatchError(
+            f"'find' text occurs {count} times in section {section or '(page)'!r}"
+        )
+    index = text.index(find, start, end)
+    return text[:index] + replace + text[index + len(find) :]
+
+
+def apply_edits(text, edits):
+    """Apply edits in order; raise PatchError if any does not apply cleanly."""
+    if not isinstance(edits, list):
+        raise PatchError("edits are not a list")
+    for edit in edits:
+        text = apply_edit(text, edit)
+    return text
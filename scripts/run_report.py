@@ -0,0 +1,242 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Estimated USD per 1M tokens: (input, cached input, output), matched by
+# longest model-name prefix. LLM_PRICE_PER_MTOK="input,cached,output"
+# overrides it for other models or negotiated rates.
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 0.50, 1.50),
+    "gpt-4-turbo": (10.00, 10.00, 30.00),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-5": (1.25, 0.125, 10.00),
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "gpt-5-nano": (0.05, 0.005, 0.40),
+    "o3": (2.00, 0.50, 8.00),
+    "o4-mini": (1.10, 0.275, 4.40),
+}
+TOKEN_FIELDS = ("prompt_tokens", "cached_tokens", "completion_tokens")
+
+# Stage the current thread (or job-graph task) is working in; copied into
+# worker threads so model calls are attributed to the stage that made them.
+current_stage = contextvars.ContextVar("current_stage", default="other")
+
+
+def model_prices(model):
+    """(input, cached input, output) USD per 1M tokens, or None if unknown."""
+    override = os.environ.get("LLM_PRICE_PER_MTOK")
+    if override:
+        return tuple(float(part) for part in override.split(","))
+    best = ""
+    for prefix in MODEL_PRICES:
+        if model.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    return MODEL_PRICES.get(best)
+
+
+def estimate_cost(model, usage):
+    """Estimated USD cost of usage (a token Counter) on model, or None."""
+    prices = model_prices(model)
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    cached = usage["cached_tokens"]
+    return (
+        (usage["prompt_tokens"] - cached) * input_price
+        + cached * cached_price
+        + usage["completion_tokens"] * output_price
+    ) / 1_000_000
+
+
+class RunReport:
+    """Per-stage wall time, model requests, tokens and estimated cost.
+
+    Wrap each stage in `with report.stage(name):`; model calls made inside
+    it (also from worker threads started via contextvars.copy_context())
+    are attributed to it through record_call(). Request latency is also
+    broken down per route (stage and model), to tune model routing.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.stage_seconds = defaultdict(float)
+        self.stage_usage = defaultdict(Counter)
+        self.model_usage = defaultdict(Counter)
+        self.route_usage = defaultdict(Counter)
+        self.route_max_seconds = defaultdict(float)
+        self.notes = {}
+        self.failures = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        token = current_stage.set(name)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stage_seconds[name] += time.monotonic() - start
+            current_stage.reset(token)
+
+    def record_call(self, model, usage, seconds):
+        """Record one model response's usage object and request latency."""
+        details = getattr(usage, "prompt_tokens_details", None)
+        counts = Counter(
+            requests=1,
+            model_seconds=seconds,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+        )
+        route = (current_stage.get(), model)
+        with self._lock:
+            self.stage_usage[route[0]].update(counts)
+            self.model_usage[model].update(counts)
+            self.route_usage[route].update(counts)
+            self.route_max_seconds[route] = max(self.route_max_seconds[route], seconds)
+
+    def note(self, name, value):
+        """Attach JSON-serializable details (e.g. what a stage removed)."""
+        with self._lock:
+            self.notes[name] = value
+
+    def record_failure(self, item, error):
+        """Record an item (page, diff part) skipped after its model call failed."""
+        with self._lock:
+            self.failures.append(
+                {"stage": current_stage.get(), "item": item, "error": str(error)}
+            )
+
+    def record_cache_hit(self):
+        """Record a request answered from the local response cache."""
+        with self._lock:
+            self.stage_usage[current_stage.get()]["cache_hits"] += 1
+
+    def totals(self):
+        with self._lock:
+            total = Counter()
+            for usage in self.model_usage.values():
+                total.update(usage)
+            return total
+
+    def to_dict(self):
+        """The report as JSON-serializable data."""
+        with self._lock:
+            names = list(self.stage_seconds) + [
+                n for n in self.stage_usage if n not in self.stage_seconds
+            ]
+            stages = [
+                {
+                    "stage": name,
+                    "seconds": round(self.stage_seconds.get(name, 0.0), 3),
+                    "requests": self.stage_usage[name]["requests"],
+                    "cache_hits": self.stage_usage[name]["cache_hits"],
+                    "model_seconds": round(self.stage_usage[name]["model_seconds"], 3),
+                    **{f: self.stage_usage[name][f] for f in TOKEN_FIELDS},
+                }
+                for name in names
+            ]
+            routes = [
+                {
+                    "stage": stage,
+                    "model": model,
+                    "requests": usage["requests"],
+                    "mean_seconds": round(
+                        usage["model_seconds"] / usage["requests"], 3
+                    ),
+                    "max_seconds": round(self.route_max_seconds[(stage, model)], 3),
+                    **{f: usage[f] for f in TOKEN_FIELDS},
+                }
+                for (stage, model), usage in self.route_usage.items()
+            ]
+            models = []
+            for model, usage in self.model_usage.items():
+                cost = estimate_cost(model, usage)
+                models.append(
+                    {
+                        "model": model,
+                        "requests": usage["requests"],
+                        **{f: usage[f] for f in TOKEN_FIELDS},
+                        "estimated_cost_usd": None if cost is None else round(cost, 6),
+                    }
+                )
+        costs = [m["estimated_cost_usd"] for m in models]
+        return {
+            "total_seconds": round(time.monotonic() - self.started, 3),
+            "stages": stages,
+            "routes": routes,
+            "models": models,
+            "estimated_cost_usd": (None if None in costs else round(sum(costs), 6)),
+            "notes": dict(self.notes),
+            "failures": list(self.failures),
+        }
+
+    def to_markdown(self, data=None):
+        """The report as Markdown tables, for $GITHUB_STEP_SUMMARY."""
+        data = data or self.to_dict()
+        lines = [
+            "### LLM doc updater run",
+            "",
+            "| Stage | Wall time (s) | Model time (s) | Requests | Cache hits "
+            "| Prompt tokens | Cached tokens | Completion tokens |",
+            "| --- | ---: | ---: | ---: | ---: | ---: | ---: | ---: |",
+        ]
+        for s in data["stages"]:
+            lines.append(
+                f"| {s['stage']} | {s['seconds']:.1f} | {s['model_seconds']:.1f} "
+                f"| {s['requests']} "
+                f"| {s['cache_hits']} | {s['prompt_tokens']} "
+                f"| {s['cached_tokens']} | {s['completion_tokens']} |"
+            )
+        lines += [
+            "",
+            "| Stage | Model | Requests | Mean latency (s) | Max latency (s) "
+            "| Prompt tokens | Completion tokens |",
+            "| --- | --- | ---: | ---: | ---: | ---: | ---: |",
+        ]
+        for r in data["routes"]:
+            lines.append(
+                f"| {r['stage']} | {r['model']} | {r['requests']} "
+                f"| {r['mean_seconds']:.2f} | {r['max_seconds']:.2f} "
+                f"| {r['prompt_tokens']} | {r['completion_tokens']} |"
+            )
+        lines += [
+            "",
+            "| Model | Requests | Prompt tokens | Cached tokens "
+            "| Completion tokens | Est. cost (USD) |",
+            "| --- | ---: | ---: | ---: | ---: | ---: |",
+        ]
+        for m in data["models"]:
+            cost = m["estimated_cost_usd"]
+            lines.append(
+                f"| {m['model']} | {m['requests']} | {m['prompt_tokens']} "
+                f"| {m['cached_tokens']} | {m['completion_tokens']} "
+                f"| {'n/a' if cost is None else f'{cost:.4f}'} |"
+            )
+        lines += ["", f"Total wall time: {data['total_seconds']:.1f} s", ""]
+        return "\n".join(lines)
+
+    def write(self, json_path="", summary_path=""):
+        """Write the JSON report and append the Markdown summary. Best-effort."""
+        data = self.to_dict()
+        for path, text, mode in (
+            (json_path, json.dumps(data, indent=2) + "\n", "w"),
+            (summary_path, self.to_markdown(data), "a"),
+        ):
+            if not path:
+                continue
+            try:
+                with open(path, mode, encoding="utf-8") as f:
+                    f.write(text)
+            except OSError as e:
+                print(f"Warning: could not write run report to {path}: {e}")
+        return data
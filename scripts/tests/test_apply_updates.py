@@ -0,0 +1,112 @@
+import types
+
+import pytest
+from github import GithubException
+from llm_doc_updater import apply_updates_to_repo, git_blob_sha
+
+BRANCH = "doc-update-pr-owner-source-1"
+
+
+class FakeRef:
+    def __init__(self, sha):
+        self.object = types.SimpleNamespace(sha=sha)
+        self.edits = []
+
+    def edit(self, **kwargs):
+        self.edits.append(kwargs)
+
+
+class FakeDocRepo:
+    """The Git Data API calls apply_updates_to_repo makes, on a fixed tree."""
+
+    def __init__(self, files, truncated=False):
+        self.files = files
+        self.truncated = truncated
+        self.ref = FakeRef("h" * 40)
+        self.trees, self.commits = [], []
+
+    def get_git_ref(self, name):
+        assert name == f"heads/{BRANCH}"
+        return self.ref
+
+    def get_git_commit(self, sha):
+        return types.SimpleNamespace(sha=sha, tree=types.SimpleNamespace(sha="t" * 40))
+
+    def get_git_tree(self, sha, recursive=False):
+        entries = [
+            types.SimpleNamespace(
+                path=path, sha=git_blob_sha(content), mode="100644", type="blob"
+            )
+            for path, content in self.files.items()
+        ]
+        return types.SimpleNamespace(
+            sha=sha, tree=entries, raw_data={"truncated": self.truncated}
+        )
+
+    def get_contents(self, path, ref=None):
+        if path not in self.files:
+            raise GithubException(404, {"message": "Not Found"}, None)
+        return types.SimpleNamespace(sha=git_blob_sha(self.files[path]))
+
+    def create_git_tree(self, elements, base_tree):
+        self.trees.append([element._identity for element in elements])
+        return types.SimpleNamespace(sha="n" * 40)
+
+    def create_git_commit(self, message, tree, parents):
+        self.commits.append(message)
+        return types.SimpleNamespace(sha="c" * 40)
+
+
+def test_identical_content_and_absent_deletions_are_skipped():
+    repo = FakeDocRepo({"docs/a.md": "# A\n"})
+    updates = {"docs/a.md": "# A\n", "docs/gone.md": None}
+
+    assert apply_updates_to_repo(repo, updates, BRANCH) == 0
+    assert repo.trees == repo.commits == repo.ref.edits == []
+
+
+@pytest.mark.parametrize("truncated", [False, True])
+def test_mixed_changes_make_one_tree_commit_and_ref_update(truncated):
+    files = {"docs/a.md": "# A\n", "docs/b.md": "# B\n", "docs/same.md": "# S\n"}
+    repo = FakeDocRepo(files, truncated)
+    updates = {
+        "docs/a.md": "# A, updated\n",
+        "docs/b.md": None,
+        "docs/new.md": "# New\n",
+        "docs/same.md": "# S\n",
+        "docs/gone.md": None,
+    }
+
+    assert apply_updates_to_repo(repo, updates, BRANCH) == 3
+    assert repo.trees == [
+        [
+            {
+                "path": "docs/a.md",
+                "mode": "100644",
+                "type": "blob",
+                "content": "# A, updated\n",
+            },
+            {"path": "docs/b.md", "mode": "100644", "type": "blob", "sha": None},
+            {
+                "path": "docs/new.md",
+                "mode": "100644",
+                "type": "blob",
+                "content": "# New\n",
+            },
+        ]
+    ]
+    assert repo.commits == [
+        "Update documentation (3 files)\n\n"
+        "Update docs/a.md\nDelete docs/b.md\nCreate docs/new.md"
+    ]
+    assert repo.ref.edits == [{"sha": "c" * 40}]
+
+
+def test_single_deletion_sends_a_null_sha():
+    repo = FakeDocRepo({"docs/old.md": "# Old\n"})
+
+    assert apply_updates_to_repo(repo, {"docs/old.md": None}, BRANCH) == 1
+    assert repo.trees == [
+        [{"path": "docs/old.md", "mode": "100644", "type": "blob", "sha": None}]
+    ]
+    assert repo.commits == ["Delete docs/old.md"]
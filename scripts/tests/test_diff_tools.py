@@ -0,0 +1,164 @@
+from diff_tools import (
+    changed_definitions,
+    drop_reason,
+    is_whitespace_only_hunk,
+    preprocess_diff,
+    split_diff,
+    tighten_hunk,
+)
+
+
+def count_tokens(text):
+    return len(text.split())
+
+
+def hunk(removed, added, header="@@ -1,1 +1,1 @@"):
+    lines = [header] + [f"-{line}" for line in removed] + [f"+{line}" for line in added]
+    return "\n".join(lines) + "\n"
+
+
+def test_whitespace_only_hunk_ignores_spacing():
+    assert is_whitespace_only_hunk(hunk(["x=1  "], ["x = 1"]), "app.js")
+
+
+def test_whitespace_only_hunk_ignores_blank_lines():
+    assert is_whitespace_only_hunk(hunk(["a()", "b()"], ["a()", "", "b()"]), "a.js")
+
+
+def test_python_reindent_is_a_change():
+    removed = ["if ready:", "    start()", "stop()"]
+    added = ["if ready:", "    start()", "    stop()"]
+    assert not is_whitespace_only_hunk(hunk(removed, added), "pkg/run.py")
+    # Where indentation is not syntax, the same change is formatting.
+    assert is_whitespace_only_hunk(hunk(removed, added), "src/run.js")
+
+
+def test_yaml_reindent_is_a_change():
+    removed = ["jobs:", "  build:", "  test:"]
+    added = ["jobs:", "  build:", "    test:"]
+    assert not is_whitespace_only_hunk(hunk(removed, added), ".github/ci.yml")
+
+
+def test_whitespace_inside_string_literal_is_a_change():
+    assert not is_whitespace_only_hunk(hunk(['sep = "a b"'], ['sep = "ab"']), "cli.py")
+    assert not is_whitespace_only_hunk(
+        hunk(["fmt('%s  %s')"], ["fmt('%s %s')"]), "x.js"
+    )
+
+
+def test_lines_are_compared_one_by_one():
+    assert not is_whitespace_only_hunk(hunk(["foo(a,", "b)"], ["foo(a, b)"]), "x.js")
+
+
+def test_preprocess_keeps_python_reindent():
+    diff = (
+        "diff --git a/pkg/run.py b/pkg/run.py\n"
+        "--- a/pkg/run.py\n"
+        "+++ b/pkg/run.py\n"
+        + hunk(["    stop()"], ["        stop()"])
+        + "diff --git a/src/run.js b/src/run.js\n"
+        "--- a/src/run.js\n"
+        "+++ b/src/run.js\n" + hunk(["    stop()"], ["        stop()"])
+    )
+    result, report = preprocess_diff(diff, count_tokens)
+    assert "pkg/run.py" in result
+    assert report["files_dropped"] == {"whitespace-only": ["src/run.js"]}
+
+
+def test_tighten_hunk_splits_distant_changes():
+    body = [" line 1", "-old 2", "+new 2"]
+    body += [f" line {n}" for n in range(3, 12)]
+    body += ["-old 12", "+new 12", " line 13"]
+    hunk_text = "@@ -1,13 +1,13 @@ def run():\n" + "\n".join(body) + "\n"
+
+    pieces = tighten_hunk(hunk_text, 1)
+
+    assert pieces.splitlines() == [
+        "@@ -1,3 +1,3 @@ def run():",
+        " line 1",
+        "-old 2",
+        "+new 2",
+        " line 3",
+        "@@ -11,3 +11,3 @@ def run():",
+        " line 11",
+        "-old 12",
+        "+new 12",
+        " line 13",
+    ]
+
+
+def test_tighten_hunk_keeps_small_hunks():
+    hunk_text = "@@ -1,3 +1,3 @@\n a\n-b\n+c\n d\n"
+    assert tighten_hunk(hunk_text, 3) == hunk_text
+
+
+def test_changed_definitions_credit_the_enclosing_function():
+    diff = (
+        "diff --git a/net.py b/net.py\n"
+        "--- a/net.py\n"
+        "+++ b/net.py\n"
+        "@@ -10,4 +10,4 @@ class Client:\n"
+        "     def connect(self, host):\n"
+        "-        retries = 3\n"
+        "+        retries = 5\n"
+        "@@ -40,2 +40,2 @@ def _backoff(attempt):\n"
+        "-    return attempt\n"
+        "+    return attempt * 2\n"
+        "@@ -60,2 +60,2 @@ func (c *Client) Dial(addr string) error {\n"
+        "-\treturn nil\n"
+        "+\treturn c.dial(addr)\n"
+    )
+    assert changed_definitions(diff) == {"connect", "Dial"}
+
+
+def file_diff(path, hunks):
+    header = f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n"
+    return header + "".join(hunks)
+
+
+def test_split_diff_keeps_small_files_together():
+    diff = file_diff("a.py", [hunk(["a"], ["b"])]) + file_diff(
+        "b.py", [hunk(["c"], ["d"])]
+    )
+    assert split_diff(diff, 100, count_tokens) == [diff]
+
+
+def test_split_diff_splits_large_files_on_hunks_with_the_header():
+    hunks = [hunk([f"old {n}"], [f"new {n}"], f"@@ -{n},1 +{n},1 @@") for n in (1, 9)]
+    diff = file_diff("a.py", hunks)
+    header = diff[: diff.index("@@")]
+
+    chunks = split_diff(diff, count_tokens(header + hunks[0]), count_tokens)
+
+    assert chunks == [header + hunks[0], header + hunks[1]]
+
+
+def test_split_diff_cuts_an_oversized_hunk_on_lines():
+    big = hunk([f"old line {n}" for n in range(20)], [])
+    diff = file_diff("a.py", [big])
+
+    chunks = split_diff(diff, 30, count_tokens)
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith("diff --git a/a.py") for chunk in chunks)
+    assert all(count_tokens(chunk) <= 30 for chunk in chunks)
+    assert "".join(c.split("+++ b/a.py\n", 1)[1] for c in chunks) == big
+
+
+def test_long_lines_in_markdown_and_source_are_kept():
+    paragraph = "A soft-wrapped paragraph that goes on. " * 40
+    for path in ("README.md", "app/settings.py", "config/app.json"):
+        diff = file_diff(path, [hunk(["short"], [paragraph])])
+        assert drop_reason(diff) is None
+
+
+def test_minified_bundles_are_dropped():
+    bundle = "function a(b){return b+1};" * 60
+    diff = file_diff("static/app.js", [hunk([bundle], [bundle + "x"])])
+    assert drop_reason(diff) == "minified"
+
+
+def test_a_long_line_in_a_hand_written_script_is_kept():
+    body = [f"  line{n}();" for n in range(5)] + ["  const msg = '" + "x" * 1200 + "';"]
+    diff = file_diff("src/app.js", [hunk([], body)])
+    assert drop_reason(diff) is None
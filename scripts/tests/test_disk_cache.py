@@ -0,0 +1,101 @@
+import os
+import types
+
+from disk_cache import DiskCache
+from llm_doc_updater import ModelClient
+
+MESSAGES = [{"role": "user", "content": "Update docs/index.md"}]
+
+
+def test_round_trip(tmp_path):
+    cache = DiskCache(str(tmp_path), 1 << 20)
+    key = DiskCache.make_key("chat", "gpt-4o", MESSAGES, {})
+    cache.put(key, {"text": "Ünïcode ✓", "tokens": [1, 2]})
+
+    # A fresh instance reads what an earlier run stored.
+    reopened = DiskCache(str(tmp_path), 1 << 20)
+    assert reopened.get(key) == {"text": "Ünïcode ✓", "tokens": [1, 2]}
+    assert (reopened.hits, reopened.misses) == (1, 0)
+
+
+def test_key_depends_on_model_messages_and_params():
+    key = DiskCache.make_key("chat", "gpt-4o", MESSAGES, {"max_tokens": 1})
+    other_messages = [{"role": "user", "content": "Update docs/guide.md"}]
+    assert key != DiskCache.make_key("chat", "gpt-4o-mini", MESSAGES, {"max_tokens": 1})
+    assert key != DiskCache.make_key(
+        "chat", "gpt-4o", other_messages, {"max_tokens": 1}
+    )
+    assert key != DiskCache.make_key("chat", "gpt-4o", MESSAGES, {"max_tokens": 2})
+    assert key != DiskCache.make_key("chat", "gpt-4o", MESSAGES, {})
+
+
+def test_key_ignores_dict_order():
+    a = DiskCache.make_key("chat", {"logprobs": True, "max_tokens": 1})
+    b = DiskCache.make_key("chat", {"max_tokens": 1, "logprobs": True})
+    assert a == b
+
+
+def test_corrupt_and_partial_entries_are_misses(tmp_path):
+    cache = DiskCache(str(tmp_path), 1 << 20)
+    keys = [DiskCache.make_key("chat", n) for n in range(3)]
+    contents = ['{"value": "cut o', "not json at all", '{"other": 1}']
+    for key, content in zip(keys, contents):
+        path = cache._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    assert [cache.get(key) for key in keys] == [None, None, None]
+    assert (cache.hits, cache.misses) == (0, 3)
+    # A corrupt entry is simply overwritten by the next put.
+    cache.put(keys[0], "fixed")
+    assert cache.get(keys[0]) == "fixed"
+
+
+def test_put_leaves_no_temp_files(tmp_path):
+    cache = DiskCache(str(tmp_path), 1 << 20)
+    key = DiskCache.make_key("chat", "x")
+    cache.put(key, "one")
+    cache.put(key, "two")
+
+    files = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert files == [f"{key}.json"]
+    assert cache.get(key) == "two"
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), 1 << 20)
+    keys = [DiskCache.make_key("chat", n) for n in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, "x" * 100)
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    cache.get(keys[0])  # a read makes the oldest entry the most recent
+    cache.max_bytes = 2 * os.path.getsize(cache._path(keys[0]))
+
+    assert cache.prune() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == cache.get(keys[2]) == "x" * 100
+
+
+class CountingCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = types.SimpleNamespace(content=f"answer {self.calls}")
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=message)], usage=None
+        )
+
+
+def test_model_client_serves_repeated_requests_from_disk(tmp_path):
+    completions = CountingCompletions()
+    openai = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    client = ModelClient(openai, cache=DiskCache(str(tmp_path), 1 << 20))
+
+    first = client.complete(MESSAGES, model="gpt-4o")
+    assert client.complete(MESSAGES, model="gpt-4o") == first
+    assert client.complete(MESSAGES, model="gpt-4o-mini") != first
+    assert client.complete(MESSAGES, model="gpt-4o", max_tokens=5) != first
+    assert completions.calls == 3
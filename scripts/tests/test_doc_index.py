@@ -0,0 +1,57 @@
+from doc_index import (
+    SymbolIndex,
+    extract_changed_symbols,
+    extract_definition_changes,
+)
+
+
+def test_new_use_of_an_existing_name_is_not_a_definition_change():
+    diff = "+    log.debug(cfg.max_retries)\n"
+    assert "max_retries" in extract_changed_symbols(diff)
+    assert extract_definition_changes(diff) == set()
+
+
+def test_renamed_constant_and_env_var_are_definition_changes():
+    diff = (
+        '-MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))\n'
+        '+RETRY_LIMIT = int(os.environ.get("LLM_RETRY_LIMIT", "3"))\n'
+    )
+    assert extract_definition_changes(diff) == {
+        "MAX_RETRIES",
+        "LLM_MAX_RETRIES",
+        "RETRY_LIMIT",
+        "LLM_RETRY_LIMIT",
+    }
+
+
+def test_renamed_parameter_and_new_flag_are_definition_changes():
+    diff = (
+        "-def connect(host, max_retries=3):\n"
+        "+def connect(host, retry_limit=3):\n"
+        '+        "--dry-run",\n'
+    )
+    assert extract_definition_changes(diff) == {
+        "max_retries",
+        "retry_limit",
+        "--dry-run",
+    }
+
+
+def test_changed_values_are_not_definition_changes():
+    diff = "-    max_retries: 3\n+    max_retries: 5\n-def run(a, b=1):\n+def run(a, b=2):\n"
+    assert extract_definition_changes(diff) == set()
+
+
+def test_symbol_index_matches_spellings_and_caps_common_symbols():
+    pages = {
+        "docs/a.md": "Set `maxRetries` or pass `--max-retries`.",
+        "docs/b.md": "```\nMAX_RETRIES=5\n```",
+        "docs/c.md": "Prose about max_retries outside code is ignored.",
+    }
+    index = SymbolIndex(pages)
+    assert index.lookup({"max_retries"}) == {
+        "docs/a.md": ["max_retries"],
+        "docs/b.md": ["max_retries"],
+    }
+    assert index.lookup({"max_retries"}, max_pages=1) == {}
+    assert index.lookup_names({"MAX_RETRIES"}) == {"docs/b.md": ["MAX_RETRIES"]}
@@ -0,0 +1,113 @@
+import base64
+import hashlib
+import json
+import types
+
+from disk_cache import DiskCache
+from doc_snapshot import DocSnapshot
+from llm_doc_updater import get_doc_files, git_blob_sha
+
+
+class FakeRequester:
+    def __init__(self, repo):
+        self.repo = repo
+        self.headers = []
+
+    def requestJsonAndCheck(self, method, url, headers=None):
+        assert (method, url) == ("GET", f"{self.repo.url}/commits/main")
+        self.headers.append(headers or {})
+        tree_sha = self.repo.tree_sha()
+        etag = f'"{tree_sha}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return {}, None  # 304 Not Modified
+        return {"etag": etag}, {"commit": {"tree": {"sha": tree_sha}}}
+
+
+class FakeDocRepo:
+    """A docs repo whose tree and blobs are derived from files."""
+
+    full_name = "owner/docs"
+    url = "https://api.github.test/repos/owner/docs"
+
+    def __init__(self, files):
+        self.files = dict(files)
+        self.requester = FakeRequester(self)
+        self.trees_fetched = 0
+        self.blobs_fetched = []
+
+    def tree_sha(self):
+        blob = json.dumps(self.files, sort_keys=True).encode()
+        return hashlib.sha1(blob).hexdigest()
+
+    def get_git_tree(self, sha, recursive=False):
+        assert sha == self.tree_sha() and recursive
+        self.trees_fetched += 1
+        entries = [types.SimpleNamespace(path="docs", sha="d" * 40, type="tree")]
+        entries += [
+            types.SimpleNamespace(path=path, sha=git_blob_sha(content), type="blob")
+            for path, content in self.files.items()
+        ]
+        return types.SimpleNamespace(tree=entries, raw_data={"truncated": False})
+
+    def get_git_blob(self, sha):
+        self.blobs_fetched.append(sha)
+        content = next(c for c in self.files.values() if git_blob_sha(c) == sha)
+        return types.SimpleNamespace(content=base64.b64encode(content.encode()))
+
+
+FILES = {
+    ".vitepress/config.ts": "export default {}\n",
+    "docs/index.md": "# Home\n",
+    "docs/guide.md": "# Guide\n",
+    "README.md": "# Not a doc page\n",
+}
+EXPECTED = {path: FILES[path] for path in list(FILES)[:3]}
+
+
+def fetch(repo, cache):
+    snapshot = DocSnapshot(cache)
+    return get_doc_files(repo, "docs", "main", 2, snapshot), snapshot
+
+
+def test_unchanged_branch_reuses_the_cached_listing_and_blobs(tmp_path):
+    repo = FakeDocRepo(FILES)
+    cache = DiskCache(str(tmp_path), 1 << 20)
+    assert fetch(repo, cache)[0] == EXPECTED
+
+    files, snapshot = fetch(repo, cache)
+
+    assert files == EXPECTED
+    assert snapshot.requests == snapshot.not_modified == 1
+    assert snapshot.blobs_reused == 3
+    assert repo.trees_fetched == 1
+    assert len(repo.blobs_fetched) == 3
+    assert repo.requester.headers[-1] == {"If-None-Match": f'"{repo.tree_sha()}"'}
+
+
+def test_changed_tree_fetches_only_changed_blobs(tmp_path):
+    repo = FakeDocRepo(FILES)
+    cache = DiskCache(str(tmp_path), 1 << 20)
+    fetch(repo, cache)
+    repo.files["docs/guide.md"] = "# Guide, updated\n"
+    repo.blobs_fetched.clear()
+
+    files, snapshot = fetch(repo, cache)
+
+    assert files == {**EXPECTED, "docs/guide.md": "# Guide, updated\n"}
+    assert snapshot.not_modified == 0
+    assert repo.trees_fetched == 2
+    assert repo.blobs_fetched == [git_blob_sha("# Guide, updated\n")]
+    assert snapshot.blobs_reused == 2
+
+
+def test_without_a_cache_everything_is_fetched():
+    repo = FakeDocRepo(FILES)
+    fetch(repo, None)
+
+    files, snapshot = fetch(repo, None)
+
+    assert files == EXPECTED
+    assert repo.requester.headers == [{}, {}]
+    assert repo.trees_fetched == 2
+    assert len(repo.blobs_fetched) == 6
+    assert (snapshot.not_modified, snapshot.blobs_reused) == (0, 0)
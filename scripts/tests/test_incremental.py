@@ -0,0 +1,130 @@
+import subprocess
+import types
+
+import pytest
+from constants import SOURCE_HEAD_MARKER
+from llm_doc_updater import (
+    ModelClient,
+    call_openai_triage,
+    can_diff_incrementally,
+    finish_without_updates,
+    processed_source_head,
+    read_source_head_marker,
+    record_source_head,
+)
+
+OLD, NEW = "a" * 40, "b" * 40
+
+
+class FakePR:
+    def __init__(self, body):
+        self.body = body
+        self.edits = 0
+
+    def edit(self, body):
+        self.body = body
+        self.edits += 1
+
+
+def test_read_source_head_marker():
+    pr = FakePR("Docs update.\n\n" + SOURCE_HEAD_MARKER.format(sha=OLD))
+    assert read_source_head_marker(pr) == OLD
+    assert read_source_head_marker(FakePR(None)) is None
+
+
+def test_record_source_head_replaces_the_marker():
+    pr = FakePR("Docs update.\n\n" + SOURCE_HEAD_MARKER.format(sha=OLD))
+    record_source_head(pr, NEW)
+    assert pr.body == "Docs update.\n\n" + SOURCE_HEAD_MARKER.format(sha=NEW)
+    assert read_source_head_marker(pr) == NEW
+
+
+def test_record_without_head_keeps_the_old_marker():
+    pr = FakePR("Docs update.\n\n" + SOURCE_HEAD_MARKER.format(sha=OLD))
+    record_source_head(pr, None)
+    assert pr.edits == 0
+    assert read_source_head_marker(pr) == OLD
+
+
+class FailingClient(ModelClient):
+    """Triage answers YES, but times out for pages named in fail."""
+
+    def __init__(self, fail):
+        super().__init__(openai_client=object())
+        self.fail = fail
+
+    def complete(self, messages, model="", **kwargs):
+        if any(path in messages[-1]["content"] for path in self.fail):
+            raise TimeoutError("request timed out")
+        return "YES"
+
+
+def test_failed_page_keeps_the_marker_for_the_next_round(monkeypatch):
+    monkeypatch.setattr("llm_doc_updater.post_source_pr_comment", lambda *args: None)
+    client = FailingClient({"docs/b.md"})
+    pages = {"docs/a.md": "# A\n", "docs/b.md": "# B\n"}
+    assert call_openai_triage(client, "diff", "", pages, max_workers=1) == ["docs/a.md"]
+    assert [f["item"] for f in client.report.failures] == ["docs/b.md"]
+
+    pr = FakePR(SOURCE_HEAD_MARKER.format(sha=OLD))
+    head = processed_source_head(client.report, NEW)
+    finish_without_updates(None, "o/src", 1, pr, head)
+    assert head is None
+    assert read_source_head_marker(pr) == OLD
+
+
+def test_marker_advances_when_nothing_failed(monkeypatch):
+    monkeypatch.setattr("llm_doc_updater.post_source_pr_comment", lambda *args: None)
+    client = FailingClient(set())
+    call_openai_triage(client, "diff", "", {"docs/a.md": "# A\n"}, max_workers=1)
+
+    pr = FakePR(SOURCE_HEAD_MARKER.format(sha=OLD))
+    finish_without_updates(
+        None, "o/src", 1, pr, processed_source_head(client.report, NEW)
+    )
+    assert read_source_head_marker(pr) == NEW
+
+
+@pytest.fixture
+def repo(tmp_path):
+    def git(*cmd):
+        return subprocess.run(
+            ["git", *cmd], cwd=tmp_path, check=True, capture_output=True, text=True
+        ).stdout.strip()
+
+    git("init", "-q", "-b", "main")
+    git("config", "user.email", "test@example.invalid")
+    git("config", "user.name", "test")
+
+    def commit(name):
+        (tmp_path / name).write_text(name)
+        git("add", name)
+        git("commit", "-q", "-m", name)
+        return git("rev-parse", "HEAD")
+
+    return types.SimpleNamespace(path=str(tmp_path), git=git, commit=commit)
+
+
+def test_incremental_diff_after_new_commits(repo):
+    since = repo.commit("one")
+    head = repo.commit("two")
+    assert can_diff_incrementally(since, head, repo.path)
+
+
+def test_no_incremental_diff_after_a_force_push(repo):
+    base = repo.commit("one")
+    since = repo.commit("two")
+    repo.git("reset", "-q", "--hard", base)
+    head = repo.commit("three")
+    assert not can_diff_incrementally(since, head, repo.path)
+    assert not can_diff_incrementally("c" * 40, head, repo.path)
+
+
+def test_no_incremental_diff_across_a_merge(repo):
+    since = repo.commit("one")
+    repo.git("checkout", "-q", "-b", "base")
+    repo.commit("upstream")
+    repo.git("checkout", "-q", "main")
+    repo.git("merge", "-q", "--no-ff", "-m", "merge base", "base")
+    head = repo.git("rev-parse", "HEAD")
+    assert not can_diff_incrementally(since, head, repo.path)
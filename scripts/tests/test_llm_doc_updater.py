@@ -0,0 +1,302 @@
+import argparse
+import math
+import types
+
+import httpx
+import llm_doc_updater
+import pytest
+from constants import MAX_PAGE_OUTPUT_TOKENS
+from doc_index import SymbolIndex
+from llm_doc_updater import (
+    ModelClient,
+    ModelRouter,
+    TruncatedOutputError,
+    call_openai_triage_scored,
+    doc_relevance_reasons,
+    match_changed_symbols,
+    page_output_ceiling,
+    parse_batch_verdicts,
+    run_job_graph,
+    yes_probability,
+)
+from openai import BadRequestError
+from token_budget import count_tokens
+
+
+def test_page_output_ceiling_doubles_small_pages():
+    content = "word " * 100
+    assert page_output_ceiling(content) == 2 * count_tokens(content) + 1000
+
+
+def test_page_output_ceiling_never_below_page_size():
+    content = "word " * (MAX_PAGE_OUTPUT_TOKENS + 500)
+    assert page_output_ceiling(content) >= count_tokens(content) + 1000
+
+
+def test_page_output_ceiling_new_page_gets_full_cap():
+    assert page_output_ceiling() == MAX_PAGE_OUTPUT_TOKENS
+
+
+def chunk(content=None, finish_reason=None, usage=None):
+    choice = types.SimpleNamespace(
+        delta=types.SimpleNamespace(content=content), finish_reason=finish_reason
+    )
+    return types.SimpleNamespace(choices=[choice], usage=usage)
+
+
+class FakeStream(list):
+    def close(self):
+        pass
+
+
+class FakeCompletions:
+    """Streams a fixed answer; rejects stream_options when told to."""
+
+    def __init__(self, answer, reject_stream_options=False):
+        self.answer = answer
+        self.reject_stream_options = reject_stream_options
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.reject_stream_options and "stream_options" in kwargs:
+            request = httpx.Request("POST", "https://example.test/chat/completions")
+            raise BadRequestError(
+                "Unrecognized request argument supplied: stream_options",
+                response=httpx.Response(400, request=request),
+                body=None,
+            )
+        return FakeStream([chunk(self.answer), chunk(finish_reason="stop")])
+
+
+def fake_client(completions):
+    openai = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    return ModelClient(openai_client=openai)
+
+
+def test_streaming_retries_without_stream_options():
+    completions = FakeCompletions("updated page", reject_stream_options=True)
+    client = fake_client(completions)
+    messages = [{"role": "user", "content": "update"}]
+
+    assert client.complete_streaming(messages) == "updated page"
+    assert client.complete_streaming(messages) == "updated page"
+    # Only the first request carries stream_options; later ones skip it.
+    assert ["stream_options" in call for call in completions.calls] == [
+        True,
+        False,
+        False,
+    ]
+    assert client.report.totals()["requests"] == 2
+
+
+def test_streaming_keeps_stream_options_when_accepted():
+    completions = FakeCompletions("updated page")
+    client = fake_client(completions)
+
+    client.complete_streaming([{"role": "user", "content": "update"}])
+    assert completions.calls[0]["stream_options"] == {"include_usage": True}
+
+
+def test_streaming_raises_past_the_ceiling():
+    completions = FakeCompletions("word " * 50)
+    client = fake_client(completions)
+
+    with pytest.raises(TruncatedOutputError):
+        client.complete_streaming(
+            [{"role": "user", "content": "update"}], max_output_tokens=10
+        )
+
+
+class ParsedArgs(Exception):
+    pass
+
+
+def parse_cli(monkeypatch, *argv):
+    """Parse argv with main()'s parser, stopping before the run starts."""
+    parse_args = argparse.ArgumentParser.parse_args
+
+    def capture(parser, *args, **kwargs):
+        raise ParsedArgs(parse_args(parser, *args, **kwargs))
+
+    monkeypatch.setattr(argparse.ArgumentParser, "parse_args", capture)
+    required = ["--source-pr", "1", "--source-repo", "o/src"]
+    required += ["--doc-repo", "o/docs", "--doc-path", "docs"]
+    monkeypatch.setattr("sys.argv", ["llm_doc_updater.py", *required, *argv])
+    with pytest.raises(ParsedArgs) as parsed:
+        llm_doc_updater.main()
+    return parsed.value.args[0]
+
+
+def test_stream_generation_flag_can_be_turned_off(monkeypatch):
+    assert parse_cli(monkeypatch, "--stream-generation").stream_generation
+    assert not parse_cli(monkeypatch, "--no-stream-generation").stream_generation
+
+
+CONNECT_DIFF = """diff --git a/net/client.py b/net/client.py
+--- a/net/client.py
++++ b/net/client.py
+@@ -10,7 +10,7 @@ import socket
+ def connect(host):
+     \"\"\"Open a connection to host.\"\"\"
+-    retries = 3
++    retries = 5
+     for _ in range(retries):
+         try:
+             return socket.create_connection((host, 80))
+"""
+CONNECT_DOCS = {
+    "docs/client.md": "# Client\n\n`connect(host)` retries the connection 3 times.\n",
+    "docs/other.md": "# Other\n\nNothing about connecting here.\n",
+}
+
+
+def test_body_change_of_documented_function_is_relevant():
+    reasons = doc_relevance_reasons([], [], CONNECT_DIFF, CONNECT_DOCS)
+    assert reasons == ["changed code in connect documented in 1 page(s)"]
+
+
+def test_body_change_of_private_function_is_not_relevant():
+    diff = CONNECT_DIFF.replace("def connect(", "def _connect(")
+    docs = {"docs/client.md": "Call `_connect(host)` to open a connection.\n"}
+    assert doc_relevance_reasons([], [], diff, docs) == []
+
+
+def test_changes_in_tests_are_not_relevant():
+    diff = CONNECT_DIFF.replace("net/client.py", "tests/test_client.py")
+    assert doc_relevance_reasons([], [], diff, CONNECT_DOCS) == []
+
+
+def test_changed_symbol_and_unparsed_files_are_reasons():
+    diff = CONNECT_DIFF.replace("retries = 5", "max_retries = 5")
+    docs = {"docs/client.md": "Set `max_retries` to change the retry count.\n"}
+    reasons = doc_relevance_reasons([], ["src/native.c"], diff, docs)
+    assert reasons == [
+        "1 unparsed file(s): src/native.c",
+        "changed symbol(s) max_retries mentioned in 1 page(s)",
+    ]
+
+
+def test_relevance_reasons_reuse_a_given_index():
+    index = SymbolIndex(CONNECT_DOCS)
+    assert doc_relevance_reasons([], [], CONNECT_DIFF, CONNECT_DOCS, index)
+
+
+def test_fast_exit_is_off_by_default(monkeypatch):
+    assert not parse_cli(monkeypatch).fast_exit
+    assert parse_cli(monkeypatch, "--fast-exit").fast_exit
+
+
+def test_job_graph_passes_results_to_dependents():
+    results = run_job_graph(
+        {
+            "triage": ((), lambda done: ["a.md"]),
+            "propose": ((), lambda done: ["new.md"]),
+            "nav": (
+                ("triage", "propose"),
+                lambda done: done["triage"] + done["propose"],
+            ),
+        }
+    )
+    assert results["nav"] == ["a.md", "new.md"]
+
+
+def test_job_graph_reraises_and_stops_starting_jobs():
+    started = []
+
+    def fail(done):
+        raise RuntimeError("triage failed")
+
+    with pytest.raises(RuntimeError, match="triage failed"):
+        run_job_graph(
+            {
+                "triage": ((), fail),
+                "update": (("triage",), lambda done: started.append("update")),
+            }
+        )
+    assert started == []
+
+
+def test_job_graph_rejects_unsatisfiable_dependencies():
+    with pytest.raises(ValueError, match="nav"):
+        run_job_graph({"nav": (("missing",), lambda done: None)})
+
+
+def test_batch_verdicts_accept_booleans_words_and_unsure():
+    text = """```json
+[
+  {"path": "a.md", "update": true},
+  {"path": "b.md", "update": "No"},
+  {"path": "c.md", "update": "unsure"},
+  {"path": "d.md", "update": "maybe"},
+  {"path": "other.md", "update": true}
+]
+```"""
+    paths = ["a.md", "b.md", "c.md", "d.md", "e.md"]
+    # Unknown verdicts, missing and unexpected paths are left out.
+    assert parse_batch_verdicts(text, paths) == {
+        "a.md": True,
+        "b.md": False,
+        "c.md": None,
+    }
+
+
+def test_batch_verdicts_of_an_unparseable_answer_are_empty():
+    assert parse_batch_verdicts("I could not decide.", ["a.md"]) == {}
+
+
+def test_yes_probability_normalizes_over_yes_and_no():
+    candidates = {"YES": math.log(0.6), " no": math.log(0.2), "Maybe": math.log(0.2)}
+    assert yes_probability(candidates) == pytest.approx(0.75)
+
+
+def test_yes_probability_without_an_answer_is_none():
+    assert yes_probability({"The": -0.1}) is None
+
+
+class ScoringClient(ModelClient):
+    """Answers triage with fixed P(YES) per page; "large" has its own."""
+
+    def __init__(self, scores, escalated):
+        super().__init__(router=ModelRouter({"triage": "small"}, "large"))
+        self.scores = {"small": scores, "large": escalated}
+        self.models = []
+
+    def first_token_logprobs(self, messages, model="", top_logprobs=5):
+        self.models.append(model)
+        scores = self.scores[model]
+        path = next(path for path in scores if path in messages[-1]["content"])
+        return {"YES": math.log(scores[path]), "NO": math.log(1 - scores[path])}
+
+
+def test_scored_triage_escalates_near_threshold_and_keeps_top_k():
+    pages = {
+        "docs/alpha.md": "# A\n",
+        "docs/beta.md": "# B\n",
+        "docs/gamma.md": "# C\n",
+    }
+    client = ScoringClient(
+        {"docs/alpha.md": 0.9, "docs/beta.md": 0.6, "docs/gamma.md": 0.1},
+        {"docs/beta.md": 0.8},
+    )
+
+    kept = call_openai_triage_scored(
+        client, "diff", "", pages, max_workers=1, threshold=0.5, top_k=1
+    )
+
+    assert kept == ["docs/alpha.md"]
+    # Only beta was close enough to the threshold to be re-scored.
+    assert client.models.count("large") == 1
+    assert client.report.to_dict()["notes"]["triage_scores"] == {
+        "docs/alpha.md": 0.9,
+        "docs/beta.md": 0.8,
+        "docs/gamma.md": 0.1,
+    }
+
+
+def test_only_definition_changes_skip_triage():
+    pages = {"docs/client.md": "Set `max_retries` to retry failed connections.\n"}
+    usage = "+    log.debug(cfg.max_retries)\n"
+    rename = "-    max_retries: int = 3\n+    retry_limit: int = 3\n"
+    assert match_changed_symbols(pages, usage) == {}
+    assert match_changed_symbols(pages, rename) == {"docs/client.md": ["max_retries"]}
@@ -0,0 +1,63 @@
+import pytest
+from md_patch import PatchError, apply_edits, heading_sections, resolve_section
+
+PAGE = """# Client
+
+Intro.
+
+## Options
+
+- `timeout`: 30 seconds.
+
+```md
+## Not a heading
+```
+
+## Retries {#retries}
+
+The client retries 3 times.
+"""
+
+
+def test_heading_sections_skip_code_fences():
+    paths = [path for path, _, _ in heading_sections(PAGE)]
+    assert paths == [
+        ("Client",),
+        ("Client", "Options"),
+        ("Client", "Retries {#retries}"),
+    ]
+
+
+def test_resolve_section_matches_partial_paths_and_anchors():
+    start, end = resolve_section(PAGE, "retries")
+    assert PAGE[start:end] == "## Retries {#retries}\n\nThe client retries 3 times.\n"
+    assert resolve_section(PAGE, "Client > Options") == resolve_section(PAGE, "options")
+
+
+def test_resolve_section_rejects_unknown_sections():
+    with pytest.raises(PatchError, match="matches 0 headings"):
+        resolve_section(PAGE, "Install")
+
+
+def test_apply_edits_replaces_within_the_section():
+    edits = [{"section": "Retries", "find": "3 times", "replace": "5 times"}]
+    assert apply_edits(PAGE, edits) == PAGE.replace("3 times", "5 times")
+
+
+def test_apply_edits_appends_when_find_is_empty():
+    edits = [{"section": "Options", "find": "", "replace": "- `retries`: 5."}]
+    expected = PAGE.replace("```\n\n## Retries", "```\n\n- `retries`: 5.\n\n## Retries")
+    assert apply_edits(PAGE, edits) == expected
+
+
+def test_apply_edits_requires_a_unique_match():
+    edits = [{"section": "", "find": "retries", "replace": "tries"}]
+    with pytest.raises(PatchError, match="occurs 2 times"):
+        apply_edits(PAGE, edits)
+
+
+def test_apply_edits_rejects_malformed_edits():
+    with pytest.raises(PatchError):
+        apply_edits(PAGE, {"find": "x"})
+    with pytest.raises(PatchError, match="no 'replace'"):
+        apply_edits(PAGE, [{"section": "Options", "find": "timeout"}])
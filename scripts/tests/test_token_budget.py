@@ -0,0 +1,20 @@
+from token_budget import allocate
+
+
+def test_allocate_gives_everything_when_it_fits():
+    demands = {"diff": (300, 1000), "page": (200, 1000)}
+    assert allocate(1000, demands) == {"diff": 300, "page": 200}
+
+
+def test_allocate_passes_unused_share_to_larger_sections():
+    demands = {"diff": (5000, 5000), "pr": (100, 5000), "page": (5000, 5000)}
+    assert allocate(3000, demands) == {"pr": 100, "diff": 1450, "page": 1450}
+
+
+def test_allocate_respects_caps():
+    demands = {"diff": (5000, 500), "page": (5000, 5000)}
+    assert allocate(3000, demands) == {"diff": 500, "page": 2500}
+
+
+def test_allocate_with_nothing_available():
+    assert allocate(-10, {"diff": (100, 100)}) == {"diff": 0}
@@ -0,0 +1,195 @@
+import math
+import os
+import re
+
+from diff_tools import split_diff_files, split_file_hunks
+
+try:  # Optional: exact counts when tiktoken and its encoding files are available.
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+# (context window, max output tokens) per model family, matched by longest
+# name prefix. Unknown models use DEFAULT_PROFILE; LLM_CONTEXT_WINDOW and
+# LLM_MAX_OUTPUT_TOKENS override both for self-hosted/compatible endpoints.
+MODEL_PROFILES = {
+    "gpt-3.5-turbo": (16385, 4096),
+    "gpt-4": (8192, 4096),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4o": (128000, 16384),
+    "gpt-4.1": (1047576, 32768),
+    "gpt-5": (400000, 128000),
+    "o1": (200000, 100000),
+    "o3": (200000, 100000),
+    "o4-mini": (200000, 100000),
+}
+DEFAULT_PROFILE = (128000, 16384)
+# Headroom for estimator error and chat-format overhead.
+SAFETY_MARGIN = 0.05
+
+_OMITTED = "\n[... {count} more {unit} omitted to fit the token budget ...]\n"
+_HEADING_RE = re.compile(r"^#{1,6} ", re.MULTILINE)
+_FILE_BLOCK_RE = re.compile(r"^\n?--- FILE: ", re.MULTILINE)
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:  # noqa: BLE001 - e.g. encoding download unavailable
+            _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(text):
+    """Token count of text: exact with tiktoken, else a calibrated estimate.
+
+    The estimate assumes ~4 characters per token for ASCII (English prose and
+    code) and one token per non-ASCII character (CJK, emoji, accents), which
+    errs on the high side so budgets are not overrun.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return math.ceil((len(text) - non_ascii) / 4) + non_ascii
+
+
+def model_profile(model):
+    """(context window, max output tokens) for model."""
+    best = ""
+    for prefix in MODEL_PROFILES:
+        if model.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    window, max_output = MODEL_PROFILES.get(best, DEFAULT_PROFILE)
+    window = int(os.environ.get("LLM_CONTEXT_WINDOW") or window)
+    max_output = int(os.environ.get("LLM_MAX_OUTPUT_TOKENS") or max_output)
+    return window, max_output
+
+
+def prompt_token_limit(model):
+    """Input tokens available for one request, after reserving output room."""
+    window, max_output = model_profile(model)
+    reserve = min(max_output, window // 4)
+    return int((window - reserve) * (1 - SAFETY_MARGIN))
+
+
+def allocate(available, demands):
+    """Split available tokens between sections by water-filling.
+
+    demands maps name -> (needed, cap). Each section gets at most
+    min(needed, cap); sections that need less than an equal share give the
+    rest to the others. Returns name -> budget.
+    """
+    wants = {name: max(0, min(needed, cap)) for name, (needed, cap) in demands.items()}
+    budgets = {}
+    remaining = max(0, available)
+    for index, name in enumerate(sorted(wants, key=wants.get)):
+        share = remaining // (len(wants) - index)
+        budgets[name] = min(wants[name], share)
+        remaining -= budgets[name]
+    return budgets
+
+
+def _take_units(units, max_tokens, unit_name, fallback):
+    """Keep whole units in order while they fit; note how many were dropped."""
+    kept, used = [], 0
+    for index, unit in enumerate(units):
+        cost = count_tokens(unit)
+        if used + cost > max_tokens:
+            if not kept:
+                # Even the first unit is too large: cut it on a finer boundary.
+                return fallback(unit, max_tokens)
+            dropped = len(units) - index
+            return "".join(kept) + _OMITTED.format(count=dropped, unit=unit_name)
+        kept.append(unit)
+        used += cost
+    return "".join(kept)
+
+
+def trim_lines(text, max_tokens):
+    """Trim text to max_tokens on line boundaries."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines(keepends=True)
+    kept, used = [], 0
+    for line in lines:
+        cost = count_tokens(line)
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "".join(kept) + _OMITTED.format(count=len(lines) - len(kept), unit="lines")
+
+
+def _split_at(text, starts):
+    starts = [0] + [s for s in starts if s > 0]
+    ends = starts[1:] + [len(text)]
+    return [text[s:e] for s, e in zip(starts, ends) if text[s:e]]
+
+
+def trim_markdown(text, max_tokens):
+    """Trim a Markdown page to max_tokens, dropping whole trailing sections."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    sections = _split_at(text, [m.start() for m in _HEADING_RE.finditer(text)])
+    return _take_units(sections, max_tokens, "sections", trim_lines)
+
+
+def trim_diff(text, max_tokens):
+    """Trim a unified diff to max_tokens, keeping whole files, then hunks."""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    def trim_hunks(file_diff, budget):
+        header, hunks = split_file_hunks(file_diff)
+        if not hunks:
+            return trim_lines(file_diff, budget)
+        return header + _take_units(
+            hunks, max(budget - count_tokens(header), 0), "hunks", trim_lines
+        )
+
+    return _take_units(split_diff_files(text), max_tokens, "files", trim_hunks)
+
+
+def trim_file_blocks(text, max_tokens):
+    """Trim concatenated '--- FILE: path ---' blocks, keeping whole files."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    blocks = _split_at(text, [m.start() for m in _FILE_BLOCK_RE.finditer(text)])
+    return _take_units(blocks, max_tokens, "files", trim_markdown)
+
+
+def fit_sections(sections, available):
+    """Trim {name: (text, trim, cap)} sections to share available tokens."""
+    budgets = allocate(
+        available,
+        {name: (count_tokens(text), cap) for name, (text, _, cap) in sections.items()},
+    )
+    return {
+        name: trim(text, budgets[name]) for name, (text, trim, _) in sections.items()
+    }
+
+
+def fit_prompt(template, model, overhead_text="", sections=None, shared=None, **fields):
+    """Format template, trimming each section to share the context window.
+
+    sections and shared map placeholder -> (text, trim function, cap tokens);
+    fields are inserted verbatim. Shared sections (diff, PR description) are
+    budgeted from a fixed half of the model's input limit, independent of the
+    rest of the prompt, so they render byte-identically in every call of a
+    run and keep the provider's prompt-prefix cache warm. The remaining
+    sections split whatever is left after the fixed part of the prompt
+    (template, fields and overhead_text, e.g. the system prompt).
+    """
+    sections = sections or {}
+    fields.update(fit_sections(shared or {}, prompt_token_limit(model) // 2))
+    fixed = template.format(**fields, **{name: "" for name in sections})
+    available = prompt_token_limit(model) - count_tokens(fixed + overhead_text)
+    return template.format(**fields, **fit_sections(sections, available))